@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import jwt
+from django.conf import settings
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+from .models import AppUser
+
+
+class PrincipalCache:
+    """
+    Verified AppUsers keyed by the (user_id, iat) of the token that named
+    them, so an authenticated request does not need a database lookup.
+
+    Entries expire after `ttl` seconds; at most `max_entries` are kept,
+    least recently used first out. invalidate(user_id) drops every entry
+    of a user (done when an AppUser is saved or deleted). Each process has
+    its own cache, so `ttl` bounds how long another worker may still
+    accept a deactivated user.
+    """
+
+    def __init__(self, ttl: float = 60, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, int], Tuple[AppUser, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, user_id: int, iat: int) -> Optional[AppUser]:
+        key = (user_id, iat)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() < entry[1]:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[0]
+            self._entries.pop(key, None)
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, user_id: int, iat: int, user: AppUser) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[(user_id, iat)] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end((user_id, iat))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        """Forget every cached principal of a user"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+            self._stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "size": len(self._entries)}
+
+
+_principal_cache: Optional[PrincipalCache] = None
+_principal_cache_lock = threading.Lock()
+
+
+def get_principal_cache() -> PrincipalCache:
+    """Return the process-wide principal cache, configured from Django settings"""
+    global _principal_cache
+    if _principal_cache is None:
+        with _principal_cache_lock:
+            if _principal_cache is None:
+                _principal_cache = PrincipalCache(
+                    ttl=getattr(settings, 'JWT_PRINCIPAL_CACHE_TTL', 60),
+                    max_entries=getattr(settings, 'JWT_PRINCIPAL_CACHE_MAX_ENTRIES', 10000),
+                )
+    return _principal_cache
+
+
+def get_principal(payload: Dict) -> Optional[AppUser]:
+    """The active AppUser a verified token payload names, from the cache when possible"""
+    user_id, iat = payload.get('user_id'), payload.get('iat')
+    if user_id is None:
+        return None
+    cache = get_principal_cache()
+    user = cache.get(user_id, iat)
+    if user is not None:
+        return user
+
+    user = AppUser.objects.filter(id=user_id, is_active=True).first()
+    if user is not None:
+        cache.set(user_id, iat, user)
+    return user
+
+
+class JWTAuthentication(BaseAuthentication):
+    """
+    Authenticates `Authorization: Bearer <token>` requests carrying the
+    tokens issued by generate_jwt_token. request.user is the AppUser and
+    request.auth the token payload.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid Authorization header.')
+
+        try:
+            payload = jwt.decode(auth[1], settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        except jwt.ExpiredSignatureError:
+            raise exceptions.AuthenticationFailed('Token has expired.')
+        except jwt.InvalidTokenError:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+
+        user = get_principal(payload)
+        if user is None:
+            raise exceptions.AuthenticationFailed('User not found or inactive.')
+        return user, payload
+
+    def authenticate_header(self, request):
+        # Makes DRF answer unauthenticated requests with 401 rather than 403
+        return f'{self.keyword} realm="api"'
@@ -0,0 +1,144 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class HashingBusy(Exception):
+    """Raised when the password hashing pool is saturated; the client should retry shortly"""
+
+
+class PasswordHashingPool:
+    """
+    Runs password hashing (hundreds of milliseconds of CPU per call) on a
+    small, fixed set of threads. At most `workers` hashes run at once, so a
+    burst of logins cannot take every core from other requests. With
+    workers=0 hashing runs inline in the caller.
+
+    run() blocks the calling thread until the hash is done, so it only
+    accepts work when a worker is free to start it straight away; otherwise
+    it raises HashingBusy rather than parking a request thread in the queue.
+    Under ASGI, arun() awaits the hash instead, so up to `max_pending` calls
+    may also queue. Either way a hash not done within `timeout` seconds
+    raises HashingBusy.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 16, timeout: float = 5.0):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash") if workers > 0 else None
+        # Running plus queued hashes
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._stats = {"hashed": 0, "rejected": 0, "timed_out": 0}
+
+    def run(self, fn: Callable, *args):
+        if self._executor is None:
+            return fn(*args)
+        future = self._submit(fn, *args, limit=self.workers)
+        try:
+            result = future.result(timeout=self.timeout)
+        except TimeoutError:
+            # Not started yet: drop it; already running: let it finish, its slot frees when done
+            future.cancel()
+            raise self._timed_out()
+        self._count("hashed")
+        return result
+
+    async def arun(self, fn: Callable, *args):
+        """Async variant of run"""
+        if self._executor is None:
+            return fn(*args)
+        future = self._submit(fn, *args, limit=self.workers + self.max_pending)
+        try:
+            # Cancelling the wrapper on timeout cancels the hash too, unless it is already running
+            result = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            raise self._timed_out()
+        self._count("hashed")
+        return result
+
+    def _submit(self, fn: Callable, *args, limit: int) -> Future:
+        with self._lock:
+            if self._in_flight >= limit:
+                self._stats["rejected"] += 1
+                raise HashingBusy("Too many logins in progress, please retry shortly")
+            self._in_flight += 1
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _future: Future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def _timed_out(self) -> HashingBusy:
+        self._count("timed_out")
+        return HashingBusy("Password check timed out, please retry shortly")
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "workers": self.workers, "in_flight": self._in_flight}
+
+
+_pool: Optional[PasswordHashingPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_hashing_pool() -> PasswordHashingPool:
+    """Return the process-wide hashing pool, configured from Django settings"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PasswordHashingPool(
+                    workers=getattr(settings, 'AUTH_HASHING_WORKERS', 2),
+                    max_pending=getattr(settings, 'AUTH_HASHING_MAX_PENDING', 16),
+                    timeout=getattr(settings, 'AUTH_HASHING_TIMEOUT', 5.0),
+                )
+    return _pool
+
+
+def make_password(password: str) -> str:
+    """Hash a new password on the hashing pool"""
+    return get_hashing_pool().run(hashers.make_password, password)
+
+
+def _password_check(user, password: str) -> Callable:
+    def check():
+        upgraded = []
+        ok = hashers.check_password(password, user.password_hash,
+                                    setter=lambda raw: upgraded.append(hashers.make_password(raw)))
+        return ok, upgraded[0] if upgraded else None
+    return check
+
+
+def check_user_password(user, password: str) -> bool:
+    """
+    Check an AppUser's password on the hashing pool. When the stored hash
+    was made with an outdated hasher or iteration count, it is upgraded to
+    the current PASSWORD_HASHERS settings while the plain password is at hand.
+    """
+    ok, new_hash = get_hashing_pool().run(_password_check(user, password))
+    if new_hash:
+        # Saved here rather than on the pool, which keeps no database connections
+        user.password_hash = new_hash
+        user.save(update_fields=['password_hash', 'updated_at'])
+    return ok
+
+
+async def acheck_user_password(user, password: str) -> bool:
+    """Async variant of check_user_password"""
+    ok, new_hash = await get_hashing_pool().arun(_password_check(user, password))
+    if new_hash:
+        user.password_hash = new_hash
+        await user.asave(update_fields=['password_hash', 'updated_at'])
+    return ok
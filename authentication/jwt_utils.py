@@ -1,9 +1,8 @@
 import jwt
 from datetime import datetime, timedelta
 from django.conf import settings
-from django.contrib.auth import get_user_model
 
-User = get_user_model()
+from .backends import get_principal
 
 def generate_jwt_token(user):
     """Generate JWT token for user"""
@@ -23,20 +22,19 @@ def generate_jwt_token(user):
     return token
 
 def decode_jwt_token(token):
-    """Decode JWT token and return user"""
+    """Decode JWT token and return the active AppUser it was issued to"""
     try:
         payload = jwt.decode(
             token,
             settings.JWT_SECRET_KEY,
             algorithms=[settings.JWT_ALGORITHM]
         )
-        
-        user = User.objects.get(id=payload['user_id'])
-        return user
     except jwt.ExpiredSignatureError:
         return None
-    except (jwt.InvalidTokenError, User.DoesNotExist):
+    except jwt.InvalidTokenError:
         return None
+    
+    return get_principal(payload)
 
 def get_user_from_token(request):
     """Extract user from Authorization header"""
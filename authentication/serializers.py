@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from django.contrib.auth.hashers import make_password, check_password
+from .hashing import check_user_password, make_password
 from .models import AppUser
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -37,7 +37,7 @@ class UserLoginSerializer(serializers.Serializer):
         if email and password:
             try:
                 user = AppUser.objects.get(email=email)
-                if check_password(password, user.password_hash):
+                if check_user_password(user, password):
                     if user.is_active:
                         data['user'] = user
                         return data
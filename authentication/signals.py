@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .backends import get_principal_cache
+from .models import AppUser
+
+
+@receiver(post_save, sender=AppUser)
+@receiver(post_delete, sender=AppUser)
+def invalidate_principal(sender, instance, **kwargs):
+    """Drop cached principals of a changed user, so deactivation takes effect on the next request"""
+    get_principal_cache().invalidate(instance.id)
@@ -1,3 +1,122 @@
-from django.test import TestCase
+import asyncio
+import threading
+from datetime import datetime, timedelta
 
-# Create your tests here.
+import jwt
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.test import SimpleTestCase, TestCase
+
+from .hashing import HashingBusy, PasswordHashingPool
+from .models import AppUser
+
+
+def expired_token(user):
+    payload = {
+        'user_id': user.id,
+        'email': user.email,
+        'exp': datetime.utcnow() - timedelta(hours=1),
+        'iat': datetime.utcnow() - timedelta(days=8),
+    }
+    return jwt.encode(payload, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+
+
+class PasswordHashingPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.pool = PasswordHashingPool(workers=1, max_pending=1, timeout=0.2)
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def occupy_worker(self):
+        started = threading.Event()
+
+        def slow_hash():
+            started.set()
+            self.release.wait(5)
+
+        self.pool._submit(slow_hash, limit=1)
+        started.wait(5)
+
+    def test_sync_caller_is_turned_away_while_every_worker_is_busy(self):
+        self.occupy_worker()
+        with self.assertRaises(HashingBusy):
+            self.pool.run(lambda: "hash")
+        self.assertEqual(self.pool.stats()["rejected"], 1)
+
+        self.release.set()
+        while self.pool.stats()["in_flight"]:
+            threading.Event().wait(0.01)
+        self.assertEqual(self.pool.run(lambda: "hash"), "hash")
+
+    def test_async_caller_may_queue_up_to_max_pending(self):
+        self.occupy_worker()
+
+        async def login():
+            queued = asyncio.ensure_future(self.pool.arun(lambda: "hash"))
+            await asyncio.sleep(0.01)
+            with self.assertRaises(HashingBusy):
+                await self.pool.arun(lambda: "hash")
+            self.release.set()
+            return await queued
+
+        self.assertEqual(asyncio.run(login()), "hash")
+
+    def test_slow_hash_times_out(self):
+        with self.assertRaises(HashingBusy):
+            self.pool.run(self.release.wait, 5)
+        self.assertEqual(self.pool.stats()["timed_out"], 1)
+
+
+class AsyncLoginTests(TestCase):
+    def setUp(self):
+        AppUser.objects.create(email='traveller@example.com', name='Traveller',
+                               password_hash=make_password('correct-horse'))
+
+    async def test_login(self):
+        response = await self.async_client.post('/api/auth/login/async/',
+                                                {'email': 'traveller@example.com', 'password': 'correct-horse'},
+                                                content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['token'])
+
+    async def test_wrong_password(self):
+        response = await self.async_client.post('/api/auth/login/async/',
+                                                {'email': 'traveller@example.com', 'password': 'wrong'},
+                                                content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], {'non_field_errors': ['Invalid email or password']})
+
+
+class StaleTokenTests(TestCase):
+    """A client still sending an old Bearer token must be able to log back in"""
+
+    def setUp(self):
+        self.user = AppUser.objects.create(email='traveller@example.com', name='Traveller',
+                                           password_hash=make_password('correct-horse'))
+        self.headers = {'Authorization': f'Bearer {expired_token(self.user)}'}
+
+    def test_login_with_expired_bearer_token(self):
+        response = self.client.post('/api/auth/login/', {'email': 'traveller@example.com', 'password': 'correct-horse'},
+                                    content_type='application/json', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['token'])
+
+    def test_signup_with_expired_bearer_token(self):
+        response = self.client.post('/api/auth/signup/', {
+            'email': 'second@example.com', 'name': 'Second', 'password': 'correct-horse',
+            'confirm_password': 'correct-horse',
+        }, content_type='application/json', headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+
+    def test_health_check_with_invalid_bearer_token(self):
+        response = self.client.get('/api/auth/health/', headers={'Authorization': 'Bearer not-a-token'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_validate_reports_expired_token_in_its_own_format(self):
+        response = self.client.get('/api/auth/validate/', headers=self.headers)
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(response.json()['valid'])
+
+    def test_protected_endpoint_rejects_expired_token(self):
+        response = self.client.get('/api/chat-history/', headers=self.headers)
+        self.assertEqual(response.status_code, 401)
@@ -1,14 +1,20 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.utils.decorators import method_decorator
+from .models import AppUser
 from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserSerializer
 from .jwt_utils import generate_jwt_token, get_user_from_token
+from .hashing import HashingBusy, acheck_user_password
+import json
 
 @csrf_exempt
 @api_view(['POST'])
+@authentication_classes([])
 @permission_classes([AllowAny])
 def signup(request):
     """User registration endpoint"""
@@ -48,6 +54,11 @@ def signup(request):
                 'errors': serializer.errors
             }, status=status.HTTP_400_BAD_REQUEST)
             
+    except HashingBusy as e:
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
     except Exception as e:
         print(f"Signup error: {str(e)}")
         return Response({
@@ -57,6 +68,7 @@ def signup(request):
 
 @csrf_exempt
 @api_view(['POST'])
+@authentication_classes([])
 @permission_classes([AllowAny])
 def login(request):
     """User login endpoint"""
@@ -84,6 +96,11 @@ def login(request):
                 'errors': serializer.errors
             }, status=status.HTTP_400_BAD_REQUEST)
             
+    except HashingBusy as e:
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
     except Exception as e:
         print(f"Login error: {str(e)}")
         return Response({
@@ -91,8 +108,64 @@ def login(request):
             'message': f'Server error: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@csrf_exempt
+@require_POST
+async def login_async(request):
+    """
+    Native async variant of login for ASGI deployments. The password check
+    still runs on the hashing pool, but the request awaits it instead of
+    blocking a thread. login remains the endpoint for WSGI deployments.
+    """
+    try:
+        try:
+            data = json.loads(request.body or b'{}')
+            email, password = data.get('email'), data.get('password')
+        except (ValueError, AttributeError):
+            email = password = None
+        
+        errors = None
+        if not email or not password:
+            errors = ['Must include email and password']
+        else:
+            user = await AppUser.objects.filter(email=email).afirst()
+            if user is None or not await acheck_user_password(user, password):
+                errors = ['Invalid email or password']
+            elif not user.is_active:
+                errors = ['User account is disabled']
+        
+        if errors:
+            return JsonResponse({
+                'success': False,
+                'message': 'Invalid credentials',
+                'errors': {'non_field_errors': errors}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return JsonResponse({
+            'success': True,
+            'message': 'Login successful',
+            'token': generate_jwt_token(user),
+            'user': UserSerializer(user).data
+        }, status=status.HTTP_200_OK)
+    
+    except HashingBusy as e:
+        response = JsonResponse({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Retry-After'] = '1'
+        return response
+    except Exception as e:
+        print(f"Login error: {str(e)}")
+        return JsonResponse({
+            'success': False,
+            'message': f'Server error: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 @csrf_exempt
 @api_view(['GET'])
+# Checks the token itself, answering a bad one in its own format
+@authentication_classes([])
+@permission_classes([AllowAny])
 def validate_token(request):
     """Validate JWT token endpoint"""
     try:
@@ -120,6 +193,9 @@ def validate_token(request):
 
 @csrf_exempt
 @api_view(['GET'])
+# Checks the token itself, answering a bad one in its own format
+@authentication_classes([])
+@permission_classes([AllowAny])
 def user_profile(request):
     """Get user profile endpoint"""
     try:
@@ -145,6 +221,7 @@ def user_profile(request):
 
 @csrf_exempt
 @api_view(['GET'])
+@authentication_classes([])
 @permission_classes([AllowAny])
 def health_check(request):
     """Health check endpoint to verify API is running"""
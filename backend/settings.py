@@ -144,7 +144,7 @@ CSRF_TRUSTED_ORIGINS = [
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'authentication.backends.JWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -156,6 +156,94 @@ import datetime
 JWT_SECRET_KEY = SECRET_KEY
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_DELTA = datetime.timedelta(days=7)
+JWT_PRINCIPAL_CACHE_TTL = 60  # Seconds a verified token's user is trusted without a database lookup
+JWT_PRINCIPAL_CACHE_MAX_ENTRIES = 10000  # Least recently used principals are evicted beyond this
 
 # Custom User Model
 AUTH_USER_MODEL = 'authentication.User'
+
+# Amadeus API client settings
+import os
+AMADEUS_BASE_URL = os.getenv('AMADEUS_BASE_URL', 'https://test.api.amadeus.com')
+AMADEUS_HTTP_POOL_SIZE = 20  # Keep-alive connections per worker process
+AMADEUS_CONNECT_TIMEOUT = 3.05  # Seconds
+AMADEUS_READ_TIMEOUT = 20.0  # Seconds
+AMADEUS_MAX_RETRIES = 2  # Retries on 429/5xx responses and connection errors
+AMADEUS_RETRY_BACKOFF = 0.5  # Base delay (seconds) for jittered exponential backoff
+AMADEUS_RETRY_MAX_BACKOFF = 8.0  # Longest wait between retries; longer Retry-After values are not retried
+AMADEUS_RATE_LIMIT = 10.0  # Outbound calls per second per process (0 disables the limiter)
+AMADEUS_RATE_BURST = 10  # Calls allowed back to back before pacing starts
+AMADEUS_RATE_MAX_WAIT = 5.0  # Seconds a call may queue for quota before failing fast
+# Per-endpoint circuit breakers and hedging. A circuit opens when `failure_rate` of at least
+# `min_calls` attempts in the last `window` seconds failed (network error or 5xx), refuses calls
+# for `cooldown` seconds, then lets `half_open_calls` trial calls decide whether to close again.
+# Hedged GETs send a second attempt once the first is slower than the endpoint's
+# `hedge_percentile` latency (never sooner than `hedge_min_delay` seconds).
+AMADEUS_ENDPOINT_POLICIES = {
+    'token': {
+        'path': '/v1/security/oauth2/token',
+        'failure_rate': 0.5, 'min_calls': 4, 'window': 60, 'cooldown': 30, 'half_open_calls': 1,
+    },
+    'flight_offers': {
+        'path': '/v2/shopping/flight-offers',
+        'failure_rate': 0.5, 'min_calls': 10, 'window': 30, 'cooldown': 15, 'half_open_calls': 1,
+        'hedge': os.getenv('AMADEUS_HEDGE_SEARCHES', '').lower() in ('1', 'true', 'yes'),
+        'hedge_percentile': 95, 'hedge_min_delay': 0.5,
+    },
+}
+
+# Flight offer cache (per worker process)
+FLIGHT_CACHE_TTL = 300  # Seconds a search result is served as fresh
+FLIGHT_CACHE_STALE_TTL = 600  # Seconds after the TTL a result is served while it is refreshed in the background
+FLIGHT_CACHE_STALE_IF_ERROR_TTL = 3600  # Seconds after the TTL a result may be served when Amadeus is failing
+FLIGHT_CACHE_MAX_ENTRIES = 2000  # Least recently used entries are evicted beyond this
+
+# Fan-out searches (flexible dates, cities with several airports)
+FLIGHT_FANOUT_CONCURRENCY = 4  # Upstream searches run in parallel per query
+FLIGHT_FANOUT_MAX_CALLS = 12  # Most upstream searches a single query may fan out to
+FLIGHT_FANOUT_MAX_OFFERS = 20  # Length of the merged, price-ranked offer list
+FLIGHT_FLEX_DEFAULT_DAYS = 2  # Window for queries like "around next Friday"
+FLIGHT_FLEX_MAX_DAYS = 7  # Largest ±N window a client may request
+
+# Cache prewarming for popular routes (see `manage.py prewarm_flight_cache`)
+FLIGHT_CACHE_SHARED_ALIAS = os.getenv('FLIGHT_CACHE_SHARED_ALIAS')  # Django cache alias shared by all workers, e.g. a Redis/Memcached cache
+FLIGHT_PREWARM_ENABLED = os.getenv('FLIGHT_PREWARM_ENABLED', '').lower() in ('1', 'true', 'yes')  # Run the in-process scheduler; needs FLIGHT_CACHE_SHARED_ALIAS, one worker runs each slot
+FLIGHT_PREWARM_HOURS = [6]  # Local hours at which the scheduler warms the cache, ahead of the morning peak
+FLIGHT_PREWARM_TOP_ROUTES = 20  # Most searched routes to warm
+FLIGHT_PREWARM_WINDOW_HOURS = 24  # Look-back window for route popularity
+FLIGHT_PREWARM_BUDGET = 50  # Most upstream searches per prewarm run
+FLIGHT_PREWARM_TTL = 3600  # Seconds a prewarmed result is served as fresh
+FLIGHT_SERVES_REQUESTS = os.getenv('FLIGHT_SERVES_REQUESTS')  # Whether this process starts the scheduler and warm-up; unset detects gunicorn/uvicorn/daphne or `manage.py runserver`
+
+# Airport autocomplete (/api/airports/autocomplete/)
+AIRPORT_AUTOCOMPLETE_WINDOW_DAYS = 30  # Look-back window for the search counts that rank suggestions
+AIRPORT_AUTOCOMPLETE_REFRESH = 3600  # Seconds before the index is rebuilt with fresh search counts
+AIRPORT_AUTOCOMPLETE_MAX_AGE = 300  # Cache-Control max-age of autocomplete responses
+
+# Searching from the user's position ("flights from near me", /api/airports/nearby/)
+FLIGHT_NEARBY_ORIGINS = 3  # Nearest airports searched as the origin when a query with lat/lon names none
+FLIGHT_NEARBY_MAX_KM = 150.0  # Farthest an airport may be to count as near
+
+# Password hashing for login and signup (see authentication.hashing)
+AUTH_HASHING_WORKERS = 2  # Hashes run at once per process; 0 hashes inline on the request thread
+AUTH_HASHING_MAX_PENDING = 16  # Async logins that may queue for a hashing thread; sync logins get a 503 once every thread is busy
+AUTH_HASHING_TIMEOUT = 5.0  # Seconds a login waits for its hash before giving up with a 503
+
+# Write-behind chat and search history (see flight_agent.write_behind)
+HISTORY_WRITE_BEHIND = os.getenv('HISTORY_WRITE_BEHIND', '').lower() in ('1', 'true', 'yes')  # Queue history rows and write them in batches off the request path
+HISTORY_WRITE_BATCH_SIZE = 100  # Rows written per transaction; a full batch is written at once
+HISTORY_WRITE_INTERVAL = 0.5  # Seconds queued rows may wait for a batch to fill
+HISTORY_WRITE_MAX_PENDING = 10000  # Rows that may queue before requests write their own again
+HISTORY_WRITE_MAX_RETRIES = 5  # Failed flushes of a batch before its rows are dropped
+
+# History retention (see flight_agent.retention and `manage.py purge_history`)
+HISTORY_RETENTION_DAYS = 365  # Chat messages and searches older than this are purged; 0 keeps them
+HISTORY_MAX_CHAT_MESSAGES_PER_USER = 5000  # Newest chat messages kept per user; 0 for no cap
+HISTORY_MAX_SEARCHES_PER_USER = 1000  # Newest searches kept per user; 0 for no cap
+HISTORY_PURGE_CHUNK_SIZE = 500  # Rows deleted per transaction, so no purge holds the write lock for long
+HISTORY_PURGE_PAUSE = 0.02  # Seconds between chunks for other writers to get in
+HISTORY_ARCHIVE_DIR = os.getenv('HISTORY_ARCHIVE_DIR')  # Purged rows are written here as .jsonl.gz first when set
+
+# Record/replay of Amadeus responses (see flight_agent.fixtures)
+AMADEUS_TRANSPORT = os.getenv('AMADEUS_TRANSPORT', 'passthrough')  # passthrough, record (save responses) or replay (serve saved responses, no network)
+AMADEUS_FIXTURES_PATH = os.getenv('AMADEUS_FIXTURES_PATH', str(BASE_DIR / 'amadeus_fixtures.jsonl.gz'))  # Where recorded responses are kept
@@ -0,0 +1,136 @@
+"""
+Compare concurrent flight-search throughput under WSGI and ASGI.
+
+Both variants run in-process against the local stub Amadeus server, with
+the flight offer cache disabled so every request goes upstream:
+
+- WSGI: the sync FlightSearchView (/api/flight-search/) driven through
+  django.test.Client from a fixed pool of worker threads, like
+  `gunicorn --threads N`;
+- ASGI: the async view (/api/flight-search/async/) driven through
+  django.test.AsyncClient from a single event loop with up to
+  --concurrency requests in flight.
+
+Usage:
+    python -m benchmarks.bench_async_search --requests 400 --latency 1.0 --wsgi-threads 8 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+from rest_framework.authentication import BaseAuthentication  # noqa: E402
+
+from benchmarks.stub_amadeus import start_stub_server  # noqa: E402
+
+BENCH_EMAIL = "benchmark@example.com"
+
+
+class BenchmarkAuthentication(BaseAuthentication):
+    """Authenticates every request as the benchmark user, so both variants pay the same auth cost"""
+    user = None
+
+    def authenticate(self, request):
+        if BenchmarkAuthentication.user is None:
+            from authentication.models import AppUser
+            BenchmarkAuthentication.user = AppUser.objects.get(email=BENCH_EMAIL)
+        return BenchmarkAuthentication.user, None
+
+
+def setup_django(db_path: str, amadeus_url: str, pool_size: int) -> None:
+    import django
+    from django.conf import settings
+
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, "testserver"]
+    settings.DATABASES["default"]["NAME"] = db_path
+    settings.DATABASES["default"]["OPTIONS"] = {"timeout": 30}
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK,
+        "DEFAULT_AUTHENTICATION_CLASSES": ["benchmarks.bench_async_search.BenchmarkAuthentication"],
+    }
+    settings.AMADEUS_BASE_URL = amadeus_url
+    settings.AMADEUS_HTTP_POOL_SIZE = pool_size
+    settings.FLIGHT_CACHE_TTL = 0
+    settings.FLIGHT_CACHE_STALE_TTL = 0
+    settings.FLIGHT_CACHE_STALE_IF_ERROR_TTL = 0
+    django.setup()
+
+    import logging
+    logging.disable(logging.WARNING)
+
+    from authentication.models import AppUser
+    from django.core.management import call_command
+    call_command("migrate", verbosity=0)
+    AppUser.objects.get_or_create(email=BENCH_EMAIL, defaults={"name": "Benchmark", "password_hash": "!"})
+
+
+def summarize(name: str, latencies: list, elapsed: float, errors: int) -> None:
+    latencies = sorted(latencies)
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    print(f"{name:<6} {len(latencies):>6} req  {elapsed:7.2f}s  {len(latencies) / elapsed:8.1f} req/s  "
+          f"p50 {cuts[49] * 1000:7.1f}ms  p95 {cuts[94] * 1000:7.1f}ms  errors {errors}")
+
+
+def run_wsgi(total: int, threads: int) -> None:
+    from django.test import Client
+
+    def one(_):
+        client = Client()
+        start = time.perf_counter()
+        response = client.post("/api/flight-search/", {"query": "from DEL to BOM tomorrow"}, content_type="application/json")
+        return time.perf_counter() - start, response.status_code != 200
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    summarize("WSGI", [r[0] for r in results], elapsed, sum(r[1] for r in results))
+
+
+async def run_asgi(total: int, concurrency: int) -> None:
+    from django.test import AsyncClient
+
+    client = AsyncClient()
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with limit:
+            start = time.perf_counter()
+            response = await client.post("/api/flight-search/async/", {"query": "from DEL to BOM tomorrow"}, content_type="application/json")
+            return time.perf_counter() - start, response.status_code != 200
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    summarize("ASGI", [r[0] for r in results], elapsed, sum(r[1] for r in results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=400, help="requests per variant")
+    parser.add_argument("--latency", type=float, default=1.0, help="stub Amadeus latency in seconds")
+    parser.add_argument("--wsgi-threads", type=int, default=8, help="WSGI worker threads")
+    parser.add_argument("--concurrency", type=int, default=200, help="max in-flight ASGI requests")
+    args = parser.parse_args()
+
+    stub = start_stub_server(latency=args.latency)
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, "bench.sqlite3"), stub.url, pool_size=max(args.wsgi_threads, args.concurrency))
+
+        print(f"{args.requests} flight searches per variant, stub latency {args.latency * 1000:.0f}ms")
+        run_wsgi(args.requests, args.wsgi_threads)
+        asyncio.run(run_asgi(args.requests, args.concurrency))
+        print(f"Upstream searches served by stub: {stub.searches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Measure the airport autocomplete lookup path, one call per keystroke.
+
+The corpus is every prefix of a set of typed place names and codes
+("b", "ba", "ban", ... "bangalore"), as a typeahead field sends them.
+Variants:
+
+- scan: a linear startswith scan over the same keys, ranked afterwards -
+  what a lookup costs without the prefix index;
+- index: AirportAutocomplete.lookup (precomputed short prefixes, bisect
+  range otherwise);
+- index + JSON: lookup plus rendering the response body.
+
+Search weights are synthetic (Zipf-like over popular codes); no database
+is needed.
+
+Usage:
+    python -m benchmarks.bench_autocomplete --repeat 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+TYPED = ["bangalore", "bengaluru", "mumbai", "delhi", "new delhi", "goa", "chennai", "hyderabad", "kolkata",
+         "london", "heathrow", "paris", "new york", "dubai", "singapore", "san francisco", "frankfurt",
+         "BLR", "BOM", "DEL", "JFK", "LHR", "DXB", "sao paulo", "los angeles", "tokyo", "hong kong"]
+POPULAR = ["DEL", "BOM", "BLR", "MAA", "HYD", "CCU", "GOI", "DXB", "LON", "NYC", "SIN", "BKK", "PAR", "COK", "PNQ"]
+
+
+def keystrokes() -> list:
+    return [name[:length] for name in TYPED for length in range(1, len(name) + 1)]
+
+
+def scan_lookup(index, query: str, limit: int = 8) -> list:
+    from flight_agent.resolver import normalize_name
+    prefix = normalize_name(query)
+    matches = {}
+    for key, code, tier in zip(index._keys, index._codes, index._tiers):
+        if key.startswith(prefix):
+            matches[code] = min(tier, matches.get(code, tier))
+    return [index._entries[code] for code in index._ranked(matches)[:limit]]
+
+
+def timed(fn, queries: list, repeat: int) -> list:
+    """Per-call latencies (seconds) from the best of `repeat` passes"""
+    best = None
+    for _ in range(repeat):
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            fn(query)
+            latencies.append(time.perf_counter() - start)
+        if best is None or sum(latencies) < sum(best):
+            best = latencies
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+    import logging
+    logging.disable(logging.WARNING)
+
+    from rest_framework.renderers import JSONRenderer
+    from flight_agent.autocomplete import AirportAutocomplete
+
+    weights = {code: 1000 // (rank + 1) for rank, code in enumerate(POPULAR)}
+    start = time.perf_counter()
+    index = AirportAutocomplete(weights)
+    print(f"index build: {(time.perf_counter() - start) * 1000:.0f}ms, {len(index._keys)} keys, "
+          f"{len(index._short)} precomputed prefixes")
+
+    queries = keystrokes()
+    renderer = JSONRenderer()
+    variants = {
+        "scan": lambda q: scan_lookup(index, q),
+        "index": index.lookup,
+        "index + JSON": lambda q: renderer.render({"query": q, "results": index.lookup(q)}),
+    }
+    print(f"{len(queries)} keystrokes, best of {args.repeat} passes")
+    print(f"{'variant':<14}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}{'max us':>10}")
+    for name, fn in variants.items():
+        latencies = sorted(timed(fn, queries, args.repeat))
+        cuts = statistics.quantiles(latencies, n=100)
+        print(f"{name:<14}{statistics.fmean(latencies) * 1e6:>10.1f}{cuts[49] * 1e6:>10.1f}"
+              f"{cuts[98] * 1e6:>10.1f}{latencies[-1] * 1e6:>10.1f}")
+
+    codes = {q for q in queries if q.upper() in index._entries}
+    mismatched = sum(1 for q in queries if q not in codes and scan_lookup(index, q) != index.lookup(q))
+    print(f"\nresults differing from the scan (excluding {len(codes)} exact-code matches): {mismatched}")
+
+
+if __name__ == "__main__":
+    main()
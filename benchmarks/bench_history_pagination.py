@@ -0,0 +1,112 @@
+"""
+Compare keyset and OFFSET pagination of chat history at increasing depth.
+
+Fills a temporary SQLite database with --rows chat messages for one user
+(plus other users' rows around them), then times fetching one page at
+several depths:
+
+- offset: ChatMessage.objects.filter(user=...).order_by(newest first)[offset:offset + limit];
+- keyset: flight_agent.history.history_page with the `before` cursor of
+  that page, as ChatHistoryView does.
+
+Also prints SQLite's query plan for the keyset query.
+
+Usage:
+    python -m benchmarks.bench_history_pagination --rows 100000 --limit 50
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+
+def setup_django(db_path: str) -> None:
+    import django
+    from django.conf import settings
+    settings.DATABASES["default"]["NAME"] = db_path
+    django.setup()
+
+    import logging
+    logging.disable(logging.WARNING)
+
+    from django.core.management import call_command
+    call_command("migrate", verbosity=0)
+
+
+def fill(rows: int):
+    from django.db import connection
+    from authentication.models import AppUser
+    from flight_agent.models import ChatMessage
+
+    users = [AppUser.objects.create(email=f"history-{index}@example.com", name="History", password_hash="!")
+             for index in range(3)]
+    batch = []
+    for index in range(rows * 3 // 2):
+        # Two thirds of the rows belong to the user under test, interleaved with the others'
+        user = users[0] if index % 3 else users[1 + index % 2]
+        batch.append(ChatMessage(user=user, message=f"message {index}", is_user=index % 2 == 0))
+        if len(batch) == 5000:
+            ChatMessage.objects.bulk_create(batch)
+            batch = []
+    ChatMessage.objects.bulk_create(batch)
+    # Rows made in one loop are microseconds apart; spread them out a second apart
+    with connection.cursor() as cursor:
+        cursor.execute("UPDATE flight_agent_chatmessage SET timestamp = datetime('2024-01-01', '+' || id || ' seconds')")
+    return users[0]
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django(os.path.join(tempfile.mkdtemp(), "bench.sqlite3"))
+    from django.db import connection
+    from flight_agent.history import history_page
+    from flight_agent.models import ChatMessage
+
+    start = time.perf_counter()
+    user = fill(args.rows)
+    history = ChatMessage.objects.filter(user=user)
+    total = history.count()
+    print(f"{total} messages for the user ({time.perf_counter() - start:.1f}s to load), page size {args.limit}")
+
+    newest_first = list(history.order_by("-timestamp", "-id").values_list("id", flat=True))
+    pages = total // args.limit
+    print(f"{'page':>8}{'offset ms':>12}{'keyset ms':>12}")
+    for page in sorted({1, 10, 100, pages // 2, pages}):
+        offset = (page - 1) * args.limit
+        before = newest_first[offset - 1] if offset else None
+        offset_time = best_of(lambda: list(history.order_by("-timestamp", "-id")[offset:offset + args.limit]))
+        keyset_time = best_of(lambda: history_page(history, before, args.limit))
+        assert [row.id for row in history_page(history, before, args.limit)[0]] == newest_first[offset:offset + args.limit]
+        print(f"{page:>8}{offset_time * 1000:>12.2f}{keyset_time * 1000:>12.2f}")
+
+    before = newest_first[len(newest_first) // 2]
+    cursor = history.filter(id=before).values_list("timestamp", flat=True).first()
+    query = (history.order_by("-timestamp", "-id").filter(timestamp__lte=cursor)
+             .exclude(timestamp=cursor, id__gte=before)[:args.limit + 1])
+    sql, params = query.query.sql_with_params()
+    with connection.cursor() as db:
+        db.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        print("\nkeyset query plan:", "; ".join(row[-1] for row in db.fetchall()))
+
+
+if __name__ == "__main__":
+    main()
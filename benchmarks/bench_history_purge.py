@@ -0,0 +1,113 @@
+"""
+Measure how deleting a long chat history holds up other writers.
+
+Fills a temporary SQLite database with --rows chat messages for one user,
+then deletes them while another thread keeps saving a chat message every
+--interval seconds, as live traffic would, and records how long each of
+those saves took:
+
+- one statement: ChatMessage.objects.filter(user=...).delete(), as
+  ChatHistoryView.delete did;
+- chunked: flight_agent.retention.purge_rows, as it does now.
+
+Usage:
+    python -m benchmarks.bench_history_purge --rows 100000 --chunk-size 500 --pause 0.02
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+
+def setup_django(db_path: str) -> None:
+    import django
+    from django.conf import settings
+    settings.DATABASES["default"]["NAME"] = db_path
+    settings.DATABASES["default"]["OPTIONS"] = {"timeout": 30}
+    django.setup()
+
+    import logging
+    logging.disable(logging.WARNING)
+
+    from django.core.management import call_command
+    call_command("migrate", verbosity=0)
+
+
+def fill(user, rows: int) -> None:
+    from flight_agent.models import ChatMessage
+    for start in range(0, rows, 5000):
+        ChatMessage.objects.bulk_create(
+            ChatMessage(user=user, message=f"message {index}", is_user=index % 2 == 0)
+            for index in range(start, min(start + 5000, rows))
+        )
+
+
+def run(delete, writer_user, interval: float) -> dict:
+    from django.db import connection
+    from flight_agent.models import ChatMessage
+
+    stop = threading.Event()
+    saves = []
+
+    def write():
+        while not stop.is_set():
+            start = time.perf_counter()
+            ChatMessage.objects.create(user=writer_user, message="live traffic")
+            saves.append(time.perf_counter() - start)
+            stop.wait(interval)
+        connection.close()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    time.sleep(0.2)
+    start = time.perf_counter()
+    deleted = delete()
+    elapsed = time.perf_counter() - start
+    time.sleep(0.2)
+    stop.set()
+    writer.join()
+    return {"deleted": deleted, "elapsed": elapsed, "saves": sorted(saves)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.02, help="seconds between chunks")
+    parser.add_argument("--interval", type=float, default=0.01, help="seconds between the other thread's saves")
+    args = parser.parse_args()
+
+    setup_django(os.path.join(tempfile.mkdtemp(), "bench.sqlite3"))
+    from authentication.models import AppUser
+    from flight_agent.models import ChatMessage
+    from flight_agent.retention import purge_rows
+
+    heavy = AppUser.objects.create(email="heavy@example.com", name="Heavy", password_hash="!")
+    live = AppUser.objects.create(email="live@example.com", name="Live", password_hash="!")
+    history = ChatMessage.objects.filter(user=heavy)
+    variants = {
+        "one statement": lambda: history.delete()[0],
+        "chunked": lambda: purge_rows(history, chunk_size=args.chunk_size, pause=args.pause),
+    }
+
+    print(f"deleting {args.rows} messages, chunks of {args.chunk_size} with {args.pause * 1000:.0f}ms pauses")
+    print(f"{'variant':<15}{'delete s':>10}{'save p50 ms':>13}{'save p99 ms':>13}{'save max ms':>13}")
+    for name, delete in variants.items():
+        fill(heavy, args.rows)
+        stats = run(delete, live, args.interval)
+        assert stats["deleted"] == args.rows
+        saves = stats["saves"]
+        cuts = statistics.quantiles(saves, n=100, method="inclusive")
+        print(f"{name:<15}{stats['elapsed']:>10.2f}{cuts[49] * 1000:>13.2f}{cuts[98] * 1000:>13.2f}{saves[-1] * 1000:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
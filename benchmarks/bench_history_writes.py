@@ -0,0 +1,109 @@
+"""
+Measure what saving chat and search history costs a flight search request.
+
+Runs in-process on a temporary SQLite database with a fixed pool of
+request worker threads (like `gunicorn --threads N`). Each simulated
+request saves what FlightSearchView saves after a successful search: the
+user's ChatMessage, the FlightSearchQuery and the agent's ChatMessage,
+with results taken from real queries against the local stub Amadeus
+server. Only the saving is timed.
+
+- inline: rows are inserted on the request thread (HISTORY_WRITE_BEHIND off);
+- write-behind: rows are queued and written in batches by
+  flight_agent.write_behind.HistoryWriter.
+
+"drain" is how long after the last request every row was in the database.
+
+Usage:
+    python -m benchmarks.bench_history_writes --requests 2000 --workers 8
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+from benchmarks.bench_async_search import BENCH_EMAIL, setup_django  # noqa: E402
+from benchmarks.stub_amadeus import start_stub_server  # noqa: E402
+
+
+def sample_results(count: int) -> list:
+    from flight_agent.flight_service import FlightAgentService
+    service = FlightAgentService()
+    return [service.run_query(f"flights from DEL to BOM in {index + 1} days") for index in range(count)]
+
+
+def run(total: int, workers: int, results: list) -> dict:
+    from django.db import connection
+    from authentication.models import AppUser
+    from flight_agent.history import save_query_result, save_user_message
+
+    user = AppUser.objects.get(email=BENCH_EMAIL)
+
+    def one(index):
+        start = time.perf_counter()
+        try:
+            result = results[index % len(results)]
+            save_user_message(user, result.query)
+            save_query_result(user, result)
+            failed = False
+        except Exception:
+            failed = True
+        elapsed = time.perf_counter() - start
+        # As at the end of a request
+        connection.close()
+        return elapsed, failed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        timings = list(pool.map(one, range(total)))
+    return {"latencies": [timing for timing, _ in timings], "errors": sum(failed for _, failed in timings),
+            "elapsed": time.perf_counter() - start}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=8, help="request worker threads")
+    parser.add_argument("--distinct-results", type=int, default=10, help="different result sets the requests save")
+    args = parser.parse_args()
+
+    stub = start_stub_server(latency=0)
+    setup_django(os.path.join(tempfile.mkdtemp(), "bench.sqlite3"), stub.url, pool_size=args.workers)
+
+    from django.conf import settings
+    from flight_agent import write_behind
+    from flight_agent.models import ChatMessage
+
+    results = sample_results(args.distinct_results)
+    print(f"{args.requests} requests, {args.workers} request workers, 3 rows each, {os.cpu_count()} CPUs")
+    print(f"{'variant':<14}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'req/s':>9}{'drain s':>9}{'errors':>8}")
+    for name, enabled in (("inline", False), ("write-behind", True)):
+        settings.HISTORY_WRITE_BEHIND = enabled
+        write_behind._writer = None
+        ChatMessage.objects.all().delete()
+
+        stats = run(args.requests, args.workers, results)
+        drain_start = time.perf_counter()
+        writer = write_behind.get_history_writer()
+        if writer is not None:
+            writer.close()
+        drain = time.perf_counter() - drain_start
+        assert ChatMessage.objects.count() == 2 * (args.requests - stats["errors"])
+
+        latencies = sorted(stats["latencies"])
+        cuts = statistics.quantiles(latencies, n=100)
+        print(f"{name:<14}{cuts[49] * 1000:>9.2f}{cuts[98] * 1000:>9.2f}{latencies[-1] * 1000:>9.1f}"
+              f"{args.requests / stats['elapsed']:>9.0f}{drain:>9.2f}{stats['errors']:>8}")
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
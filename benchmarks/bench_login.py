@@ -0,0 +1,146 @@
+"""
+Measure login throughput and what a login burst does to flight searches.
+
+Runs in-process against the local stub Amadeus server with a fixed pool
+of request worker threads (like `gunicorn --threads N`). Flight searches
+(/api/flight-search/) arrive at a steady rate; in the burst variants a
+wave of logins (/api/auth/login/) arrives at once a little after the
+start. Latencies are measured from each request's arrival, so time spent
+queued behind busy workers counts.
+
+- searches only: the baseline;
+- inline hashing: password checks run on the request thread, as before
+  authentication.hashing (AUTH_HASHING_WORKERS=0);
+- hashing pool: password checks run on the bounded hashing pool, with
+  logins beyond its queue turned away with a 503.
+
+Usage:
+    python -m benchmarks.bench_login --searches 60 --rate 5 --logins 20 --workers 8
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+from benchmarks.bench_async_search import setup_django  # noqa: E402
+from benchmarks.stub_amadeus import start_stub_server  # noqa: E402
+
+PASSWORD = "benchmark-password"
+
+
+def create_users(count: int) -> list:
+    from django.contrib.auth.hashers import make_password
+    from authentication.models import AppUser
+    password_hash = make_password(PASSWORD)
+    emails = [f"login-{index}@example.com" for index in range(count)]
+    for email in emails:
+        AppUser.objects.get_or_create(email=email, defaults={"name": email, "password_hash": password_hash})
+    return emails
+
+
+def run(workers: int, searches: int, rate: float, emails: list, burst_at: float) -> dict:
+    from django.test import Client
+
+    client_local = threading.local()
+    results = {"search": [], "login": [], "login_rejected": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def client():
+        if not hasattr(client_local, "client"):
+            client_local.client = Client()
+        return client_local.client
+
+    def search(arrival, index):
+        response = client().post("/api/flight-search/", {"query": f"flights from DEL to BOM in {index % 30 + 1} days"},
+                                 content_type="application/json")
+        with lock:
+            results["search"].append(time.perf_counter() - arrival)
+            results["errors"] += response.status_code != 200
+
+    def login(arrival, email):
+        response = client().post("/api/auth/login/", {"email": email, "password": PASSWORD},
+                                 content_type="application/json")
+        with lock:
+            if response.status_code == 200:
+                results["login"].append(time.perf_counter() - arrival)
+            elif response.status_code == 503:
+                results["login_rejected"] += 1
+            else:
+                results["errors"] += 1
+
+    schedule = [(index / rate, search, index) for index in range(searches)]
+    schedule += [(burst_at, login, email) for email in emails]
+    schedule.sort(key=lambda item: item[0])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for offset, fn, arg in schedule:
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fn, start + offset, arg)
+    results["elapsed"] = time.perf_counter() - start
+    return results
+
+
+def summarize(name: str, results: dict) -> None:
+    searches = sorted(results["search"])
+    cuts = statistics.quantiles(searches, n=100)
+    line = f"{name:<16} search p50 {cuts[49] * 1000:7.1f}ms  p99 {cuts[98] * 1000:7.1f}ms"
+    logins = results["login"]
+    if logins or results["login_rejected"]:
+        window = max(logins) if logins else 0
+        line += (f"  logins {len(logins):>3} ok ({len(logins) / window if window else 0:5.1f}/s)"
+                 f"  {results['login_rejected']:>3} rejected")
+    print(line + f"  errors {results['errors']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--searches", type=int, default=60)
+    parser.add_argument("--rate", type=float, default=5, help="flight searches per second")
+    parser.add_argument("--logins", type=int, default=20, help="logins in the burst")
+    parser.add_argument("--workers", type=int, default=8, help="request worker threads")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub Amadeus latency in seconds")
+    parser.add_argument("--hash-workers", type=int, default=1)
+    parser.add_argument("--hash-pending", type=int, default=4)
+    args = parser.parse_args()
+
+    stub = start_stub_server(latency=args.latency)
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.sqlite3")
+    setup_django(db_path, stub.url, pool_size=args.workers)
+    logging.disable(logging.ERROR)
+
+    from authentication import hashing
+    emails = create_users(args.logins)
+    print(f"{args.searches} searches at {args.rate:.0f}/s, burst of {args.logins} logins, "
+          f"{args.workers} request workers, {os.cpu_count()} CPUs")
+
+    variants = [
+        ("searches only", hashing.PasswordHashingPool(workers=0), []),
+        ("inline hashing", hashing.PasswordHashingPool(workers=0), emails),
+        ("hashing pool", hashing.PasswordHashingPool(workers=args.hash_workers, max_pending=args.hash_pending), emails),
+    ]
+    for name, pool, logins in variants:
+        hashing._pool = pool
+        # The login views print every request
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = run(args.workers, args.searches, args.rate, logins, burst_at=0.5)
+        summarize(name, results)
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
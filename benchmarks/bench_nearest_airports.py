@@ -0,0 +1,85 @@
+"""
+Compare the nearest-airport KD-tree with a brute-force haversine scan.
+
+Queries are positions near randomly chosen airports (where users are)
+plus uniformly random points on the globe (open ocean, poles), each
+asking for the k nearest commercial airports:
+
+- scan: haversine to every indexed airport, then the k smallest;
+- kd-tree: flight_agent.geo.AirportLocator.nearest.
+
+Also checks that both return the same airports.
+
+Usage:
+    python -m benchmarks.bench_nearest_airports --queries 2000 --k 5
+"""
+
+import argparse
+import heapq
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from flight_agent.geo import get_airport_locator, haversine_km  # noqa: E402
+
+AIRPORT_LOCATOR = get_airport_locator()
+
+
+def scan_nearest(lat: float, lon: float, k: int) -> list:
+    return heapq.nsmallest(k, ((haversine_km(lat, lon, a.lat, a.lon), a.iata) for a in AIRPORT_LOCATOR.airports))
+
+
+def make_queries(count: int, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    queries = []
+    for index in range(count):
+        if index % 4:
+            airport = rng.choice(AIRPORT_LOCATOR.airports)
+            lat = max(-90.0, min(90.0, airport.lat + rng.uniform(-0.5, 0.5)))
+            queries.append((lat, (airport.lon + rng.uniform(-0.5, 0.5) + 180) % 360 - 180))
+        else:
+            queries.append((rng.uniform(-90, 90), rng.uniform(-180, 180)))
+    return queries
+
+
+def timed(fn, queries: list) -> list:
+    latencies = []
+    for lat, lon in queries:
+        start = time.perf_counter()
+        fn(lat, lon)
+        latencies.append(time.perf_counter() - start)
+    return sorted(latencies)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    queries = make_queries(args.queries)
+    print(f"{len(AIRPORT_LOCATOR.airports)} airports, {len(queries)} queries, k={args.k}")
+    print(f"{'variant':<10}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}")
+    variants = {
+        # The scan is slow; a tenth of the queries is enough to time it
+        "scan": (lambda lat, lon: scan_nearest(lat, lon, args.k), queries[::10]),
+        "kd-tree": (lambda lat, lon: AIRPORT_LOCATOR.nearest(lat, lon, args.k), queries),
+    }
+    for name, (fn, sample) in variants.items():
+        latencies = timed(fn, sample)
+        cuts = statistics.quantiles(latencies, n=100)
+        print(f"{name:<10}{statistics.fmean(latencies) * 1e6:>10.1f}{cuts[49] * 1e6:>10.1f}{cuts[98] * 1e6:>10.1f}")
+
+    sample = queries[::10]
+    mismatched = sum(1 for lat, lon in sample
+                     if [code for _, code in scan_nearest(lat, lon, args.k)]
+                     != [airport.iata for airport, _ in AIRPORT_LOCATOR.nearest(lat, lon, args.k)])
+    print(f"\nqueries where the kd-tree and the scan disagree: {mismatched} of {len(sample)}")
+
+
+if __name__ == "__main__":
+    main()
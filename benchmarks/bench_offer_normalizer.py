@@ -0,0 +1,135 @@
+"""
+Compare the flight-offer normalizer with the dict-building loop it replaced.
+
+Both variants turn the same synthetic flight-offers payload (250 offers by
+default, a third of them with a connection) into results:
+
+- legacy: the previous loop - nested .get chains, each timestamp parsed
+  twice (format_time and calculate_duration), a display dict per offer;
+- normalizer: flight_agent.offers.normalize_offers, which builds __slots__
+  FlightOffer/Segment objects and parses each timestamp once.
+
+Reports the best-of-N parse time and, via tracemalloc, the peak memory
+while parsing and the memory retained by the result. The cost of
+FlightOffer.to_dict(), paid only for offers that reach the API, is shown
+separately.
+
+Usage:
+    python -m benchmarks.bench_offer_normalizer --offers 250 --repeat 200
+"""
+
+import argparse
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.stub_amadeus import make_offer  # noqa: E402
+from flight_agent.offers import normalize_offers  # noqa: E402
+
+
+def make_payload(count: int, origin: str = "DEL", destination: str = "JFK", departure_date: str = "2030-01-15") -> list:
+    offers = []
+    for index in range(count):
+        offer = make_offer(index, origin, destination, departure_date)
+        if index % 3 == 0:
+            # Connect through a hub, arriving the next day
+            first = offer["itineraries"][0]["segments"][0]
+            first["arrival"]["iataCode"] = "DXB"
+            arrival = datetime.fromisoformat(first["arrival"]["at"]) + timedelta(hours=3)
+            offer["itineraries"][0]["segments"].append({
+                "carrierCode": "EK",
+                "number": str(500 + index),
+                "departure": {"iataCode": "DXB", "at": arrival.strftime("%Y-%m-%dT%H:%M:%S")},
+                "arrival": {"iataCode": destination, "at": (arrival + timedelta(hours=14)).strftime("%Y-%m-%dT%H:%M:%S")},
+            })
+            offer["itineraries"][0]["duration"] = "P1DT1H10M"
+        offers.append(offer)
+    return offers
+
+
+def _format_time(iso_time):
+    try:
+        return datetime.fromisoformat(iso_time.replace('Z', '+00:00')).strftime("%H:%M")
+    except Exception:
+        return iso_time
+
+
+def _calculate_duration(departure, arrival):
+    try:
+        duration = datetime.fromisoformat(arrival.replace('Z', '+00:00')) - datetime.fromisoformat(departure.replace('Z', '+00:00'))
+        return f"{duration.seconds // 3600}h {(duration.seconds % 3600) // 60}m"
+    except Exception:
+        return "N/A"
+
+
+def legacy_process(flights, origin, destination, formatted_date):
+    """The loop _process_search_response used before the normalizer"""
+    results = []
+    for flight in flights:
+        try:
+            airlines = flight.get("validatingAirlineCodes", [])
+            airline = airlines[0] if airlines else "Unknown"
+            total_price = flight.get("price", {}).get("total", "N/A")
+            itineraries = flight.get("itineraries", [])
+            if itineraries:
+                segments = itineraries[0].get("segments", [])
+                if segments:
+                    dep_time = segments[0].get("departure", {}).get("at", "N/A")
+                    arr_time = segments[-1].get("arrival", {}).get("at", "N/A")
+                    results.append({
+                        "airline": airline,
+                        "price": f"₹{total_price}",
+                        "departure_time": _format_time(dep_time),
+                        "arrival_time": _format_time(arr_time),
+                        "duration": _calculate_duration(dep_time, arr_time),
+                        "flight_number": f"{airline} {segments[0].get('number', '')}",
+                        "origin": origin.upper(),
+                        "destination": destination.upper(),
+                        "date": formatted_date
+                    })
+        except Exception:
+            continue
+    return results
+
+
+def measure_memory(fn):
+    tracemalloc.start()
+    result = fn()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return retained, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--offers", type=int, default=250)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    payload = make_payload(args.offers)
+    variants = {
+        "legacy": lambda: legacy_process(payload, "DEL", "JFK", "2030-01-15"),
+        "normalizer": lambda: normalize_offers(payload, "DEL", "JFK", "2030-01-15"),
+    }
+    offers = variants["normalizer"]()
+    variants["to_dict (boundary)"] = lambda: [offer.to_dict() for offer in offers]
+
+    print(f"{args.offers} offers, best of {args.repeat} runs")
+    print(f"{'variant':<20}{'parse ms':>10}{'peak KiB':>12}{'retained KiB':>14}")
+    for name, fn in variants.items():
+        best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        retained, peak = measure_memory(fn)
+        print(f"{name:<20}{best * 1000:>10.2f}{peak / 1024:>12.1f}{retained / 1024:>14.1f}")
+
+    legacy = variants["legacy"]()
+    wrong = sum(1 for old, new in zip(legacy, offers) if old["duration"] != new.to_dict()["duration"])
+    print(f"\nlegacy durations that dropped whole days: {wrong} of {len(legacy)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Compare flight_agent.query_parser with the extraction code it replaced.
+
+Runs both over a corpus of chat-style queries (templates expanded with
+real airport codes, city names and date phrases, with repeats, as in
+production traffic):
+
+- legacy: the previous extract_origin/extract_destination/extract_date
+  (regexes compiled on every call, if/elif date chains) followed by
+  parse_relative_date;
+- parser (cold): parse_query with its memo cleared before each pass;
+- parser (warm): parse_query with the memo populated.
+
+Also reports, over the distinct queries, how many routes and departure
+dates each variant got right.
+
+Usage:
+    python -m benchmarks.bench_query_parser --queries 5000 --repeat 5
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from flight_agent.query_parser import _parse, parse_query, resolve_date  # noqa: E402
+
+PLACES = ["DEL", "BOM", "BLR", "MAA", "HYD", "CCU", "GOI", "NYC", "LON", "DXB", "SIN",
+          "delhi", "mumbai", "goa", "london", "paris", "dubai", "singapore", "bangkok"]
+DATES = ["tomorrow", "today", "next friday", "on monday", "this saturday", "next week", "day after tomorrow",
+         "on 12 dec", "on the 5th", "jan 3rd", "in 2 weeks", "2026-12-24", "around next friday", "±2 days next sunday"]
+TEMPLATES = [
+    "Find flights from {o} to {d} {date}",
+    "flights from {o} to {d} {date}",
+    "{o} to {d} {date}",
+    "I want to fly from {o} to {d} {date}",
+    "cheapest flight to {d} {date} from {o}",
+    "Can you book me a ticket from {o} to {d} {date} please",
+    "show me {date} options {o} to {d}",
+    "need to go to {d} {date}",
+]
+
+
+def make_corpus(count: int, seed: int = 7) -> list:
+    """(query, expected origin, expected destination, expected date) tuples"""
+    rng = random.Random(seed)
+    distinct = []
+    for _ in range(max(1, count // 3)):
+        origin, destination = rng.sample(PLACES, 2)
+        template = rng.choice(TEMPLATES)
+        date = rng.choice(DATES)
+        query = template.format(o=origin, d=destination, date=date)
+        expected_date = resolve_date(date.replace("around ", "").replace("±2 days ", "").replace("on ", ""))
+        distinct.append((query, origin.upper() if "{o}" in template else "DEL", destination.upper(),
+                         expected_date.strftime("%Y-%m-%d")))
+    # Popular phrasings repeat, as in real traffic
+    return [distinct[min(len(distinct) - 1, int(rng.paretovariate(1.2)) - 1)] if rng.random() < 0.5
+            else rng.choice(distinct) for _ in range(count)]
+
+
+def legacy_extract_origin(query):
+    import re
+    match = re.compile(r'from\s+(\w+)', re.IGNORECASE).search(query)
+    return match.group(1).upper() if match else 'DEL'
+
+
+def legacy_extract_destination(query):
+    import re
+    match = re.compile(r'to\s+(\w+)', re.IGNORECASE).search(query)
+    return match.group(1).upper() if match else 'BOM'
+
+
+def legacy_extract_date(query):
+    query_lower = query.lower()
+    for phrase in ('tomorrow', 'today', 'next monday', 'next tuesday', 'next wednesday', 'next thursday',
+                   'next friday', 'next saturday', 'next sunday', 'next week'):
+        if phrase in query_lower:
+            return phrase
+    return 'tomorrow'
+
+
+def legacy_parse_relative_date(date_str):
+    today = datetime.now().date()
+    date_str_lower = date_str.lower().strip()
+    weekdays = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+    if date_str_lower == 'tomorrow':
+        return (today + timedelta(days=1)).strftime("%Y-%m-%d")
+    if date_str_lower == 'today':
+        return today.strftime("%Y-%m-%d")
+    for index, day in enumerate(weekdays):
+        if f'next {day}' in date_str_lower:
+            return (today + timedelta(days=(index - today.weekday()) % 7 or 7)).strftime("%Y-%m-%d")
+    if 'next week' in date_str_lower:
+        return (today + timedelta(days=7)).strftime("%Y-%m-%d")
+    return date_str
+
+
+def legacy_parse(query):
+    date = legacy_extract_date(query)
+    return legacy_extract_origin(query), legacy_extract_destination(query), legacy_parse_relative_date(date)
+
+
+def parser_parse(query):
+    parsed = parse_query(query)
+    return parsed.origin, parsed.destination, parsed.departure_date
+
+
+def run(corpus, parse, repeat, clear=False) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        if clear:
+            _parse.cache_clear()
+        start = time.perf_counter()
+        for query in corpus:
+            parse(query)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.queries)
+    queries = [query for query, *_ in corpus]
+    print(f"{len(queries)} queries ({len(set(queries))} distinct), best of {args.repeat} passes")
+    print(f"{'variant':<16}{'total ms':>10}{'us/query':>10}")
+    for name, parse, clear in (("legacy", legacy_parse, False),
+                               ("parser (cold)", parser_parse, True),
+                               ("parser (warm)", parser_parse, False)):
+        elapsed = run(queries, parse, args.repeat, clear)
+        print(f"{name:<16}{elapsed * 1000:>10.1f}{elapsed * 1e6 / len(queries):>10.2f}")
+
+    distinct = sorted(set(corpus))
+    for name, parse in (("legacy", legacy_parse), ("parser", parser_parse)):
+        routes = sum(1 for query, origin, destination, _ in distinct if parse(query)[:2] == (origin, destination))
+        dates = sum(1 for query, _, _, date in distinct if parse(query)[2] == date)
+        print(f"{name}: {routes}/{len(distinct)} routes right, {dates}/{len(distinct)} dates right")
+
+
+if __name__ == "__main__":
+    main()
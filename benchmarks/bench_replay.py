@@ -0,0 +1,99 @@
+"""
+Record flight searches against the stub Amadeus server, then replay them offline.
+
+Runs the same queries through FlightAgentService.run_query plus the
+history saves (the parse, format and persist path of a search request)
+twice, with the flight offer cache disabled:
+
+- record: AMADEUS_TRANSPORT=record against the local stub server, with
+  its artificial latency;
+- replay: AMADEUS_TRANSPORT=replay from the fixtures just recorded, with
+  the stub server shut down.
+
+Also checks that every replayed reply matches the recorded one.
+
+Usage:
+    python -m benchmarks.bench_replay --queries 200 --latency 0.1
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+from benchmarks.bench_async_search import BENCH_EMAIL, setup_django  # noqa: E402
+from benchmarks.stub_amadeus import start_stub_server  # noqa: E402
+
+ROUTES = ["DEL to BOM", "BOM to BLR", "London to Paris", "NYC to LAX", "Dubai to Mumbai"]
+
+
+def use_transport(mode: str) -> None:
+    """Switch transport mode; clients and token managers pick it up when they are next created"""
+    from django.conf import settings
+    from flight_agent import amadeus_auth, amadeus_client
+    settings.AMADEUS_TRANSPORT = mode
+    amadeus_client._clients.clear()
+    amadeus_auth._managers.clear()
+
+
+def run(queries: list) -> tuple:
+    from authentication.models import AppUser
+    from flight_agent.flight_service import FlightAgentService
+    from flight_agent.history import save_query_result, save_user_message
+
+    user = AppUser.objects.get(email=BENCH_EMAIL)
+    service = FlightAgentService()
+    latencies, replies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        save_user_message(user, query)
+        result = service.run_query(query)
+        save_query_result(user, result)
+        latencies.append(time.perf_counter() - start)
+        replies.append(result.response)
+    return sorted(latencies), replies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.1, help="stub Amadeus latency in seconds")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    stub = start_stub_server(latency=args.latency)
+    setup_django(os.path.join(tmp, "bench.sqlite3"), stub.url, pool_size=4)
+    from django.conf import settings
+    from flight_agent.fixtures import get_fixture_store
+    settings.AMADEUS_FIXTURES_PATH = os.path.join(tmp, "amadeus.jsonl.gz")
+
+    queries = [f"flights from {ROUTES[index % len(ROUTES)]} in {index % 20 + 1} days" for index in range(args.queries)]
+    print(f"{len(queries)} queries, stub latency {args.latency * 1000:.0f}ms")
+    print(f"{'mode':<8}{'total s':>9}{'p50 ms':>9}{'p99 ms':>9}")
+
+    results = {}
+    for mode in ("record", "replay"):
+        use_transport(mode)
+        if mode == "replay":
+            stub.shutdown()
+            stub.server_close()
+        latencies, replies = run(queries)
+        results[mode] = replies
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        print(f"{mode:<8}{sum(latencies):>9.2f}{cuts[49] * 1000:>9.2f}{cuts[98] * 1000:>9.2f}")
+
+    store = get_fixture_store()
+    size = os.path.getsize(settings.AMADEUS_FIXTURES_PATH)
+    print(f"\nfixture store: {store.stats()}, {size / 1024:.1f} KB on disk")
+    mismatched = sum(recorded != replayed for recorded, replayed in zip(results["record"], results["replay"]))
+    print(f"replies that differ between record and replay: {mismatched} of {len(queries)}")
+
+
+if __name__ == "__main__":
+    main()
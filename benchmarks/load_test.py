@@ -0,0 +1,165 @@
+"""
+Open-loop load generator for a running server.
+
+Drives a mix of flight searches (/api/flight-search/), chat history reads
+(/api/chat-history/) and the auth endpoints (/api/auth/login/,
+/api/auth/validate/) at a target rate for a fixed time, then reports
+throughput and p50/p95/p99 latency per endpoint. Requests are sent on a
+schedule (Poisson arrivals at --rps) whether or not earlier ones have
+finished, and latency counts from each request's scheduled time, so a
+server that falls behind shows it in the percentiles instead of quietly
+receiving less load.
+
+For capacity planning without the real Amadeus API, run the app against
+the stand-in server (see benchmarks.stub_amadeus):
+
+    python -m benchmarks.stub_amadeus --port 8765 --latency 0.4 --error-rate 0.02
+    AMADEUS_BASE_URL=http://127.0.0.1:8765 gunicorn backend.wsgi --threads 8
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8000 --rps 20 --duration 60
+
+Test users (loadtest-<n>@example.com) are signed up on first use.
+"""
+
+import argparse
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+PASSWORD = "load-test-password"
+ROUTES = [("DEL", "BOM"), ("BOM", "BLR"), ("DEL", "BLR"), ("BLR", "MAA"), ("HYD", "DEL"), ("CCU", "DEL"),
+          ("London", "Paris"), ("NYC", "LAX"), ("Dubai", "Mumbai"), ("SIN", "BKK")]
+DEFAULT_MIX = "search=5,chat_history=3,login=1,validate=1"
+
+
+def parse_mix(text: str) -> dict:
+    """'search=5,login=1' -> {'search': 5.0, 'login': 1.0}"""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r}; choose from {', '.join(ENDPOINTS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def search(session, base_url, user, rng):
+    origin, destination = rng.choice(ROUTES)
+    query = f"flights from {origin} to {destination} in {rng.randint(1, user['days'])} days"
+    return session.post(f"{base_url}/api/flight-search/", json={"query": query}, headers=user["headers"], timeout=60)
+
+
+def chat_history(session, base_url, user, rng):
+    return session.get(f"{base_url}/api/chat-history/", headers=user["headers"], timeout=60)
+
+
+def login(session, base_url, user, rng):
+    return session.post(f"{base_url}/api/auth/login/", json={"email": user["email"], "password": PASSWORD}, timeout=60)
+
+
+def validate(session, base_url, user, rng):
+    return session.get(f"{base_url}/api/auth/validate/", headers=user["headers"], timeout=60)
+
+
+ENDPOINTS = {"search": search, "chat_history": chat_history, "login": login, "validate": validate}
+
+
+def sign_in(base_url: str, count: int, days: int) -> list:
+    """Sign up (if needed) and log in the test users, returning their auth headers"""
+    users = []
+    with requests.Session() as session:
+        for index in range(count):
+            email = f"loadtest-{index}@example.com"
+            session.post(f"{base_url}/api/auth/signup/", json={
+                "email": email, "name": f"Load test {index}", "password": PASSWORD, "confirm_password": PASSWORD,
+            }, timeout=60)
+            response = session.post(f"{base_url}/api/auth/login/", json={"email": email, "password": PASSWORD}, timeout=60)
+            response.raise_for_status()
+            token = response.json()["token"]
+            users.append({"email": email, "headers": {"Authorization": f"Bearer {token}"}, "days": days})
+    return users
+
+
+def run(base_url: str, users: list, mix: dict, rps: float, duration: float, workers: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    schedule, at = [], 0.0
+    while True:
+        at += rng.expovariate(rps)
+        if at >= duration:
+            break
+        schedule.append((at, rng.choices(names, weights)[0], rng.choice(users), rng.random()))
+
+    local = threading.local()
+    lock = threading.Lock()
+    results = defaultdict(lambda: {"latencies": [], "statuses": defaultdict(int)})
+
+    def send(scheduled, name, user, request_seed):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        try:
+            status = ENDPOINTS[name](local.session, base_url, user, random.Random(request_seed)).status_code
+        except requests.RequestException as e:
+            status = type(e).__name__
+        latency = time.perf_counter() - scheduled
+        with lock:
+            results[name]["latencies"].append(latency)
+            results[name]["statuses"][status] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for at, name, user, request_seed in schedule:
+            delay = start + at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, start + at, name, user, request_seed)
+    return {"elapsed": time.perf_counter() - start, "endpoints": results, "scheduled": len(schedule)}
+
+
+def report(stats: dict) -> None:
+    elapsed = stats["elapsed"]
+    print(f"{stats['scheduled']} requests in {elapsed:.1f}s")
+    print(f"{'endpoint':<14}{'requests':>9}{'ok/s':>8}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}  statuses")
+    everything = {"latencies": [], "statuses": defaultdict(int)}
+    rows = sorted(stats["endpoints"].items())
+    for name, result in rows:
+        everything["latencies"] += result["latencies"]
+        for status, count in result["statuses"].items():
+            everything["statuses"][status] += count
+    for name, result in rows + [("all", everything)]:
+        latencies = sorted(result["latencies"])
+        if not latencies:
+            continue
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+        ok = sum(count for status, count in result["statuses"].items() if isinstance(status, int) and status < 400)
+        statuses = " ".join(f"{status}:{count}" for status, count in sorted(result["statuses"].items(), key=str))
+        print(f"{name:<14}{len(latencies):>9}{ok / elapsed:>8.1f}{len(latencies) - ok:>8}{cuts[49] * 1000:>9.0f}"
+              f"{cuts[94] * 1000:>9.0f}{cuts[98] * 1000:>9.0f}{latencies[-1] * 1000:>9.0f}  {statuses}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rps", type=float, default=10, help="target requests per second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"endpoint weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--users", type=int, default=20, help="test users the requests are spread over")
+    parser.add_argument("--days", type=int, default=30,
+                        help="searches pick a date up to this many days ahead; fewer means more cache hits")
+    parser.add_argument("--workers", type=int, default=200, help="most requests in flight at once")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    base_url = args.base_url.rstrip("/")
+    users = sign_in(base_url, args.users, args.days)
+    print(f"{args.rps:g} req/s for {args.duration:g}s against {base_url}, {len(users)} users, mix {args.mix}")
+    report(run(base_url, users, args.mix, args.rps, args.duration, args.workers, args.seed))
+
+
+if __name__ == "__main__":
+    main()
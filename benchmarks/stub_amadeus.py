@@ -0,0 +1,188 @@
+"""
+Local stand-in for the Amadeus API used by the benchmarks and load tests.
+
+Serves /v1/security/oauth2/token and /v2/shopping/flight-offers so
+benchmarks never touch the real API. Search latency, error rate and
+payload size are configurable to match what production sees:
+
+- latency: median seconds per search; with latency_sigma > 0 each search
+  draws from a lognormal distribution around it (a long right tail, like
+  the real API), capped at max_latency;
+- error_rate: fraction of searches answered with a 500, 503 or 429
+  (with Retry-After) instead of offers;
+- offers / offer_bytes: offers per response (at most the request's `max`)
+  and roughly how large each one is; real offers carry 2-4 KB of fare
+  details per passenger.
+
+Run standalone and point the app at it with AMADEUS_BASE_URL:
+
+    python -m benchmarks.stub_amadeus --port 8765 --latency 0.4 --latency-sigma 0.5 --error-rate 0.02
+    AMADEUS_BASE_URL=http://127.0.0.1:8765 python manage.py runserver
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+ERROR_STATUSES = (500, 503, 429)
+
+
+def make_offer(index: int, origin: str, destination: str, departure_date: str, offer_bytes: int = 0) -> dict:
+    departure = datetime.strptime(departure_date, "%Y-%m-%d") + timedelta(hours=6, minutes=15 * index)
+    arrival = departure + timedelta(hours=2, minutes=10)
+    offer = {
+        "type": "flight-offer",
+        "id": str(index + 1),
+        "validatingAirlineCodes": ["AI"],
+        "price": {"currency": "INR", "total": f"{4500 + 137 * index:.2f}"},
+        "itineraries": [{
+            "duration": "PT2H10M",
+            "segments": [{
+                "carrierCode": "AI",
+                "number": str(800 + index),
+                "departure": {"iataCode": origin, "at": departure.strftime("%Y-%m-%dT%H:%M:%S")},
+                "arrival": {"iataCode": destination, "at": arrival.strftime("%Y-%m-%dT%H:%M:%S")},
+            }],
+        }],
+    }
+    if offer_bytes:
+        # Stands in for the fare details the app ignores but still has to download and parse
+        detail = {"segmentId": "1", "cabin": "ECONOMY", "fareBasis": "UL0AVNNI", "class": "U",
+                  "includedCheckedBags": {"weight": 15, "weightUnit": "KG"}}
+        count = max(1, offer_bytes // len(json.dumps(detail)))
+        offer["travelerPricings"] = [{"travelerId": "1", "fareOption": "STANDARD",
+                                      "fareDetailsBySegment": [detail] * count}]
+    return offer
+
+
+class StubAmadeusHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers: Optional[dict] = None) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if urlparse(self.path).path != "/v1/security/oauth2/token":
+            return self._send_json(404, {"error": "not found"})
+        self.server.count("tokens")
+        self._send_json(200, {"access_token": "stub-token", "expires_in": 1799, "token_type": "Bearer"})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/v2/shopping/flight-offers":
+            return self._send_json(404, {"error": "not found"})
+
+        server = self.server
+        time.sleep(server.draw_latency())
+        server.count("searches")
+        if server.error_rate and server.random() < server.error_rate:
+            status = server.choice(ERROR_STATUSES)
+            server.count("errors")
+            headers = {"Retry-After": "1"} if status == 429 else None
+            return self._send_json(status, {"errors": [{"status": status, "title": "STUB ERROR"}]}, headers)
+
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        count = int(params.get("max", 5))
+        if server.offers is not None:
+            count = min(count, server.offers)
+        offers = [
+            make_offer(i, params["originLocationCode"], params["destinationLocationCode"], params["departureDate"],
+                       server.offer_bytes)
+            for i in range(count)
+        ]
+        self._send_json(200, {"meta": {"count": len(offers)}, "data": offers})
+
+
+class StubAmadeusServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, latency: float = 0.2, latency_sigma: float = 0.0, max_latency: float = 30.0,
+                 error_rate: float = 0.0, offers: Optional[int] = None, offer_bytes: int = 0, seed: int = 7):
+        super().__init__(address, StubAmadeusHandler)
+        self.latency = latency
+        self.latency_sigma = latency_sigma
+        self.max_latency = max_latency
+        self.error_rate = error_rate
+        self.offers = offers
+        self.offer_bytes = offer_bytes
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.tokens = self.searches = self.errors = 0
+
+    def draw_latency(self) -> float:
+        if self.latency_sigma <= 0 or self.latency <= 0:
+            return self.latency
+        with self._lock:
+            return min(self._random.lognormvariate(math.log(self.latency), self.latency_sigma), self.max_latency)
+
+    def random(self) -> float:
+        with self._lock:
+            return self._random.random()
+
+    def choice(self, options):
+        with self._lock:
+            return self._random.choice(options)
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+def start_stub_server(latency: float = 0.2, host: str = "127.0.0.1", port: int = 0, **options) -> StubAmadeusServer:
+    """
+    Start the stub server in a daemon thread and return it; its URL is
+    `server.url`. `options` are StubAmadeusServer's latency_sigma,
+    max_latency, error_rate, offers, offer_bytes and seed.
+    """
+    server = StubAmadeusServer((host, port), latency=latency, **options)
+    server.url = f"http://{host}:{server.server_port}"
+    threading.Thread(target=server.serve_forever, name="stub-amadeus", daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.4, help="median search latency in seconds")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="lognormal sigma; 0 for a fixed latency")
+    parser.add_argument("--max-latency", type=float, default=30.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of searches that fail")
+    parser.add_argument("--offers", type=int, default=None, help="most offers per response (default: the request's max)")
+    parser.add_argument("--offer-bytes", type=int, default=2000, help="approximate size of each offer")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    server = start_stub_server(args.latency, args.host, args.port, latency_sigma=args.latency_sigma,
+                               max_latency=args.max_latency, error_rate=args.error_rate, offers=args.offers,
+                               offer_bytes=args.offer_bytes, seed=args.seed)
+    print(f"Stub Amadeus listening on {server.url} (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"{server.searches} searches, {server.errors} errors, {server.tokens} tokens")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import csv
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+
+
+def load_metro_areas(path: Path = DATA_DIR / "metro_areas.csv") -> Dict[str, Tuple[str, ...]]:
+    """
+    Load the city -> airports mapping, keyed by both the IATA city code
+    (LON) and the upper-cased city name (LONDON). Airports are listed
+    primary airport first.
+    """
+    metro_areas: Dict[str, Tuple[str, ...]] = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            airport = row["airport_code"]
+            for key in (row["city_code"], row["city_name"].upper()):
+                metro_areas[key] = metro_areas.get(key, ()) + (airport,)
+    return metro_areas
+
+
+_metro_areas: Optional[Dict[str, Tuple[str, ...]]] = None
+_metro_areas_lock = threading.Lock()
+
+
+def get_metro_areas() -> Dict[str, Tuple[str, ...]]:
+    """Return the process-wide city -> airports mapping, loaded on first use (FlightAgentConfig.ready loads it at startup)"""
+    global _metro_areas
+    if _metro_areas is None:
+        with _metro_areas_lock:
+            if _metro_areas is None:
+                _metro_areas = load_metro_areas()
+                logger.info(f"🗺️ Loaded {len(_metro_areas)} metropolitan area keys")
+    return _metro_areas
+
+
+def expand_location(code: str) -> Tuple[str, ...]:
+    """Return the airports serving a city code or name, or the code itself"""
+    code = code.strip().upper()
+    return get_metro_areas().get(code, (code,))
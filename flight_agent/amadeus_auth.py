@@ -0,0 +1,143 @@
+import threading
+import time
+import logging
+from typing import Dict, Optional, Tuple
+
+from .amadeus_client import AmadeusClient
+
+logger = logging.getLogger(__name__)
+
+
+class AmadeusAuthError(Exception):
+    """Raised when an access token cannot be obtained from Amadeus"""
+
+
+class AmadeusTokenManager:
+    """
+    Caches the Amadeus OAuth access token for the lifetime Amadeus grants it.
+
+    Tokens are reused until `expiry_margin` seconds before they expire. Once a
+    token enters the last `refresh_ahead` seconds of its life, callers keep
+    using it while a single background thread fetches the next one. Both are
+    capped for short-lived tokens, to a quarter and half of the token's
+    lifetime, so a token granted for less than `refresh_ahead` seconds is
+    still used for a while before it is renewed. Token fetches are
+    single-flight: concurrent callers wait on one request instead of each
+    hitting the token endpoint.
+    """
+
+    TOKEN_PATH = "/v1/security/oauth2/token"
+
+    def __init__(self, client: AmadeusClient, client_id: str, client_secret: str,
+                 expiry_margin: float = 60, refresh_ahead: float = 300):
+        self.client = client
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.expiry_margin = expiry_margin
+        self.refresh_ahead = max(refresh_ahead, expiry_margin)
+
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        # expiry_margin and refresh_ahead as capped for the current token's lifetime
+        self._margin = self.expiry_margin
+        self._lead = self.refresh_ahead
+        self._fetch_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._background_refresh = False
+
+    def get_token(self) -> str:
+        """Return a valid access token, fetching one only when necessary"""
+        return self.cached_token() or self._refresh(self._margin)
+
+    def cached_token(self) -> Optional[str]:
+        """Return the cached token without blocking, or None when it has to be fetched"""
+        token, expires_at, margin, lead = self._token, self._expires_at, self._margin, self._lead
+        now = time.monotonic()
+
+        if token and now < expires_at - margin:
+            if now >= expires_at - lead:
+                self._refresh_in_background()
+            return token
+        return None
+
+    def invalidate(self, token: str) -> None:
+        """Drop `token` from the cache, e.g. after Amadeus rejected it with 401"""
+        with self._fetch_lock:
+            if self._token == token:
+                logger.info("🔐 Invalidating cached access token")
+                self._token = None
+                self._expires_at = 0.0
+
+    def _is_fresh(self, margin: float) -> bool:
+        return bool(self._token) and time.monotonic() < self._expires_at - margin
+
+    def _refresh(self, margin: float) -> str:
+        with self._fetch_lock:
+            # Another thread may have fetched a token while we waited
+            if self._is_fresh(margin):
+                return self._token
+
+            token, expires_in = self._request_token()
+            self._margin = min(self.expiry_margin, expires_in / 4)
+            self._lead = min(self.refresh_ahead, expires_in / 2)
+            self._token = token
+            self._expires_at = time.monotonic() + expires_in
+            return token
+
+    def _refresh_in_background(self) -> None:
+        with self._state_lock:
+            if self._background_refresh:
+                return
+            self._background_refresh = True
+
+        def run():
+            try:
+                self._refresh(self._lead)
+            except Exception as e:
+                logger.warning(f"⚠️ Background token refresh failed: {e}")
+            finally:
+                with self._state_lock:
+                    self._background_refresh = False
+
+        threading.Thread(target=run, name="amadeus-token-refresh", daemon=True).start()
+
+    def _request_token(self) -> Tuple[str, float]:
+        logger.info("🔐 Getting access token...")
+        token_data = {
+            "grant_type": "client_credentials",
+            "client_id": self.client_id,
+            "client_secret": self.client_secret
+        }
+        token_headers = {
+            "Content-Type": "application/x-www-form-urlencoded"
+        }
+
+        token_response = self.client.post(self.TOKEN_PATH, data=token_data, headers=token_headers)
+        logger.info(f"🔐 Token response status: {token_response.status_code}")
+
+        if token_response.status_code != 200:
+            raise AmadeusAuthError(f"Authentication failed: {token_response.status_code} - {token_response.text}")
+
+        token_json = token_response.json()
+        access_token = token_json.get("access_token")
+        if not access_token:
+            raise AmadeusAuthError("Failed to get access token from Amadeus API")
+
+        expires_in = float(token_json.get("expires_in", 0))
+        logger.info(f"✅ Successfully obtained access token (expires in {int(expires_in)}s)")
+        return access_token, expires_in
+
+
+_managers: Dict[Tuple[str, str], AmadeusTokenManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_token_manager(client: AmadeusClient, client_id: str, client_secret: str) -> AmadeusTokenManager:
+    """Return the process-wide token manager for these credentials"""
+    key = (client.base_url, client_id)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None or manager.client_secret != client_secret:
+            manager = AmadeusTokenManager(client, client_id, client_secret)
+            _managers[key] = manager
+        return manager
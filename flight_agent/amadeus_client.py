@@ -0,0 +1,227 @@
+import random
+import threading
+import time
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .conf import get_setting
+from .fixtures import PASSTHROUGH, RECORD, REPLAY, FixtureStore, get_fixture_store, get_transport
+from .rate_limit import TokenBucketLimiter, get_rate_limiter
+from .resilience import EndpointPolicy, get_endpoint_policies
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://test.api.amadeus.com"
+
+# Statuses worth retrying: rate limited or a transient server-side failure
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def backoff_delay(attempt: int, backoff: float, max_backoff: float) -> float:
+    """Full-jitter exponential backoff, so retries from concurrent workers don't line up"""
+    return random.uniform(0, min(max_backoff, backoff * (2 ** attempt)))
+
+
+def retry_after_seconds(headers) -> Optional[float]:
+    """Parse a Retry-After header given either in seconds or as an HTTP date"""
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AmadeusClient:
+    """
+    Keep-alive HTTP client for the Amadeus API.
+
+    All calls share one connection pool, so TCP and TLS handshakes are paid
+    once per connection instead of once per request. Every call has connect
+    and read timeouts, and 429/5xx responses and connection failures are
+    retried a bounded number of times with jittered exponential backoff,
+    honoring `Retry-After` when Amadeus sends it. With a `rate_limiter`,
+    every attempt (retries included) first takes a token from it.
+
+    `policies` maps request paths to an EndpointPolicy: attempts on those
+    paths go through its circuit breaker (CircuitOpenError when open), and
+    GETs on hedged endpoints send a second copy when the first has not
+    answered by the endpoint's p95 latency, using whichever returns first.
+
+    `transport` RECORD saves every final response to `fixtures`; REPLAY
+    answers from `fixtures` without touching the network, rate limiter or
+    circuit breakers (see flight_agent.fixtures).
+    """
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, pool_size: int = 20,
+                 connect_timeout: float = 3.05, read_timeout: float = 20,
+                 max_retries: int = 2, backoff: float = 0.5, max_backoff: float = 8,
+                 rate_limiter: Optional[TokenBucketLimiter] = None,
+                 policies: Optional[Dict[str, EndpointPolicy]] = None,
+                 transport: str = PASSTHROUGH, fixtures: Optional[FixtureStore] = None):
+        self.base_url = base_url.rstrip("/")
+        self.transport = transport
+        self.fixtures = fixtures
+        self.rate_limiter = rate_limiter
+        self.policies = policies or {}
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+        })
+        self.pool_size = pool_size
+        # Created on the first hedged call, so clients without hedged endpoints never start one
+        self._hedge_pool: Optional[ThreadPoolExecutor] = None
+        self._hedge_pool_lock = threading.Lock()
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Send a request, retrying transient failures, or answer it from the fixture store"""
+        if self.transport == REPLAY:
+            return self.fixtures.replay(method, path, kwargs.get("params"))
+        response = self._request(method, path, **kwargs)
+        if self.transport == RECORD:
+            self.fixtures.record(method, path, kwargs.get("params"), response)
+        return response
+
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        url = f"{self.base_url}{path}"
+        kwargs.setdefault("timeout", self.timeout)
+        policy = self.policies.get(path)
+
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            if policy is not None:
+                policy.check()
+            try:
+                response = self._send(policy, method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt, self.backoff, self.max_backoff)
+                logger.warning(f"🔁 {method} {path} failed ({e}), retrying in {delay:.2f}s")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+
+                retry_after = retry_after_seconds(response.headers)
+                if retry_after is not None and retry_after > self.max_backoff:
+                    # Waiting that long would tie up the worker - let the caller handle it
+                    return response
+                delay = retry_after if retry_after is not None else backoff_delay(attempt, self.backoff, self.max_backoff)
+                logger.warning(f"🔁 {method} {path} returned {response.status_code}, retrying in {delay:.2f}s")
+                response.close()
+
+            attempt += 1
+            time.sleep(delay)
+
+    def _send(self, policy: Optional[EndpointPolicy], method: str, url: str, **kwargs) -> requests.Response:
+        def send():
+            return self.session.request(method, url, **kwargs)
+
+        if policy is None:
+            return send()
+        hedge_delay = policy.hedge_delay() if method == "GET" else None
+        if hedge_delay is None:
+            return policy.observe(send)
+
+        hedge_pool = self._get_hedge_pool()
+        first = hedge_pool.submit(policy.observe, send)
+        try:
+            return first.result(timeout=hedge_delay)
+        except FutureTimeout:
+            pass
+        # Only hedge with spare quota; otherwise keep waiting on the first attempt
+        if self.rate_limiter is not None and not self.rate_limiter.try_acquire():
+            return first.result()
+
+        policy.count("hedged")
+        second = hedge_pool.submit(policy.observe, send)
+        pending = {first, second}
+        failed = []
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None and future.result().status_code < 500:
+                    if future is second:
+                        policy.count("hedge_wins")
+                    for other in pending:
+                        other.add_done_callback(_close_response)
+                    return future.result()
+                failed.append(future)
+
+        # Neither attempt succeeded: prefer a response the retry loop can inspect over an exception
+        responses = [future for future in failed if future.exception() is None]
+        for future in responses[1:]:
+            future.result().close()
+        return (responses[0] if responses else first).result()
+
+    def _get_hedge_pool(self) -> ThreadPoolExecutor:
+        """Hedged calls run both attempts here so the caller can wait on whichever finishes first"""
+        with self._hedge_pool_lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(max_workers=self.pool_size * 2,
+                                                      thread_name_prefix="amadeus-hedge")
+            return self._hedge_pool
+
+
+def _close_response(future) -> None:
+    if future.exception() is None:
+        future.result().close()
+
+
+def transport_options() -> Dict:
+    """The transport and fixture store arguments for a client, from AMADEUS_TRANSPORT"""
+    transport = get_transport()
+    return {"transport": transport, "fixtures": get_fixture_store() if transport != PASSTHROUGH else None}
+
+
+_clients: Dict[str, AmadeusClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_amadeus_client(base_url: Optional[str] = None) -> AmadeusClient:
+    """Return the process-wide client (and connection pool) for `base_url`"""
+    base_url = (base_url or get_setting("AMADEUS_BASE_URL", DEFAULT_BASE_URL)).rstrip("/")
+    with _clients_lock:
+        client = _clients.get(base_url)
+        if client is None:
+            client = AmadeusClient(
+                base_url,
+                pool_size=get_setting("AMADEUS_HTTP_POOL_SIZE", 20),
+                connect_timeout=get_setting("AMADEUS_CONNECT_TIMEOUT", 3.05),
+                read_timeout=get_setting("AMADEUS_READ_TIMEOUT", 20.0),
+                max_retries=get_setting("AMADEUS_MAX_RETRIES", 2),
+                backoff=get_setting("AMADEUS_RETRY_BACKOFF", 0.5),
+                max_backoff=get_setting("AMADEUS_RETRY_MAX_BACKOFF", 8.0),
+                rate_limiter=get_rate_limiter(),
+                policies=get_endpoint_policies(),
+                **transport_options(),
+            )
+            _clients[base_url] = client
+        return client
@@ -1,6 +1,49 @@
+import sys
+from pathlib import Path
+
 from django.apps import AppConfig
 
+from .conf import get_setting
+
+# Process names of the WSGI/ASGI servers the app is deployed under
+SERVER_PROGRAMS = frozenset(("gunicorn", "uvicorn", "daphne", "hypercorn", "uwsgi", "waitress-serve"))
+
 
 class FlightAgentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'flight_agent'
+
+    def ready(self):
+        # Load the bundled location data at startup rather than on the first search
+        from .airports import get_metro_areas
+        from .geo import get_airport_locator
+        from .resolver import get_location_index
+        get_metro_areas()
+        get_location_index()
+        get_airport_locator()
+
+        if self._serves_requests():
+            from .autocomplete import warm_airport_autocomplete
+            warm_airport_autocomplete()
+
+            from .prewarm import start_prewarm_scheduler
+            start_prewarm_scheduler()
+
+    @staticmethod
+    def _serves_requests() -> bool:
+        """
+        Whether this process serves web traffic: started by one of
+        SERVER_PROGRAMS or `manage.py runserver`, unless FLIGHT_SERVES_REQUESTS
+        says otherwise. Management commands, workers and test runners do not.
+        Under runserver's autoreloader both the watcher and the server
+        process count; the prewarm scheduler elects a single process per
+        run, so the extra one does no upstream work.
+        """
+        configured = get_setting("FLIGHT_SERVES_REQUESTS", None)
+        if configured is not None:
+            return str(configured).strip().lower() in ("1", "true", "yes", "on")
+        program = Path(sys.argv[0])
+        # `python -m gunicorn` runs gunicorn/__main__.py
+        if program.stem in SERVER_PROGRAMS or (program.stem == "__main__" and program.parent.name in SERVER_PROGRAMS):
+            return True
+        return program.name == "manage.py" and len(sys.argv) > 1 and sys.argv[1] == "runserver"
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import weakref
+from typing import Dict, Optional
+
+import httpx
+
+from .amadeus_client import DEFAULT_BASE_URL, RETRY_STATUSES, transport_options, backoff_delay, retry_after_seconds
+from .conf import get_setting
+from .fixtures import PASSTHROUGH, RECORD, REPLAY, FixtureStore
+from .rate_limit import TokenBucketLimiter, get_rate_limiter
+from .resilience import EndpointPolicy, get_endpoint_policies
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAmadeusClient:
+    """
+    Async counterpart of AmadeusClient built on httpx.
+
+    Uses the same pool size, timeouts, retry policy, rate limiter, circuit
+    breakers, hedging and record/replay transport, but
+    waits on the network without holding a thread, so one ASGI worker can
+    keep many searches in flight.
+    """
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, pool_size: int = 20,
+                 connect_timeout: float = 3.05, read_timeout: float = 20,
+                 max_retries: int = 2, backoff: float = 0.5, max_backoff: float = 8,
+                 rate_limiter: Optional[TokenBucketLimiter] = None,
+                 policies: Optional[Dict[str, EndpointPolicy]] = None,
+                 transport: str = PASSTHROUGH, fixtures: Optional[FixtureStore] = None):
+        self.base_url = base_url.rstrip("/")
+        self.transport = transport
+        self.fixtures = fixtures
+        self.rate_limiter = rate_limiter
+        self.policies = policies or {}
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            headers={
+                "Accept": "application/json",
+                "Accept-Encoding": "gzip, deflate",
+            },
+        )
+
+    async def get(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", path, **kwargs)
+
+    async def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """Send a request, retrying transient failures, or answer it from the fixture store"""
+        if self.transport == REPLAY:
+            return self.fixtures.replay(method, path, kwargs.get("params"))
+        response = await self._request(method, path, **kwargs)
+        if self.transport == RECORD:
+            # The store appends to a gzip file, so keep that off the event loop
+            await asyncio.to_thread(self.fixtures.record, method, path, kwargs.get("params"), response)
+        return response
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        policy = self.policies.get(path)
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.aacquire()
+            if policy is not None:
+                policy.check()
+            try:
+                response = await self._send(policy, method, path, **kwargs)
+            except (httpx.ConnectError, httpx.TimeoutException) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt, self.backoff, self.max_backoff)
+                logger.warning(f"🔁 {method} {path} failed ({e}), retrying in {delay:.2f}s")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+
+                retry_after = retry_after_seconds(response.headers)
+                if retry_after is not None and retry_after > self.max_backoff:
+                    return response
+                delay = retry_after if retry_after is not None else backoff_delay(attempt, self.backoff, self.max_backoff)
+                logger.warning(f"🔁 {method} {path} returned {response.status_code}, retrying in {delay:.2f}s")
+                await response.aclose()
+
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _send(self, policy: Optional[EndpointPolicy], method: str, path: str, **kwargs) -> httpx.Response:
+        def send():
+            return self.client.request(method, path, **kwargs)
+
+        if policy is None:
+            return await send()
+        hedge_delay = policy.hedge_delay() if method == "GET" else None
+        if hedge_delay is None:
+            return await policy.aobserve(send)
+
+        first = asyncio.ensure_future(policy.aobserve(send))
+        done, _ = await asyncio.wait({first}, timeout=hedge_delay)
+        if done:
+            return first.result()
+        # Only hedge with spare quota; otherwise keep waiting on the first attempt
+        if self.rate_limiter is not None and not self.rate_limiter.try_acquire():
+            return await first
+
+        policy.count("hedged")
+        second = asyncio.ensure_future(policy.aobserve(send))
+        pending = {first, second}
+        failed = []
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result().status_code < 500:
+                        if task is second:
+                            policy.count("hedge_wins")
+                        return task.result()
+                    failed.append(task)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        # Neither attempt succeeded: prefer a response the retry loop can inspect over an exception
+        responses = [task for task in failed if task.exception() is None]
+        for task in responses[1:]:
+            await task.result().aclose()
+        return (responses[0] if responses else first).result()
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+# httpx connection pools belong to the event loop that created them
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, AsyncAmadeusClient]]" = weakref.WeakKeyDictionary()
+
+
+def get_async_amadeus_client(base_url: Optional[str] = None) -> AsyncAmadeusClient:
+    """Return the shared async client for `base_url` on the running event loop"""
+    base_url = (base_url or get_setting("AMADEUS_BASE_URL", DEFAULT_BASE_URL)).rstrip("/")
+    loop_clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    client = loop_clients.get(base_url)
+    if client is None:
+        client = AsyncAmadeusClient(
+            base_url,
+            pool_size=get_setting("AMADEUS_HTTP_POOL_SIZE", 20),
+            connect_timeout=get_setting("AMADEUS_CONNECT_TIMEOUT", 3.05),
+            read_timeout=get_setting("AMADEUS_READ_TIMEOUT", 20.0),
+            max_retries=get_setting("AMADEUS_MAX_RETRIES", 2),
+            backoff=get_setting("AMADEUS_RETRY_BACKOFF", 0.5),
+            max_backoff=get_setting("AMADEUS_RETRY_MAX_BACKOFF", 8.0),
+            rate_limiter=get_rate_limiter(),
+            policies=get_endpoint_policies(),
+            **transport_options(),
+        )
+        loop_clients[base_url] = client
+    return client
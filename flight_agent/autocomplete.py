@@ -0,0 +1,226 @@
+import hashlib
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+from django.db import DatabaseError, connection
+from django.db.models import Count
+from django.utils import timezone
+
+from .airports import expand_location
+from .conf import get_setting
+from .models import FlightSearchQuery
+from .resolver import GENERIC_TOKENS, airport_rank, get_location_index, load_metro_cities, normalize_name, resolve_location
+
+logger = logging.getLogger(__name__)
+
+MAX_LIMIT = 20
+# Prefixes up to this length have their ranked matches precomputed; longer ones scan a bisect range
+SHORT_PREFIX = 3
+
+
+def search_weights(window_days: int = 30) -> Counter:
+    """How often each airport or city code was searched, as origin or destination, over `window_days`"""
+    since = timezone.now() - timedelta(days=window_days)
+    weights: Counter = Counter()
+    recent = FlightSearchQuery.objects.filter(timestamp__gte=since)
+    for field in ("origin", "destination"):
+        for row in recent.values(field).annotate(searches=Count("id")):
+            # Rows saved before names were resolved hold the raw place name
+            code = resolve_location(row[field]) if row[field] else None
+            if code:
+                weights[code] += row["searches"]
+    return weights
+
+
+class AirportAutocomplete:
+    """
+    Prefix index over airport and city codes, city names, airport names
+    (from any word, so "heath" finds London Heathrow) and aliases.
+
+    Keys live in one sorted array searched with bisect. Every code has a
+    precomputed rank (search traffic first, then city codes and
+    international airports), and the ranked matches of every prefix of up
+    to SHORT_PREFIX characters are precomputed, so a lookup is a dict get
+    for short input and a short bisect scan otherwise.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, int]] = None):
+        # Built without search counts (at startup), so get_airport_autocomplete replaces it soon
+        self.weighted = weights is not None
+        weights = weights or {}
+        entries: Dict[str, Dict] = {}
+        # (key, code) -> tier: 0 when the key starts a code, city, alias or airport name, 1 for later words
+        keys: Dict[Tuple[str, str], int] = {}
+        priors: Dict[str, int] = {}
+        locations = get_location_index()
+        metro_cities = load_metro_cities()
+        metro_airports = {airport for code in metro_cities.values() for airport in expand_location(code)}
+
+        for airport in locations.airports.values():
+            entries[airport.iata] = {
+                "code": airport.iata, "name": airport.name, "city": airport.city,
+                "country": airport.country, "type": "airport",
+            }
+            priors[airport.iata] = 3 if airport.iata in metro_airports else airport_rank(airport) + 1
+            for tier, name in enumerate(self._word_suffixes(airport.name)):
+                keys.setdefault((name, airport.iata), min(tier, 1))
+            for name in (airport.iata, airport.city):
+                keys[(normalize_name(name), airport.iata)] = 0
+
+        for city, code in metro_cities.items():
+            airports = expand_location(code)
+            country = entries[airports[0]]["country"] if airports[0] in entries else ""
+            entries[code] = {
+                "code": code, "name": f"{city} (all airports)", "city": city,
+                "country": country, "type": "city", "airports": list(airports),
+            }
+            priors[code] = 4
+            for name in (code, city):
+                keys[(normalize_name(name), code)] = 0
+
+        for alias, code in locations.aliases.items():
+            if code in entries:
+                keys[(alias, code)] = 0
+
+        ranked = sorted(entries, key=lambda code: (-weights.get(code, 0), -priors[code], code))
+        self._order = {code: position for position, code in enumerate(ranked)}
+        self._entries = entries
+        self._weights = weights
+
+        pairs = sorted(keys.items())
+        self._keys = [key for (key, _), _ in pairs]
+        self._codes = [code for (_, code), _ in pairs]
+        self._tiers = [tier for _, tier in pairs]
+
+        short: Dict[str, Dict[str, int]] = {}
+        for (key, code), tier in pairs:
+            for length in range(1, min(len(key), SHORT_PREFIX) + 1):
+                matches = short.setdefault(key[:length], {})
+                matches[code] = min(tier, matches.get(code, tier))
+        self._short = {prefix: self._ranked(matches)[:MAX_LIMIT] for prefix, matches in short.items()}
+
+        # Changes whenever the ranking does, so clients can revalidate with ETags
+        self.version = hashlib.sha1(",".join(ranked).encode()).hexdigest()[:12]
+        self.built_at = time.monotonic()
+
+    @staticmethod
+    def _word_suffixes(name: str) -> List[str]:
+        """The name from its first word, then from each later word that is not generic"""
+        words = normalize_name(name).split()
+        return [" ".join(words[i:]) for i in range(len(words)) if i == 0 or words[i] not in GENERIC_TOKENS]
+
+    def _ranked(self, matches: Dict[str, int]) -> List[str]:
+        """Codes ordered by match tier, then by rank"""
+        order = self._order
+        return sorted(matches, key=lambda code: (matches[code], order[code]))
+
+    def _leads(self, code: str, leader: str) -> bool:
+        """Whether an exact code match may go ahead of `leader`: only if it is searched at least half as often"""
+        return self._weights.get(code, 0) * 2 >= self._weights.get(leader, 0)
+
+    def lookup(self, query: str, limit: int = 8) -> List[Dict]:
+        """
+        Best matches for a typed prefix, most searched first. A complete
+        alias leads ("goa" -> GOI). An exact code match leads when typed in
+        capitals ("MUM") or when it is searched about as often as the best
+        match, and otherwise comes second, so "mum" offers the much more
+        searched Mumbai (BOM) first.
+        """
+        prefix = normalize_name(query)
+        if not prefix:
+            return []
+        limit = max(1, min(limit, MAX_LIMIT))
+
+        if len(prefix) <= SHORT_PREFIX:
+            codes = list(self._short.get(prefix, ()))
+        else:
+            matches: Dict[str, int] = {}
+            index = bisect_left(self._keys, prefix)
+            while index < len(self._keys) and self._keys[index].startswith(prefix):
+                code, tier = self._codes[index], self._tiers[index]
+                matches[code] = min(tier, matches.get(code, tier))
+                index += 1
+            codes = self._ranked(matches)
+
+        exact = prefix.upper()
+        # "new " (with a space) is the start of a name, not the code NEW
+        if exact in self._entries and not query[-1].isspace():
+            others = [code for code in codes if code != exact]
+            if query.strip().isupper() or not others or self._leads(exact, others[0]):
+                codes = [exact] + others
+            else:
+                codes = others[:1] + [exact] + others[1:]
+        named = get_location_index().aliases.get(prefix)
+        if named in self._entries and not query.strip().isupper():
+            codes = [named] + [code for code in codes if code != named]
+        return [self._entries[code] for code in codes[:limit]]
+
+
+_autocomplete: Optional[AirportAutocomplete] = None
+_autocomplete_lock = threading.Lock()
+_rebuilding = False
+
+
+def _build() -> AirportAutocomplete:
+    try:
+        weights = search_weights(get_setting("AIRPORT_AUTOCOMPLETE_WINDOW_DAYS", 30))
+    except DatabaseError as e:
+        logger.warning(f"⚠️ Autocomplete built without search weights: {e}")
+        weights = Counter()
+    index = AirportAutocomplete(weights)
+    logger.info(f"🔎 Built airport autocomplete index ({len(index._keys)} keys, {len(weights)} weighted codes)")
+    return index
+
+
+def _rebuild_in_background() -> None:
+    global _rebuilding
+
+    def run():
+        global _autocomplete, _rebuilding
+        try:
+            _autocomplete = _build()
+        except Exception as e:
+            logger.error(f"❌ Autocomplete rebuild failed: {e}")
+        finally:
+            _rebuilding = False
+            connection.close()
+
+    _rebuilding = True
+    threading.Thread(target=run, name="airport-autocomplete", daemon=True).start()
+
+
+def warm_airport_autocomplete() -> None:
+    """
+    Build the index at startup (FlightAgentConfig.ready), so the first
+    request does not pay for it. Apps may not query the database while
+    they load, so this one has no search weights; the first lookup swaps
+    in a weighted index, built in the background.
+    """
+    global _autocomplete
+    with _autocomplete_lock:
+        if _autocomplete is None:
+            _autocomplete = AirportAutocomplete()
+            logger.info(f"🔎 Built airport autocomplete index at startup ({len(_autocomplete._keys)} keys)")
+
+
+def get_airport_autocomplete() -> AirportAutocomplete:
+    """
+    Return the process-wide autocomplete index, built on first use unless
+    warm_airport_autocomplete ran at startup. Once it is older than
+    AIRPORT_AUTOCOMPLETE_REFRESH seconds, or was built without search
+    weights, it is rebuilt with fresh weights in the background while the
+    old one keeps serving.
+    """
+    global _autocomplete
+    with _autocomplete_lock:
+        if _autocomplete is None:
+            _autocomplete = _build()
+        elif not _rebuilding and (not _autocomplete.weighted or time.monotonic() - _autocomplete.built_at
+                                  > get_setting("AIRPORT_AUTOCOMPLETE_REFRESH", 3600)):
+            _rebuild_in_background()
+        return _autocomplete
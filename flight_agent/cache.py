@@ -0,0 +1,190 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from .conf import get_setting
+
+logger = logging.getLogger(__name__)
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+def make_search_key(origin: str, destination: str, departure_date: str,
+                    adults: int = 1, currency: str = "INR", max_results: int = 5) -> Tuple:
+    """Normalized cache key for a flight-offers search"""
+    return (
+        origin.strip().upper(),
+        destination.strip().upper(),
+        departure_date.strip(),
+        int(adults),
+        currency.strip().upper(),
+        int(max_results),
+    )
+
+
+class FlightOfferCache:
+    """
+    In-memory TTL + LRU cache for flight search results.
+
+    Entries younger than `ttl` are fresh. For `stale_ttl` seconds after that
+    they are served as stale while the caller revalidates them in the
+    background, and for `stale_if_error_ttl` seconds after the TTL they can
+    still be served when Amadeus is failing. At most `max_entries` entries
+    are kept; the least recently used ones are evicted first.
+
+    With a `shared` Django cache backend, entries are also written there and
+    local misses are read from it, so entries stored by another process
+    (e.g. the prewarm command) are picked up.
+    """
+
+    def __init__(self, ttl: float = 300, stale_ttl: float = 600,
+                 stale_if_error_ttl: float = 3600, max_entries: int = 2000, shared=None):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.stale_if_error_ttl = stale_if_error_ttl
+        self.max_entries = max_entries
+        self.shared = shared
+
+        # key -> (value, fresh_until, stale_until, error_until), in time.monotonic() seconds
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, float, float]]" = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0, "stale_hits": 0, "misses": 0, "stale_if_error_hits": 0,
+            "evictions": 0, "shared_hits": 0,
+        }
+
+    def get(self, key: Hashable) -> Tuple[Optional[Any], str]:
+        """Look up `key`, returning the value and whether it is fresh, stale or a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if (entry is None or time.monotonic() >= entry[1]) and self.shared is not None:
+            entry = self._load_shared(key) or entry
+
+        now = time.monotonic()
+        with self._lock:
+            if entry is not None:
+                value, fresh_until, stale_until, error_until = entry
+                if now < fresh_until:
+                    self._touch(key, entry)
+                    self._stats["hits"] += 1
+                    return value, FRESH
+                if now < stale_until:
+                    self._touch(key, entry)
+                    self._stats["stale_hits"] += 1
+                    return value, STALE
+                if now >= error_until:
+                    self._entries.pop(key, None)
+            self._stats["misses"] += 1
+            return None, MISS
+
+    def is_fresh(self, key: Hashable) -> bool:
+        """Whether `key` holds a fresh entry; unlike get() this is not counted in the stats"""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry is not None and time.monotonic() < entry[1]
+
+    def get_stale_if_error(self, key: Hashable) -> Optional[Any]:
+        """Return an expired value that may still be served because the upstream call failed"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() >= entry[3]:
+                return None
+            self._stats["stale_if_error_hits"] += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store `value`; `ttl` overrides the default freshness lifetime for this entry"""
+        ttl = self.ttl if ttl is None else ttl
+        now = time.monotonic()
+        entry = (value, now + ttl, now + ttl + self.stale_ttl, now + ttl + self.stale_if_error_ttl)
+        with self._lock:
+            self._touch(key, entry)
+
+        if self.shared is not None:
+            try:
+                self.shared.set(self._shared_key(key), (value, time.time(), ttl),
+                                timeout=ttl + max(self.stale_ttl, self.stale_if_error_ttl))
+            except Exception as e:
+                logger.warning(f"⚠️ Could not write shared flight cache: {e}")
+
+    def _touch(self, key: Hashable, entry: Tuple) -> None:
+        # Caller holds the lock
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _load_shared(self, key: Hashable) -> Optional[Tuple]:
+        try:
+            stored = self.shared.get(self._shared_key(key))
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read shared flight cache: {e}")
+            return None
+        if stored is None:
+            return None
+
+        value, stored_at, ttl = stored
+        # Convert the wall-clock age from the shared store into local monotonic deadlines
+        fresh_until = time.monotonic() - (time.time() - stored_at) + ttl
+        with self._lock:
+            self._stats["shared_hits"] += 1
+        return value, fresh_until, fresh_until + self.stale_ttl, fresh_until + self.stale_if_error_ttl
+
+    @staticmethod
+    def _shared_key(key: Hashable) -> str:
+        return "flight-offers:v2:" + ":".join(str(part) for part in key)
+
+    def begin_refresh(self, key: Hashable) -> bool:
+        """Claim the background refresh for `key`; False if one is already running"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key: Hashable) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+_cache: Optional[FlightOfferCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_flight_cache() -> FlightOfferCache:
+    """Return the process-wide flight offer cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            shared = None
+            shared_alias = get_setting("FLIGHT_CACHE_SHARED_ALIAS", None)
+            if shared_alias:
+                from django.core.cache import caches
+                shared = caches[shared_alias]
+
+            _cache = FlightOfferCache(
+                ttl=get_setting("FLIGHT_CACHE_TTL", 300),
+                stale_ttl=get_setting("FLIGHT_CACHE_STALE_TTL", 600),
+                stale_if_error_ttl=get_setting("FLIGHT_CACHE_STALE_IF_ERROR_TTL", 3600),
+                max_entries=get_setting("FLIGHT_CACHE_MAX_ENTRIES", 2000),
+                shared=shared,
+            )
+        return _cache
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller runs the
+    function and every caller that arrives while it is running waits for,
+    and receives, the same result (or exception).
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._stats = {"executions": 0, "coalesced": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats["executions"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+
+class AsyncSingleFlight:
+    """
+    asyncio counterpart of SingleFlight; calls are coalesced per event loop.
+    The shared call runs as its own task, so cancelling any caller (the one
+    that started it included) does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._calls: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Future]]" = weakref.WeakKeyDictionary()
+        self._stats = {"executions": 0, "coalesced": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        calls = self._calls.setdefault(asyncio.get_running_loop(), {})
+        task = calls.get(key)
+        if task is None:
+            task = calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda done: self._finish(calls, key, done))
+            self._stats["executions"] += 1
+        else:
+            self._stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def _finish(calls: Dict[Hashable, asyncio.Future], key: Hashable, task: asyncio.Future) -> None:
+        if calls.get(key) is task:
+            del calls[key]
+        if not task.cancelled():
+            # Mark the exception retrieved in case every caller had gone
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats)
+
+
+# Process-wide coalescers for upstream flight-offer searches
+search_calls = SingleFlight()
+async_search_calls = AsyncSingleFlight()
+
+
+def coalescing_stats() -> Dict[str, Any]:
+    """Upstream calls made vs. saved by coalescing, for the sync and async paths"""
+    sync_stats, async_stats = search_calls.stats(), async_search_calls.stats()
+    return {
+        "sync": sync_stats,
+        "async": async_stats,
+        "calls_saved": sync_stats["coalesced"] + async_stats["coalesced"],
+    }
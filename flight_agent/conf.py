@@ -0,0 +1,28 @@
+import os
+
+_MISSING = object()
+
+
+def get_setting(name: str, default):
+    """
+    Read a flight agent setting from Django settings, falling back to the
+    environment and then to `default`. The environment fallback lets the
+    standalone script run without Django being configured.
+    """
+    try:
+        from django.conf import settings
+        if settings.configured or os.getenv("DJANGO_SETTINGS_MODULE"):
+            value = getattr(settings, name, _MISSING)
+            if value is not _MISSING:
+                return value
+    except ImportError:
+        pass
+
+    value = os.getenv(name)
+    if value is None or default is None:
+        return default if value is None else value
+    if isinstance(default, bool):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, (int, float)):
+        return type(default)(value)
+    return value
@@ -0,0 +1,220 @@
+import gzip
+import json
+import logging
+import os
+import re
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from .conf import get_setting
+
+logger = logging.getLogger(__name__)
+
+PASSTHROUGH = "passthrough"
+RECORD = "record"
+REPLAY = "replay"
+TRANSPORT_MODES = (PASSTHROUGH, RECORD, REPLAY)
+
+# Transient answers are not recorded, so the store keeps the last real one
+UNRECORDED_STATUSES = frozenset({401, 429, 500, 502, 503, 504})
+KEPT_HEADERS = ("Content-Type", "Retry-After")
+# Search parameters holding a date, which relative_fixture_key replaces with its offset from today
+DATE_PARAMS = ("departureDate", "returnDate")
+ISO_DATE = re.compile(r"(?<!\d)\d{4}-\d{2}-\d{2}(?!\d)")
+
+
+class RecordedResponse:
+    """A stored Amadeus response, offering the parts of the requests/httpx Response API the service uses"""
+
+    def __init__(self, status_code: int, text: str, headers: Optional[Dict[str, str]] = None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.text)
+
+    def close(self) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        pass
+
+
+# Answers the OAuth token request in replay mode, so no credentials are needed or stored
+REPLAY_TOKEN = RecordedResponse(
+    200, json.dumps({"access_token": "replay-token", "expires_in": 1799, "token_type": "Bearer"}),
+    {"Content-Type": "application/json"},
+)
+
+
+def fixture_key(method: str, path: str, params: Optional[Dict] = None) -> str:
+    """
+    'GET /v2/shopping/flight-offers?adults=1&...' with the params sorted
+    and stringified, so equal searches share a key however they were built
+    """
+    query = urlencode(sorted((str(name), str(value)) for name, value in (params or {}).items()))
+    return f"{method.upper()} {path}?{query}" if query else f"{method.upper()} {path}"
+
+
+def relative_fixture_key(method: str, path: str, params: Optional[Dict], today: date) -> Optional[str]:
+    """
+    fixture_key with each date parameter given as days from `today`
+    ('departureDate=+5d'), so a search for "in 5 days" recorded one day
+    replays on the next. None if the request carries no date.
+    """
+    params = dict(params or {})
+    offsets = False
+    for name in DATE_PARAMS:
+        day = _parse_date(params.get(name))
+        if day is not None:
+            params[name] = f"{(day - today).days:+d}d"
+            offsets = True
+    return fixture_key(method, path, params) if offsets else None
+
+
+def _parse_date(value) -> Optional[date]:
+    try:
+        return datetime.strptime(str(value), "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def shift_dates(text: str, days: int) -> str:
+    """Move every YYYY-MM-DD date in `text` by `days`"""
+    if not days:
+        return text
+
+    def shift(match):
+        day = _parse_date(match.group())
+        return (day + timedelta(days=days)).isoformat() if day else match.group()
+
+    return ISO_DATE.sub(shift, text)
+
+
+class FixtureStore:
+    """
+    Amadeus responses keyed by fixture_key, held in memory and appended to
+    a gzipped JSONL file (one {"key", "status", "headers", "body",
+    "recorded_on"} object per line) as they are recorded. Only GETs are
+    stored: the one POST, the OAuth token request, carries credentials. A
+    key recorded again replaces the earlier response on the next load.
+
+    Each response is also filed under its relative_fixture_key. A search
+    with no exact recording, typically a relative date ("tomorrow") asked
+    on a later day, replays the one recorded the same number of days
+    ahead, with the dates in its body moved to match.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._responses: Dict[str, RecordedResponse] = {}
+        # relative key -> (response, the departureDate it was recorded for)
+        self._relative: Dict[str, Tuple[RecordedResponse, date]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "recorded": 0}
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as fixtures:
+                for line in fixtures:
+                    entry = json.loads(line)
+                    response = RecordedResponse(entry["status"], entry["body"], entry["headers"])
+                    self._responses[entry["key"]] = response
+                    recorded_on = _parse_date(entry.get("recorded_on"))
+                    if recorded_on is not None:
+                        self._file_relative(entry["key"], response, recorded_on)
+        except (EOFError, OSError, ValueError) as e:
+            # A recording cut off mid-write: keep what was read
+            logger.warning(f"⚠️ Fixture store {self.path} is truncated, loaded {len(self._responses)} responses: {e}")
+        logger.info(f"📼 Loaded {len(self._responses)} recorded Amadeus responses from {self.path}")
+
+    def _file_relative(self, key: str, response: RecordedResponse, recorded_on: date) -> None:
+        """Also file a response under its relative_fixture_key as of the day it was recorded"""
+        request, _, query = key.partition("?")
+        method, _, path = request.partition(" ")
+        params = dict(parse_qsl(query))
+        departure = _parse_date(params.get("departureDate"))
+        relative_key = relative_fixture_key(method, path, params, recorded_on)
+        if relative_key is not None and departure is not None:
+            self._relative[relative_key] = (response, departure)
+
+    def replay(self, method: str, path: str, params: Optional[Dict] = None) -> RecordedResponse:
+        """The recorded response for this request, or a 404 naming the missing key"""
+        if method.upper() != "GET":
+            return REPLAY_TOKEN
+        key = fixture_key(method, path, params)
+        with self._lock:
+            response = self._responses.get(key)
+            if response is None:
+                response = self._shifted(method, path, params)
+            self._stats["hits" if response is not None else "misses"] += 1
+        if response is None:
+            logger.warning(f"📼 No recorded response for {key}")
+            body = {"errors": [{"status": 404, "title": "NO RECORDED RESPONSE", "detail": key}]}
+            return RecordedResponse(404, json.dumps(body), {"Content-Type": "application/json"})
+        return response
+
+    def _shifted(self, method: str, path: str, params: Optional[Dict]) -> Optional[RecordedResponse]:
+        """The response recorded the same number of days ahead, moved to this request's dates"""
+        relative_key = relative_fixture_key(method, path, params, date.today())
+        departure = _parse_date((params or {}).get("departureDate"))
+        found = self._relative.get(relative_key) if relative_key else None
+        if found is None or departure is None:
+            return None
+        response, recorded_departure = found
+        return RecordedResponse(response.status_code, shift_dates(response.text, (departure - recorded_departure).days),
+                                response.headers)
+
+    def record(self, method: str, path: str, params: Optional[Dict], response) -> None:
+        """Store a live requests or httpx response"""
+        if method.upper() != "GET" or response.status_code in UNRECORDED_STATUSES:
+            return
+        key = fixture_key(method, path, params)
+        headers = {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers}
+        entry = RecordedResponse(response.status_code, response.text, headers)
+        today = date.today()
+        line = json.dumps({"key": key, "status": entry.status_code, "headers": headers, "body": entry.text,
+                           "recorded_on": today.isoformat()})
+        with self._lock:
+            known = self._responses.get(key)
+            if known is not None and (known.status_code, known.text) == (entry.status_code, entry.text):
+                return
+            self._responses[key] = entry
+            self._file_relative(key, entry, today)
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # One gzip member per response, so an interrupted recording loses at most the last one
+            with gzip.open(self.path, "at", encoding="utf-8") as fixtures:
+                fixtures.write(line + "\n")
+            self._stats["recorded"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "size": len(self._responses)}
+
+
+_stores: Dict[str, FixtureStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_transport() -> str:
+    """The Amadeus transport mode from AMADEUS_TRANSPORT: passthrough, record or replay"""
+    mode = str(get_setting("AMADEUS_TRANSPORT", PASSTHROUGH)).strip().lower()
+    if mode not in TRANSPORT_MODES:
+        raise ValueError(f"AMADEUS_TRANSPORT must be one of {', '.join(TRANSPORT_MODES)}, not {mode!r}")
+    return mode
+
+
+def get_fixture_store(path: Optional[str] = None) -> FixtureStore:
+    """Return the process-wide fixture store for `path` (default: AMADEUS_FIXTURES_PATH)"""
+    path = os.path.abspath(path or get_setting("AMADEUS_FIXTURES_PATH", "amadeus_fixtures.jsonl.gz"))
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = FixtureStore(path)
+        return store
@@ -2,147 +2,456 @@ import os
 import requests
 import json
 from datetime import datetime, timedelta
-from typing import List, Dict
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import AsyncIterator, Iterator, List, Dict, Optional, Sequence, Tuple, Union
+import asyncio
 import logging
+import threading
+
+import httpx
+
+from .airports import expand_location
+from .amadeus_auth import AmadeusAuthError, get_token_manager
+from .amadeus_client import DEFAULT_BASE_URL, get_amadeus_client
+from .async_client import get_async_amadeus_client
+from .cache import FRESH, STALE, get_flight_cache, make_search_key
+from .coalesce import async_search_calls, search_calls
+from .conf import get_setting
+from .geo import nearest_airports
+from .offers import FlightOffer, normalize_offers
+from .query_parser import parse_query, resolve_date
+from .resolver import resolve_location
+from .rate_limit import BACKGROUND, FANOUT, RateLimitExceeded, request_priority
+from .resilience import CircuitOpenError
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SEARCH_PATH = "/v2/shopping/flight-offers"
+
+# What a single search returns: its flight offers, or [{"error": message}] when it failed
+SearchResults = Union[List[FlightOffer], List[Dict[str, str]]]
+
+
+@dataclass
+class FlightQueryResult:
+    """Everything produced by one natural language flight query"""
+    query: str
+    origin: str
+    destination: str
+    date: str
+    departure_date: str
+    flex_days: int = 0
+    confidence: float = 1.0
+    # Airports near the user's position, searched as the origin when the query names none
+    nearby_origins: Tuple[str, ...] = ()
+    offers: List[FlightOffer] = field(default_factory=list)
+    best_by_day: List[Tuple[str, Optional[FlightOffer]]] = field(default_factory=list)
+    response: str = ""
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def flights(self) -> List[Dict]:
+        """The offers as API/chat dicts"""
+        return [offer.to_dict() for offer in self.offers]
+
+    @property
+    def daily_best(self) -> List[Dict]:
+        """The cheapest offer per day of a flexible-date query, as API dicts"""
+        return [{"date": day, "flight": offer.to_dict() if offer else None} for day, offer in self.best_by_day]
+
+    @property
+    def origin_airports(self) -> Tuple[str, ...]:
+        return self.nearby_origins or expand_location(self.origin)
+
+    @property
+    def destination_airports(self) -> Tuple[str, ...]:
+        return expand_location(self.destination)
+
+    @property
+    def intent(self) -> Dict:
+        return {
+            "origin": self.origin,
+            "destination": self.destination,
+            "origin_airports": list(self.origin_airports),
+            "destination_airports": list(self.destination_airports),
+            "date": self.date,
+            "departure_date": self.departure_date,
+            "flex_days": self.flex_days,
+            "confidence": self.confidence
+        }
+
+
 class FlightAgentService:
     def __init__(self):
         # These should be stored in environment variables or Django settings
         self.AMADEUS_KEY = os.getenv("AMADEUS_API_KEY")
         self.AMADEUS_SECRET = os.getenv("AMADEUS_SECRET")
-        self.base_url = "https://test.api.amadeus.com"
+        self.base_url = get_setting("AMADEUS_BASE_URL", DEFAULT_BASE_URL)
+        # Shared across service instances so connections and the OAuth token survive between requests
+        self.client = get_amadeus_client(self.base_url)
+        self.token_manager = get_token_manager(self.client, self.AMADEUS_KEY, self.AMADEUS_SECRET)
+        self.cache = get_flight_cache()
         
         logger.info(f"🔑 API Key present: {bool(self.AMADEUS_KEY)}")
         logger.info(f"🔒 API Secret present: {bool(self.AMADEUS_SECRET)}")
 
     def parse_relative_date(self, date_str: str) -> str:
-        """Convert relative dates like 'tomorrow' to YYYY-MM-DD format"""
-        today = datetime.now().date()
-        
-        date_str_lower = date_str.lower().strip()
-        logger.info(f"📅 Parsing date: '{date_str}' -> Today is {today}")
-        
-        # Handle relative dates
-        if date_str_lower == 'tomorrow':
-            future_date = today + timedelta(days=1)
-        elif date_str_lower == 'today':
-            future_date = today
-        elif 'next monday' in date_str_lower:
-            days_until_monday = (0 - today.weekday()) % 7
-            if days_until_monday == 0:  # Today is Monday
-                days_until_monday = 7
-            future_date = today + timedelta(days=days_until_monday)
-        elif 'next tuesday' in date_str_lower:
-            days_until_tuesday = (1 - today.weekday()) % 7
-            if days_until_tuesday == 0:  # Today is Tuesday
-                days_until_tuesday = 7
-            future_date = today + timedelta(days=days_until_tuesday)
-        elif 'next wednesday' in date_str_lower:
-            days_until_wednesday = (2 - today.weekday()) % 7
-            if days_until_wednesday == 0:  # Today is Wednesday
-                days_until_wednesday = 7
-            future_date = today + timedelta(days=days_until_wednesday)
-        elif 'next thursday' in date_str_lower:
-            days_until_thursday = (3 - today.weekday()) % 7
-            if days_until_thursday == 0:  # Today is Thursday
-                days_until_thursday = 7
-            future_date = today + timedelta(days=days_until_thursday)
-        elif 'next friday' in date_str_lower:
-            days_until_friday = (4 - today.weekday()) % 7
-            if days_until_friday == 0:  # Today is Friday
-                days_until_friday = 7
-            future_date = today + timedelta(days=days_until_friday)
-        elif 'next saturday' in date_str_lower:
-            days_until_saturday = (5 - today.weekday()) % 7
-            if days_until_saturday == 0:  # Today is Saturday
-                days_until_saturday = 7
-            future_date = today + timedelta(days=days_until_saturday)
-        elif 'next sunday' in date_str_lower:
-            days_until_sunday = (6 - today.weekday()) % 7
-            if days_until_sunday == 0:  # Today is Sunday
-                days_until_sunday = 7
-            future_date = today + timedelta(days=days_until_sunday)
-        elif 'next week' in date_str_lower:
-            future_date = today + timedelta(days=7)
-        else:
-            # If it's already in YYYY-MM-DD format, validate it
-            try:
-                input_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-                # If date is in past, add 1 year to make it future
-                if input_date < today:
-                    logger.warning(f"⚠️ Date {date_str} is in the past, adding 1 year")
-                    future_date = input_date.replace(year=input_date.year + 1)
-                else:
-                    future_date = input_date
-            except ValueError:
-                # If not a valid date format, return the original string and let the tool handle it
-                logger.warning(f"⚠️ Invalid date format '{date_str}', passing as-is")
-                return date_str
-        
-        logger.info(f"📅 Final calculated date: {future_date.strftime('%Y-%m-%d')}")
-        return future_date.strftime("%Y-%m-%d")
-
-    def search_flights(self, origin: str, destination: str, date: str) -> List[Dict]:
+        """Convert relative dates like 'tomorrow' or '12 Dec' to YYYY-MM-DD format"""
+        resolved = resolve_date(date_str)
+        if resolved is None:
+            # If not a valid date format, return the original string and let the tool handle it
+            logger.warning(f"⚠️ Invalid date format '{date_str}', passing as-is")
+            return date_str
+        return resolved.strftime("%Y-%m-%d")
+
+    def search_flights(self, origin: str, destination: str, date: str,
+                       adults: int = 1, currency: str = "INR", max_results: int = 5) -> SearchResults:
         """
         Searches for flights using the Amadeus API for any origin, any destination, and date.
         Date can be in YYYY-MM-DD format or relative terms like 'tomorrow', 'next Monday', etc.
-        Returns a list of flight options or an error message.
+        Returns a list of FlightOffers, or [{"error": message}] when the search failed.
+        Results are served from the flight offer cache when possible.
         """
+        origin, destination, error = self._resolve_route(origin, destination)
+        if error:
+            return [{"error": error}]
+        
         # Parse relative dates - this will handle the conversion
         formatted_date = self.parse_relative_date(date)
         
         logger.info(f"\n--- 🛠️ Calling Tool: flight_search(origin='{origin}', destination='{destination}', date='{formatted_date}') ---\n")
         
+        key = make_search_key(origin, destination, formatted_date, adults, currency, max_results)
+        cached = self._cached_results(key)
+        if cached is not None:
+            return cached
+        
+        return self._fetch_and_store(key)
+
+    async def asearch_flights(self, origin: str, destination: str, date: str,
+                              adults: int = 1, currency: str = "INR", max_results: int = 5) -> SearchResults:
+        """Async variant of search_flights that does not hold a thread during the upstream call"""
+        origin, destination, error = self._resolve_route(origin, destination)
+        if error:
+            return [{"error": error}]
+        
+        formatted_date = self.parse_relative_date(date)
+        
+        logger.info(f"\n--- 🛠️ Calling Tool: flight_search(origin='{origin}', destination='{destination}', date='{formatted_date}') [async] ---\n")
+        
+        key = make_search_key(origin, destination, formatted_date, adults, currency, max_results)
+        cached = self._cached_results(key)
+        if cached is not None:
+            return cached
+        
+        return await self._afetch_and_store(key)
+
+    def search_fanout(self, origin: Union[str, Sequence[str]], destination: str, date: str, flex_days: int = 0,
+                      adults: int = 1, currency: str = "INR", max_results: int = 5) -> Dict:
+        """
+        Search every airport pair serving the origin and destination cities
+        (e.g. LON -> LHR/LGW/STN/LTN/LCY) and, for flexible dates, every day
+        within ±flex_days, in parallel. Returns the merged, de-duplicated
+        "offers" sorted by price plus the cheapest offer per day as
+        "best_by_day" (date, offer) pairs; "offers" is [{"error": message}]
+        when no search found anything. `origin` may also be a list of
+        airport codes, e.g. from nearest_airports. Each search
+        goes through search_flights, so it is cached like a single search.
+        """
+        searches = self.plan_searches(origin, destination, self.parse_relative_date(date), flex_days)
+        return self._merge_results(searches, self._fan_out(searches, adults, currency, max_results), flex_days)
+
+    async def asearch_fanout(self, origin: Union[str, Sequence[str]], destination: str, date: str, flex_days: int = 0,
+                             adults: int = 1, currency: str = "INR", max_results: int = 5) -> Dict:
+        """Async variant of search_fanout"""
+        searches = self.plan_searches(origin, destination, self.parse_relative_date(date), flex_days)
+        return self._merge_results(searches, await self._afan_out(searches, adults, currency, max_results), flex_days)
+
+    def refresh_search(self, key: tuple, ttl: Optional[float] = None) -> Optional[str]:
+        """
+        Fetch the search for a make_search_key `key` from Amadeus and cache
+        it for `ttl` seconds (default FLIGHT_CACHE_TTL), whether or not it is
+        cached already. Returns None on success, otherwise the error.
+        """
+        results = self._fetch_and_store(key, ttl=ttl)
+        if self._is_success(results):
+            return None
+        return results[0].get('error', 'Unknown error') if results else 'No flights found'
+
+    def plan_searches(self, origin: Union[str, Sequence[str]], destination: str, formatted_date: str,
+                      flex_days: int = 0) -> List[Tuple[str, str, str]]:
+        """
+        List the (origin, destination, date) searches for a query, capped at
+        FLIGHT_FANOUT_MAX_CALLS. Dates nearest the requested one and the
+        primary airports of each city are kept first.
+        """
+        max_calls = max(1, get_setting("FLIGHT_FANOUT_MAX_CALLS", 12))
+        
+        days = self._flexible_dates(formatted_date, flex_days) if flex_days else [formatted_date]
+        if len(days) > max_calls:
+            days = sorted(sorted(days, key=lambda day: abs(self._day_offset(day, formatted_date)))[:max_calls])
+        
+        origins = self._airports(origin)
+        destinations = self._airports(destination)
+        ranked_pairs = sorted(
+            ((i + j, i, o, d) for i, o in enumerate(origins) for j, d in enumerate(destinations) if o != d)
+        )
+        pairs = [(o, d) for _, _, o, d in ranked_pairs] or [(origins[0], destinations[0])]
+        pairs = pairs[:max(1, max_calls // len(days))]
+        
+        return [(o, d, day) for day in days for o, d in pairs]
+
+    def _fan_out(self, searches: List[Tuple[str, str, str]], adults: int, currency: str,
+                 max_results: int) -> List[SearchResults]:
+        """Run several (origin, destination, date) searches with bounded concurrency"""
+        results: List[SearchResults] = [[] for _ in searches]
+        for index, search_results in self._iter_fan_out(searches, adults, currency, max_results):
+            results[index] = search_results
+        return results
+
+    def _iter_fan_out(self, searches: List[Tuple[str, str, str]], adults: int, currency: str,
+                      max_results: int) -> Iterator[Tuple[int, SearchResults]]:
+        """Yield (index, results) for each search as soon as it completes"""
+        workers = min(len(searches), get_setting("FLIGHT_FANOUT_CONCURRENCY", 4)) or 1
+        
+        def run(search):
+            # Fan-out searches queue behind single interactive searches for Amadeus quota
+            with request_priority(FANOUT):
+                return self.search_flights(*search, adults=adults, currency=currency, max_results=max_results)
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="flight-fanout") as pool:
+            futures = {pool.submit(run, search): index for index, search in enumerate(searches)}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    async def _afan_out(self, searches: List[Tuple[str, str, str]], adults: int, currency: str,
+                        max_results: int) -> List[SearchResults]:
+        results: List[SearchResults] = [[] for _ in searches]
+        async for index, search_results in self._aiter_fan_out(searches, adults, currency, max_results):
+            results[index] = search_results
+        return results
+
+    async def _aiter_fan_out(self, searches: List[Tuple[str, str, str]], adults: int, currency: str,
+                             max_results: int) -> AsyncIterator[Tuple[int, SearchResults]]:
+        """Async variant of _iter_fan_out"""
+        limit = asyncio.Semaphore(get_setting("FLIGHT_FANOUT_CONCURRENCY", 4))
+
+        async def run(index, search):
+            # Each task has its own context, so the priority stays local to it
+            with request_priority(FANOUT):
+                async with limit:
+                    return index, await self.asearch_flights(*search, adults=adults, currency=currency,
+                                                             max_results=max_results)
+
+        tasks = [asyncio.ensure_future(run(index, search)) for index, search in enumerate(searches)]
         try:
-            # Step 1: Get access token
-            logger.info("🔐 Getting access token...")
-            token_url = f"{self.base_url}/v1/security/oauth2/token"
-            token_data = {
-                "grant_type": "client_credentials", 
-                "client_id": self.AMADEUS_KEY, 
-                "client_secret": self.AMADEUS_SECRET
-            }
-            token_headers = {
-                "Content-Type": "application/x-www-form-urlencoded"
-            }
-            
-            token_response = requests.post(token_url, data=token_data, headers=token_headers)
-            logger.info(f"🔐 Token response status: {token_response.status_code}")
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # The client went away mid-stream: stop the searches still waiting
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    def _airports(place: Union[str, Sequence[str]]) -> Tuple[str, ...]:
+        """The airports serving a code or place name, or an explicit list of airport codes"""
+        if isinstance(place, str):
+            return expand_location(resolve_location(place) or place)
+        return tuple(code.upper() for code in place)
+
+    def _flexible_dates(self, formatted_date: str, flex_days: int) -> List[str]:
+        try:
+            center = datetime.strptime(formatted_date, "%Y-%m-%d").date()
+        except ValueError:
+            return [formatted_date]
+        
+        today = datetime.now().date()
+        days = [center + timedelta(days=offset) for offset in range(-flex_days, flex_days + 1)]
+        return [day.strftime("%Y-%m-%d") for day in days if day >= today] or [formatted_date]
+
+    @staticmethod
+    def _day_offset(day: str, formatted_date: str) -> int:
+        try:
+            return (datetime.strptime(day, "%Y-%m-%d") - datetime.strptime(formatted_date, "%Y-%m-%d")).days
+        except ValueError:
+            return 0
+
+    def _merge_results(self, searches: List[Tuple[str, str, str]], results: List[SearchResults],
+                       flex_days: int) -> Dict:
+        offers = []
+        errors = []
+        for (_, _, day), day_results in zip(searches, results):
+            if self._is_success(day_results):
+                offers.extend((day, flight) for flight in day_results)
+            else:
+                errors.append(day_results[0].get('error') if day_results else 'No flights found')
+        
+        # Cheapest first, so de-duplication keeps the best fare for a flight
+        offers.sort(key=lambda offer: offer[1].price)
+        flights = []
+        seen = set()
+        per_day: Dict[str, List[FlightOffer]] = {day: [] for _, _, day in searches}
+        for day, flight in offers:
+            if flight.identity in seen:
+                continue
+            seen.add(flight.identity)
+            flights.append(flight)
+            per_day[day].append(flight)
+        
+        # Lists are already sorted by price, so the first flight of a day is its cheapest
+        best_by_day = [(day, day_flights[0] if day_flights else None)
+                       for day, day_flights in per_day.items()] if flex_days else []
+        
+        if not flights:
+            return {"offers": [{"error": errors[0]}], "best_by_day": best_by_day}
+        return {"offers": flights[:get_setting("FLIGHT_FANOUT_MAX_OFFERS", 20)], "best_by_day": best_by_day}
+
+    def _cached_results(self, key: tuple) -> Optional[List[FlightOffer]]:
+        """Return cached results for `key`, revalidating stale ones in the background"""
+        cached, state = self.cache.get(key)
+        if state == FRESH:
+            logger.info(f"⚡ Cache hit for {key}")
+            return cached
+        if state == STALE:
+            logger.info(f"⚡ Stale cache hit for {key}, revalidating in background")
+            self._revalidate_in_background(key)
+            return cached
+        return None
+
+    def _fetch_and_store(self, key: tuple, ttl: Optional[float] = None) -> SearchResults:
+        """Fetch from Amadeus, sharing one upstream call between identical concurrent searches"""
+        return search_calls.do(key, lambda: self._store_results(key, self._fetch_flights(*key), ttl))
+
+    async def _afetch_and_store(self, key: tuple) -> SearchResults:
+        async def fetch():
+            return self._store_results(key, await self._afetch_flights(*key))
+        return await async_search_calls.do(key, fetch)
+
+    def _store_results(self, key: tuple, results: SearchResults, ttl: Optional[float] = None) -> SearchResults:
+        """Cache successful upstream results, or fall back to stale ones on failure"""
+        if self._is_success(results):
+            self.cache.set(key, results, ttl)
+            return results
+        
+        stale = self.cache.get_stale_if_error(key)
+        if stale is not None:
+            logger.warning(f"⚠️ Serving stale results for {key}: {results[0].get('error')}")
+            return stale
+        return results
+
+    def _revalidate_in_background(self, key: tuple) -> None:
+        if not self.cache.begin_refresh(key):
+            return
+        
+        def run():
+            try:
+                with request_priority(BACKGROUND):
+                    self._fetch_and_store(key)
+            except Exception as e:
+                logger.warning(f"⚠️ Background refresh failed for {key}: {e}")
+            finally:
+                self.cache.end_refresh(key)
+        
+        threading.Thread(target=run, name="flight-cache-refresh", daemon=True).start()
+
+    @staticmethod
+    def _is_success(results: List) -> bool:
+        return bool(results) and isinstance(results[0], FlightOffer)
+
+    def _fetch_flights(self, origin: str, destination: str, formatted_date: str,
+                       adults: int, currency: str, max_results: int) -> SearchResults:
+        """Call the Amadeus flight-offers API and process the response"""
+        try:
+            # Step 1: Get a (cached) access token
+            try:
+                access_token = self.token_manager.get_token()
+            except AmadeusAuthError as e:
+                return [{"error": str(e)}]
             
-            if token_response.status_code != 200:
-                return [{"error": f"Authentication failed: {token_response.status_code} - {token_response.text}"}]
+            # Step 2: Search for flights
+            logger.info("🔍 Searching for flights...")
+            params = self._search_params(origin, destination, formatted_date, adults, currency, max_results)
+            logger.info(f"🔍 Search params: {params}")
+            search_response = self.client.get(SEARCH_PATH, headers=self._search_headers(access_token), params=params)
             
-            token_json = token_response.json()
-            access_token = token_json.get("access_token")
+            if search_response.status_code == 401:
+                # The cached token was revoked or expired early - refresh once and retry
+                logger.warning("🔐 Access token rejected, refreshing and retrying once")
+                self.token_manager.invalidate(access_token)
+                try:
+                    access_token = self.token_manager.get_token()
+                except AmadeusAuthError as e:
+                    return [{"error": str(e)}]
+                search_response = self.client.get(SEARCH_PATH, headers=self._search_headers(access_token), params=params)
             
-            if not access_token:
-                return [{"error": "Failed to get access token from Amadeus API"}]
+            return self._process_search_response(search_response, origin, destination, formatted_date)
             
-            logger.info("✅ Successfully obtained access token")
+        except (RateLimitExceeded, CircuitOpenError) as e:
+            return [{"error": str(e)}]
+        except requests.exceptions.RequestException as e:
+            return [{"error": f"Network error: {e}"}]
+        except Exception as e:
+            return [{"error": f"Unexpected error: {e}"}]
+
+    async def _afetch_flights(self, origin: str, destination: str, formatted_date: str,
+                              adults: int, currency: str, max_results: int) -> SearchResults:
+        """Async counterpart of _fetch_flights"""
+        client = get_async_amadeus_client(self.base_url)
+        try:
+            try:
+                access_token = await self._aget_token()
+            except AmadeusAuthError as e:
+                return [{"error": str(e)}]
             
-            # Step 2: Search for flights
             logger.info("🔍 Searching for flights...")
-            search_url = f"{self.base_url}/v2/shopping/flight-offers"
-            params = {
-                "originLocationCode": origin.upper(), 
-                "destinationLocationCode": destination.upper(), 
-                "departureDate": formatted_date, 
-                "adults": 1, 
-                "max": 5,
-                "currencyCode": "INR"
-            }
+            params = self._search_params(origin, destination, formatted_date, adults, currency, max_results)
+            logger.info(f"🔍 Search params: {params}")
+            search_response = await client.get(SEARCH_PATH, headers=self._search_headers(access_token), params=params)
             
-            search_headers = {
-                "Authorization": f"Bearer {access_token}",
-                "Content-Type": "application/json"
-            }
+            if search_response.status_code == 401:
+                logger.warning("🔐 Access token rejected, refreshing and retrying once")
+                self.token_manager.invalidate(access_token)
+                try:
+                    access_token = await self._aget_token()
+                except AmadeusAuthError as e:
+                    return [{"error": str(e)}]
+                search_response = await client.get(SEARCH_PATH, headers=self._search_headers(access_token), params=params)
             
-            logger.info(f"🔍 Search params: {params}")
-            search_response = requests.get(search_url, headers=search_headers, params=params)
+            return self._process_search_response(search_response, origin, destination, formatted_date)
+            
+        except (RateLimitExceeded, CircuitOpenError) as e:
+            return [{"error": str(e)}]
+        except httpx.HTTPError as e:
+            return [{"error": f"Network error: {e}"}]
+        except Exception as e:
+            return [{"error": f"Unexpected error: {e}"}]
+
+    async def _aget_token(self) -> str:
+        # Token fetches are rare, so a cache miss is handed to a thread rather than duplicated in async code
+        return self.token_manager.cached_token() or await asyncio.to_thread(self.token_manager.get_token)
+
+    def _search_params(self, origin: str, destination: str, formatted_date: str,
+                       adults: int, currency: str, max_results: int) -> Dict:
+        return {
+            "originLocationCode": origin.upper(), 
+            "destinationLocationCode": destination.upper(), 
+            "departureDate": formatted_date, 
+            "adults": adults, 
+            "max": max_results,
+            "currencyCode": currency
+        }
+
+    def _process_search_response(self, search_response, origin: str, destination: str,
+                                 formatted_date: str) -> SearchResults:
+        """Turn a flight-offers response (requests or httpx) into FlightOffers or an error"""
+        try:
             logger.info(f"🔍 Search response status: {search_response.status_code}")
             
             if search_response.status_code != 200:
@@ -161,144 +470,236 @@ class FlightAgentService:
             if not flights:
                 return [{"error": f"No flights found from {origin} to {destination} on {formatted_date}."}]
 
-            # Step 3: Process flight data
-            results = []
-            for flight in flights:
-                try:
-                    # Get airline code
-                    airlines = flight.get("validatingAirlineCodes", [])
-                    airline = airlines[0] if airlines else "Unknown"
-                    
-                    # Get price
-                    price_info = flight.get("price", {})
-                    total_price = price_info.get("total", "N/A")
-                    currency = price_info.get("currency", "INR")
-                    
-                    # Get itinerary details
-                    itineraries = flight.get("itineraries", [])
-                    if itineraries:
-                        segments = itineraries[0].get("segments", [])
-                        if segments:
-                            departure_segment = segments[0]
-                            arrival_segment = segments[-1]
-                            
-                            dep_time = departure_segment.get("departure", {}).get("at", "N/A")
-                            arr_time = arrival_segment.get("arrival", {}).get("at", "N/A")
-                            
-                            # Format times to be more readable
-                            dep_time_formatted = self.format_time(dep_time)
-                            arr_time_formatted = self.format_time(arr_time)
-                            
-                            # Calculate duration
-                            duration = self.calculate_duration(dep_time, arr_time)
-                            
-                            results.append({
-                                "airline": airline, 
-                                "price": f"₹{total_price}", 
-                                "departure_time": dep_time_formatted, 
-                                "arrival_time": arr_time_formatted,
-                                "duration": duration,
-                                "flight_number": f"{airline} {departure_segment.get('number', '')}",
-                                "origin": origin.upper(),
-                                "destination": destination.upper(),
-                                "date": formatted_date
-                            })
-                except Exception as flight_error:
-                    logger.error(f"⚠️ Error processing flight: {flight_error}")
-                    continue
+            # Step 3: Normalize the offers; display strings are built at the API boundary
+            results = normalize_offers(flights, origin, destination, formatted_date)
             
             if not results:
                 return [{"error": "No valid flight data could be processed"}]
                 
             return results
             
-        except requests.exceptions.RequestException as e:
-            return [{"error": f"Network error: {e}"}]
         except Exception as e:
             return [{"error": f"Unexpected error: {e}"}]
 
-    def format_time(self, iso_time: str) -> str:
-        """Convert ISO time to readable format"""
-        try:
-            dt = datetime.fromisoformat(iso_time.replace('Z', '+00:00'))
-            return dt.strftime("%H:%M")
-        except:
-            return iso_time
+    def _search_headers(self, access_token: str) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json"
+        }
 
-    def calculate_duration(self, departure: str, arrival: str) -> str:
-        """Calculate flight duration"""
-        try:
-            dep_dt = datetime.fromisoformat(departure.replace('Z', '+00:00'))
-            arr_dt = datetime.fromisoformat(arrival.replace('Z', '+00:00'))
-            duration = arr_dt - dep_dt
-            hours = duration.seconds // 3600
-            minutes = (duration.seconds % 3600) // 60
-            return f"{hours}h {minutes}m"
-        except:
-            return "N/A"
+    def run_query(self, query: str, flex_days: Optional[int] = None,
+                  near: Optional[Tuple[float, float]] = None) -> FlightQueryResult:
+        """
+        Process a natural language query with a single upstream search and
+        return the parsed intent, flight offers and reply text together.
+        Flexible-date queries ("around next Friday", or `flex_days`) and
+        city codes served by several airports fan out over every day and
+        airport pair instead. With `near` (lat, lon), a query that names no
+        origin ("flights from near me to Goa") searches from the nearest
+        airports.
+        """
+        result = self._parse_intent(query, flex_days, near)
+        if not result.ok:
+            return self._complete_result(result, [])
+        if self._needs_fanout(result):
+            fanout = self.search_fanout(result.origin_airports, result.destination, result.departure_date, result.flex_days)
+            result.best_by_day = fanout["best_by_day"]
+            return self._complete_result(result, fanout["offers"])
+        
+        flights = self.search_flights(result.origin, result.destination, result.departure_date)
+        return self._complete_result(result, flights)
+
+    async def arun_query(self, query: str, flex_days: Optional[int] = None,
+                         near: Optional[Tuple[float, float]] = None) -> FlightQueryResult:
+        """Async variant of run_query"""
+        result = self._parse_intent(query, flex_days, near)
+        if not result.ok:
+            return self._complete_result(result, [])
+        if self._needs_fanout(result):
+            fanout = await self.asearch_fanout(result.origin_airports, result.destination, result.departure_date, result.flex_days)
+            result.best_by_day = fanout["best_by_day"]
+            return self._complete_result(result, fanout["offers"])
+        
+        flights = await self.asearch_flights(result.origin, result.destination, result.departure_date)
+        return self._complete_result(result, flights)
+
+    def stream_query(self, query: str, flex_days: Optional[int] = None,
+                     near: Optional[Tuple[float, float]] = None, adults: int = 1, currency: str = "INR",
+                     max_results: int = 5) -> Iterator[Tuple[str, object]]:
+        """
+        Process a query like run_query, yielding (event, data) pairs as work completes:
+        "intent" with the parsed intent, then an "offer" per flight for a single
+        search or a "batch" per completed search for fan-out queries, and
+        finally "result" with the FlightQueryResult. `adults`, `currency` and
+        `max_results` apply to every upstream search, as in search_fanout.
+        """
+        result = self._parse_intent(query, flex_days, near)
+        yield "intent", result.intent
+        
+        if not result.ok:
+            self._complete_result(result, [])
+        elif self._needs_fanout(result):
+            searches = self.plan_searches(result.origin_airports, result.destination, result.departure_date, result.flex_days)
+            results: List[List] = [[] for _ in searches]
+            for index, search_results in self._iter_fan_out(searches, adults, currency, max_results):
+                results[index] = search_results
+                yield "batch", self._batch_event(searches[index], search_results)
+            
+            fanout = self._merge_results(searches, results, result.flex_days)
+            result.best_by_day = fanout["best_by_day"]
+            self._complete_result(result, fanout["offers"])
+        else:
+            flights = self.search_flights(result.origin, result.destination, result.departure_date,
+                                          adults=adults, currency=currency, max_results=max_results)
+            self._complete_result(result, flights)
+            for flight in result.flights:
+                yield "offer", flight
+        
+        yield "result", result
+
+    async def astream_query(self, query: str, flex_days: Optional[int] = None,
+                            near: Optional[Tuple[float, float]] = None, adults: int = 1, currency: str = "INR",
+                            max_results: int = 5) -> AsyncIterator[Tuple[str, object]]:
+        """Async variant of stream_query, yielding each fan-out batch as its search completes"""
+        result = self._parse_intent(query, flex_days, near)
+        yield "intent", result.intent
+        
+        if not result.ok:
+            self._complete_result(result, [])
+        elif self._needs_fanout(result):
+            searches = self.plan_searches(result.origin_airports, result.destination, result.departure_date, result.flex_days)
+            results: List[List] = [[] for _ in searches]
+            async for index, search_results in self._aiter_fan_out(searches, adults, currency, max_results):
+                results[index] = search_results
+                yield "batch", self._batch_event(searches[index], search_results)
+            
+            fanout = self._merge_results(searches, results, result.flex_days)
+            result.best_by_day = fanout["best_by_day"]
+            self._complete_result(result, fanout["offers"])
+        else:
+            flights = await self.asearch_flights(result.origin, result.destination, result.departure_date,
+                                                 adults=adults, currency=currency, max_results=max_results)
+            self._complete_result(result, flights)
+            for flight in result.flights:
+                yield "offer", flight
+        
+        yield "result", result
+
+    def _batch_event(self, search: Tuple[str, str, str], search_results: List) -> Dict:
+        origin, destination, day = search
+        batch = {"origin": origin, "destination": destination, "date": day, "flights": []}
+        if self._is_success(search_results):
+            batch["flights"] = [offer.to_dict() for offer in search_results]
+        else:
+            batch["error"] = search_results[0].get('error') if search_results else 'No flights found'
+        return batch
+
+    def _parse_intent(self, query: str, flex_days: Optional[int] = None,
+                      near: Optional[Tuple[float, float]] = None) -> FlightQueryResult:
+        # Extract flight details from query
+        parsed = parse_query(query)
+        if flex_days is None:
+            flex_days = parsed.flex_days
+        # Place names are resolved offline; an unknown place fails here, before any upstream call
+        origin, destination, error = self._resolve_route(parsed.origin, parsed.destination)
+        confidence = parsed.confidence
+        
+        nearby_origins: Tuple[str, ...] = ()
+        if near is not None and "origin" in parsed.defaulted:
+            max_km = get_setting("FLIGHT_NEARBY_MAX_KM", 150.0)
+            nearby = nearest_airports(*near, k=get_setting("FLIGHT_NEARBY_ORIGINS", 3), max_km=max_km)
+            nearby_origins = tuple(airport.iata for airport, _ in nearby if airport.iata != destination)
+            if nearby_origins:
+                origin = nearby_origins[0]
+                confidence = min(1.0, confidence + 0.4)
+            else:
+                error = error or f"No airport within {max_km:.0f} km of your location"
+        
+        return FlightQueryResult(
+            query=query,
+            origin=origin,
+            destination=destination,
+            date=parsed.date,
+            departure_date=parsed.departure_date,
+            flex_days=max(0, min(int(flex_days), get_setting("FLIGHT_FLEX_MAX_DAYS", 7))),
+            confidence=round(confidence, 2),
+            nearby_origins=nearby_origins,
+            error=error
+        )
+
+    @staticmethod
+    def _resolve_route(origin: str, destination: str) -> Tuple[str, str, Optional[str]]:
+        """IATA codes for a route's place names, plus an error naming any place we don't know"""
+        origin_code = resolve_location(origin)
+        destination_code = resolve_location(destination)
+        unknown = [place for place, code in ((origin, origin_code), (destination, destination_code)) if code is None]
+        error = f"Unknown airport or city: {', '.join(unknown)}" if unknown else None
+        return origin_code or origin.upper(), destination_code or destination.upper(), error
+
+    def _needs_fanout(self, result: FlightQueryResult) -> bool:
+        return bool(result.flex_days) or len(result.origin_airports) > 1 or len(result.destination_airports) > 1
+
+    def _complete_result(self, result: FlightQueryResult, flights: List) -> FlightQueryResult:
+        if self._is_success(flights):
+            result.offers = flights
+        elif result.ok:
+            result.error = flights[0].get('error', 'Unknown error') if flights else 'No flights found'
+        
+        result.response = self.format_response(result)
+        return result
 
     def process_query(self, query: str) -> str:
         """
         Process natural language query and return formatted response
         """
-        # Extract flight details from query
-        origin = self.extract_origin(query)
-        destination = self.extract_destination(query)
-        date = self.extract_date(query)
-        
-        # Search for flights
-        flights = self.search_flights(origin, destination, date)
-        
-        # Format response
-        if flights and not flights[0].get('error'):
-            response = "🛫 I found these flights for you:\n\n"
-            for i, flight in enumerate(flights):
-                response += f"{i + 1}. **{flight['airline']}** {flight['flight_number']} - {flight['price']}\n"
-                response += f"   🛫 Departure: {flight['departure_time']} | 🛬 Arrival: {flight['arrival_time']} | ⏱️ Duration: {flight['duration']}\n\n"
-            response += "💡 Tap on any flight card below to book or get more details!"
-            return response
-        else:
-            error = flights[0].get('error', 'Unknown error') if flights else 'No flights found'
-            return f"❌ Sorry, I couldn't find any flights for that route and date. Error: {error}"
+        return self.run_query(query).response
+
+    def format_response(self, result: FlightQueryResult) -> str:
+        """Render the chat reply for a query result"""
+        if result.error:
+            return f"❌ Sorry, I couldn't find any flights for that route and date. Error: {result.error}"
+        
+        if result.best_by_day:
+            return self.format_flexible_response(result)
+        
+        multi_airport = len(result.origin_airports) > 1 or len(result.destination_airports) > 1
+        response = "🛫 I found these flights for you:\n\n"
+        for i, flight in enumerate(result.flights):
+            response += f"{i + 1}. **{flight['airline']}** {flight['flight_number']} - {flight['price']}\n"
+            if multi_airport:
+                response += f"   ✈️ {flight['origin']} → {flight['destination']}\n"
+            response += f"   🛫 Departure: {flight['departure_time']} | 🛬 Arrival: {flight['arrival_time']} | ⏱️ Duration: {flight['duration']}\n\n"
+        response += "💡 Tap on any flight card below to book or get more details!"
+        return response
+
+    def format_flexible_response(self, result: FlightQueryResult) -> str:
+        """Render the cheapest flight per day for a flexible-date query"""
+        response = f"🛫 Cheapest flights around {result.departure_date} (±{result.flex_days} days):\n\n"
+        for day in result.daily_best:
+            flight = day["flight"]
+            if flight:
+                response += f"📅 {day['date']}: **{flight['airline']}** {flight['flight_number']} - {flight['price']}"
+                response += f" | 🛫 {flight['departure_time']} → 🛬 {flight['arrival_time']}\n"
+            else:
+                response += f"📅 {day['date']}: no flights found\n"
+        
+        best = result.offers[0].to_dict()
+        response += f"\n⭐ Best overall: **{best['airline']}** {best['flight_number']} on {best['date']} - {best['price']}\n\n"
+        response += "💡 Tap on any flight card below to book or get more details!"
+        return response
 
     def extract_origin(self, query: str) -> str:
-        """Extract origin from query (basic implementation)"""
-        import re
-        # Basic regex to find "from X to Y" pattern
-        from_to_pattern = re.compile(r'from\s+(\w+)', re.IGNORECASE)
-        match = from_to_pattern.search(query)
-        return match.group(1).upper() if match else 'DEL'
+        """Extract origin from query"""
+        return parse_query(query).origin
 
     def extract_destination(self, query: str) -> str:
-        """Extract destination from query (basic implementation)"""
-        import re
-        to_pattern = re.compile(r'to\s+(\w+)', re.IGNORECASE)
-        match = to_pattern.search(query)
-        return match.group(1).upper() if match else 'BOM'
+        """Extract destination from query"""
+        return parse_query(query).destination
+
+    def extract_flex_days(self, query: str) -> int:
+        """Extract a flexible-date window like 'around Friday' or '+/- 2 days'"""
+        return parse_query(query).flex_days
 
     def extract_date(self, query: str) -> str:
-        """Extract date from query (basic implementation)"""
-        query_lower = query.lower()
-        if 'tomorrow' in query_lower:
-            return 'tomorrow'
-        elif 'today' in query_lower:
-            return 'today'
-        elif 'next monday' in query_lower:
-            return 'next monday'
-        elif 'next tuesday' in query_lower:
-            return 'next tuesday'
-        elif 'next wednesday' in query_lower:
-            return 'next wednesday'
-        elif 'next thursday' in query_lower:
-            return 'next thursday'
-        elif 'next friday' in query_lower:
-            return 'next friday'
-        elif 'next saturday' in query_lower:
-            return 'next saturday'
-        elif 'next sunday' in query_lower:
-            return 'next sunday'
-        elif 'next week' in query_lower:
-            return 'next week'
-        else:
-            # Default to tomorrow if no date specified
-            return 'tomorrow'
+        """Extract the date phrase from query, defaulting to tomorrow"""
+        return parse_query(query).date
@@ -0,0 +1,120 @@
+import heapq
+import logging
+import math
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+from .resolver import Airport, airport_rank, get_location_index
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _unit_vector(lat: float, lon: float) -> Tuple[float, float, float]:
+    phi, lam = math.radians(lat), math.radians(lon)
+    return (math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi))
+
+
+def _chord_to_km(chord: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def _km_to_chord(km: float) -> float:
+    return 2 * math.sin(min(math.pi, km / EARTH_RADIUS_KM) / 2)
+
+
+class AirportLocator:
+    """
+    k-nearest-airport lookup over a KD-tree of the airports' positions as
+    3D unit vectors. Straight-line (chord) distance between unit vectors
+    orders points exactly like great-circle distance, without special
+    cases at the poles or the antimeridian.
+    """
+
+    def __init__(self, airports: Sequence[Airport]):
+        self.airports = list(airports)
+        self._points = [_unit_vector(airport.lat, airport.lon) for airport in self.airports]
+        # Nodes are (index, axis, left, right), children are node ids or -1
+        self._nodes: List[Tuple[int, int, int, int]] = []
+        self._root = self._build(list(range(len(self._points))))
+
+    def _build(self, indices: List[int]) -> int:
+        if not indices:
+            return -1
+        # Split on the widest axis; points on a sphere are spread unevenly across x, y and z
+        points = self._points
+        axis = max(range(3), key=lambda a: max(points[i][a] for i in indices) - min(points[i][a] for i in indices))
+        indices.sort(key=lambda i: points[i][axis])
+        middle = len(indices) // 2
+        node = len(self._nodes)
+        self._nodes.append((indices[middle], axis, -1, -1))
+        left = self._build(indices[:middle])
+        right = self._build(indices[middle + 1:])
+        self._nodes[node] = (indices[middle], axis, left, right)
+        return node
+
+    def nearest(self, lat: float, lon: float, k: int = 5,
+                max_km: Optional[float] = None) -> List[Tuple[Airport, float]]:
+        """The k airports nearest to (lat, lon), closest first, with their distance in km"""
+        target = _unit_vector(lat, lon)
+        limit = _km_to_chord(max_km) ** 2 if max_km is not None else math.inf
+        best: List[Tuple[float, int]] = []  # max-heap of (-squared chord, index)
+        points, nodes = self._points, self._nodes
+
+        # (node, squared distance from the target to the node's side of its parent's plane)
+        stack = [(self._root, 0.0)]
+        while stack:
+            node, plane = stack.pop()
+            if node < 0 or plane > (-best[0][0] if len(best) == k else limit):
+                continue
+            index, axis, left, right = nodes[node]
+            point = points[index]
+            dx, dy, dz = point[0] - target[0], point[1] - target[1], point[2] - target[2]
+            distance = dx * dx + dy * dy + dz * dz
+            if distance <= limit:
+                if len(best) < k:
+                    heapq.heappush(best, (-distance, index))
+                elif distance < -best[0][0]:
+                    heapq.heapreplace(best, (-distance, index))
+
+            diff = target[axis] - point[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            # The far side is visited last and skipped if its plane is out of range by then
+            stack.append((far, diff * diff))
+            stack.append((near, 0.0))
+
+        return [(self.airports[index], round(_chord_to_km(math.sqrt(-distance)), 1))
+                for distance, index in sorted(best, reverse=True)]
+
+
+_locator: Optional[AirportLocator] = None
+_locator_lock = threading.Lock()
+
+
+def get_airport_locator() -> AirportLocator:
+    """Return the process-wide locator over commercial airports, built on first use (FlightAgentConfig.ready builds it at startup)"""
+    global _locator
+    if _locator is None:
+        with _locator_lock:
+            if _locator is None:
+                airports = get_location_index().airports.values()
+                _locator = AirportLocator([airport for airport in airports if airport_rank(airport) >= 0])
+                logger.info(f"📍 Indexed {len(_locator.airports)} airports for nearest-airport lookups")
+    return _locator
+
+
+def nearest_airports(lat: float, lon: float, k: int = 5,
+                     max_km: Optional[float] = None) -> List[Tuple[Airport, float]]:
+    """The k commercial airports nearest to a position, closest first, with distances in km"""
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError(f"Invalid coordinates: {lat}, {lon}")
+    return get_airport_locator().nearest(lat, lon, max(1, k), max_km)
@@ -0,0 +1,112 @@
+from typing import List, Optional, Tuple
+
+from django.db.models import QuerySet
+
+from .models import FlightResultSet, FlightSearchQuery, ChatMessage, result_set_digest
+from .flight_service import FlightQueryResult
+from .write_behind import get_history_writer
+
+MAX_PAGE_SIZE = 200
+
+
+def _queued(row, flights=None) -> bool:
+    """Hand an unsaved row to the write-behind queue, when HISTORY_WRITE_BEHIND is on and it has room"""
+    writer = get_history_writer()
+    return writer is not None and writer.submit(row, flights)
+
+
+def _query_rows(user, result: FlightQueryResult) -> List:
+    """The unsaved search history row (for successful queries) and agent reply for a processed query"""
+    reply = ChatMessage(user=user, message=result.response, is_user=False)
+    if not result.ok:
+        return [reply]
+    search = FlightSearchQuery(
+        user=user,
+        query=result.query,
+        origin=result.origin,
+        destination=result.destination,
+        date=result.date
+    )
+    return [search, reply]
+
+
+def save_user_message(user, query: str) -> ChatMessage:
+    """Save the user's chat message, or queue it when history is written behind"""
+    message = ChatMessage(user=user, message=query, is_user=True)
+    if not _queued(message):
+        message.save()
+    return message
+
+
+def intern_result_set(flights) -> Optional[FlightResultSet]:
+    """The FlightResultSet holding exactly these flights, stored if new; None for no flights"""
+    if not flights:
+        return None
+    result_set, _ = FlightResultSet.objects.get_or_create(digest=result_set_digest(flights), defaults={'flights': flights})
+    return result_set
+
+
+def save_query_result(user, result: FlightQueryResult) -> ChatMessage:
+    """
+    Save a processed query to search history and the agent reply to chat
+    history, or queue them when history is written behind. Both reference
+    one shared FlightResultSet for the flights. The reply's public_id is
+    set either way.
+    """
+    rows = _query_rows(user, result)
+    unsaved = [row for row in rows if not _queued(row, result.flights)]
+    if unsaved:
+        result_set = intern_result_set(result.flights)
+        for row in unsaved:
+            row.result_set = result_set
+            row.save()
+    return rows[-1]
+
+
+async def asave_user_message(user, query: str) -> ChatMessage:
+    """Async variant of save_user_message"""
+    message = ChatMessage(user=user, message=query, is_user=True)
+    if not _queued(message):
+        await message.asave()
+    return message
+
+
+async def aintern_result_set(flights) -> Optional[FlightResultSet]:
+    """Async variant of intern_result_set"""
+    if not flights:
+        return None
+    result_set, _ = await FlightResultSet.objects.aget_or_create(digest=result_set_digest(flights), defaults={'flights': flights})
+    return result_set
+
+
+async def asave_query_result(user, result: FlightQueryResult) -> ChatMessage:
+    """Async variant of save_query_result"""
+    rows = _query_rows(user, result)
+    unsaved = [row for row in rows if not _queued(row, result.flights)]
+    if unsaved:
+        result_set = await aintern_result_set(result.flights)
+        for row in unsaved:
+            row.result_set = result_set
+            await row.asave()
+    return rows[-1]
+
+
+def history_page(queryset: QuerySet, before: Optional[int], limit: int) -> Tuple[List, Optional[int]]:
+    """
+    One page of history rows, newest first: the rows older than the row with
+    id `before` (or the newest rows), plus the `before` cursor for the next
+    page, None on the last one. Pages are found by (timestamp, id) on the
+    (user, timestamp, id) index rather than by OFFSET, so page 1000 costs
+    the same as page 1. Raises ValueError for a cursor outside `queryset`.
+    The page's flight result sets are fetched together in one more query.
+    """
+    queryset = queryset.order_by('-timestamp', '-id')
+    if before is not None:
+        cursor = queryset.filter(id=before).values_list('timestamp', flat=True).first()
+        if cursor is None:
+            raise ValueError(f"Unknown cursor: {before}")
+        queryset = queryset.filter(timestamp__lte=cursor).exclude(timestamp=cursor, id__gte=before)
+
+    rows = list(queryset.prefetch_related('result_set')[:limit + 1])
+    next_before = rows[limit - 1].id if len(rows) > limit else None
+    return rows[:limit], next_before
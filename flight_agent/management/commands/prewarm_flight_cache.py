@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from flight_agent.conf import get_setting
+from flight_agent.prewarm import prewarm_popular_routes
+
+
+class Command(BaseCommand):
+    help = "Fetch and cache flight offers for the most popular recent routes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=None,
+                            help="Number of routes to warm (default: FLIGHT_PREWARM_TOP_ROUTES)")
+        parser.add_argument("--window-hours", type=int, default=None,
+                            help="Look-back window for popularity (default: FLIGHT_PREWARM_WINDOW_HOURS)")
+        parser.add_argument("--budget", type=int, default=None,
+                            help="Most upstream searches to make (default: FLIGHT_PREWARM_BUDGET)")
+
+    def handle(self, *args, **options):
+        if not get_setting("FLIGHT_CACHE_SHARED_ALIAS", None):
+            self.stderr.write(self.style.WARNING(
+                "FLIGHT_CACHE_SHARED_ALIAS is not set, so the warmed entries stay in this "
+                "process and will not be seen by the web workers."
+            ))
+
+        stats = prewarm_popular_routes(
+            top_n=options["top"],
+            window_hours=options["window_hours"],
+            budget=options["budget"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Warmed {stats['warmed']} searches for {stats['routes']} routes "
+            f"({stats['fresh']} already fresh, {stats['failed']} failed, {stats['skipped']} skipped)"
+        ))
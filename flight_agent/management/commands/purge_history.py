@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from flight_agent.retention import purge_history
+
+
+class Command(BaseCommand):
+    help = "Delete chat and search history beyond the retention limits, optionally archiving it first"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-age-days", type=int, default=None,
+                            help="Delete rows older than this; 0 keeps them (default: HISTORY_RETENTION_DAYS)")
+        parser.add_argument("--max-chat-messages", type=int, default=None,
+                            help="Chat messages kept per user; 0 for no cap (default: HISTORY_MAX_CHAT_MESSAGES_PER_USER)")
+        parser.add_argument("--max-searches", type=int, default=None,
+                            help="Searches kept per user; 0 for no cap (default: HISTORY_MAX_SEARCHES_PER_USER)")
+        parser.add_argument("--archive-dir", default=None,
+                            help="Write purged rows here as .jsonl.gz first (default: HISTORY_ARCHIVE_DIR)")
+        parser.add_argument("--chunk-size", type=int, default=None,
+                            help="Rows deleted per transaction (default: HISTORY_PURGE_CHUNK_SIZE)")
+        parser.add_argument("--pause", type=float, default=None,
+                            help="Seconds to wait between chunks (default: HISTORY_PURGE_PAUSE)")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the rows that would be deleted")
+
+    def handle(self, *args, **options):
+        stats = purge_history(
+            max_age_days=options["max_age_days"],
+            max_chat_messages=options["max_chat_messages"],
+            max_searches=options["max_searches"],
+            archive_dir=options["archive_dir"],
+            chunk_size=options["chunk_size"],
+            pause=options["pause"],
+            dry_run=options["dry_run"],
+        )
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {stats['chat_messages']} chat messages and {stats['searches']} searches "
+            f"({stats['result_sets']} unused result sets)"
+        ))
+        for path in stats.get("archives", []):
+            self.stdout.write(f"Archived to {path}")
@@ -0,0 +1,75 @@
+# Generated by Django 5.1.2 on 2026-10-18 00:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+HISTORY_MODELS = ('ChatMessage', 'FlightSearchQuery')
+BATCH_SIZE = 2000
+
+
+def remap_users(apps, old_model, new_model):
+    """
+    Point history rows at the account with the same email in `new_model`.
+    Rows whose owner has no such account are deleted: they cannot be shown
+    to anyone once the foreign key moves.
+    """
+    old_emails = dict(apps.get_model(*old_model).objects.values_list('id', 'email'))
+    new_ids = {email.lower(): pk for pk, email in apps.get_model(*new_model).objects.values_list('id', 'email')}
+    mapping = {old_id: new_ids.get((email or '').lower()) for old_id, email in old_emails.items()}
+    for name in HISTORY_MODELS:
+        model = apps.get_model('flight_agent', name)
+        # Old and new ids overlap, so every row is picked out before any is changed
+        owners = {}
+        for pk, old_id in model.objects.values_list('pk', 'user_id'):
+            owners.setdefault(mapping.get(old_id), []).append(pk)
+        for new_id, pks in owners.items():
+            for start in range(0, len(pks), BATCH_SIZE):
+                rows = model.objects.filter(pk__in=pks[start:start + BATCH_SIZE])
+                if new_id is None:
+                    rows.delete()
+                else:
+                    rows.update(user_id=new_id)
+
+
+def users_to_app_users(apps, schema_editor):
+    remap_users(apps, settings.AUTH_USER_MODEL.split('.'), ('authentication', 'AppUser'))
+
+
+def app_users_to_users(apps, schema_editor):
+    remap_users(apps, ('authentication', 'AppUser'), settings.AUTH_USER_MODEL.split('.'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('authentication', '0003_appuser_alter_user_managers_remove_user_created_at_and_more'),
+        ('flight_agent', '0001_initial'),
+    ]
+
+    # The ids are remapped while the columns carry no constraint, so neither
+    # the old nor the new foreign key is checked against half-moved rows
+    operations = [
+        migrations.AlterField(
+            model_name='chatmessage',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='authentication.appuser'),
+        ),
+        migrations.AlterField(
+            model_name='flightsearchquery',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='authentication.appuser'),
+        ),
+        migrations.RunPython(users_to_app_users, app_users_to_users),
+        migrations.AlterField(
+            model_name='chatmessage',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='authentication.appuser'),
+        ),
+        migrations.AlterField(
+            model_name='flightsearchquery',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='authentication.appuser'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0003_appuser_alter_user_managers_remove_user_created_at_and_more'),
+        ('flight_agent', '0002_alter_chatmessage_user_alter_flightsearchquery_user'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['user', 'timestamp', 'id'], name='chat_user_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flightsearchquery',
+            index=models.Index(fields=['user', 'timestamp', 'id'], name='search_user_timestamp_idx'),
+        ),
+    ]
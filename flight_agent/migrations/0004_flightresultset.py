@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight_agent', '0003_chatmessage_chat_user_timestamp_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlightResultSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('flights', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='result_set',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='messages', to='flight_agent.flightresultset'),
+        ),
+        migrations.AddField(
+            model_name='flightsearchquery',
+            name='result_set',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='searches', to='flight_agent.flightresultset'),
+        ),
+    ]
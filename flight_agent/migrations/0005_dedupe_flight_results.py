@@ -0,0 +1,63 @@
+import hashlib
+import json
+
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+
+def digest(flights):
+    # A frozen copy of models.result_set_digest
+    canonical = json.dumps(flights, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def link_rows(FlightResultSet, model, field, known):
+    """Point every row of `model` with offers in `field` at the result set holding them"""
+    batch = []
+    rows = model.objects.filter(result_set__isnull=True).only('id', field).order_by('id')
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        flights = getattr(row, field)
+        if not flights:
+            continue
+        key = digest(flights)
+        if key not in known:
+            known[key] = FlightResultSet.objects.create(digest=key, flights=flights).id
+        row.result_set_id = known[key]
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            model.objects.bulk_update(batch, ['result_set'])
+            batch = []
+    model.objects.bulk_update(batch, ['result_set'])
+
+
+def dedupe_results(apps, schema_editor):
+    FlightResultSet = apps.get_model('flight_agent', 'FlightResultSet')
+    known = dict(FlightResultSet.objects.values_list('digest', 'id'))
+    link_rows(FlightResultSet, apps.get_model('flight_agent', 'FlightSearchQuery'), 'results', known)
+    link_rows(FlightResultSet, apps.get_model('flight_agent', 'ChatMessage'), 'flights', known)
+
+
+def restore_results(apps, schema_editor):
+    for name, field in (('FlightSearchQuery', 'results'), ('ChatMessage', 'flights')):
+        model = apps.get_model('flight_agent', name)
+        batch = []
+        rows = model.objects.filter(result_set__isnull=False).select_related('result_set').order_by('id')
+        for row in rows.iterator(chunk_size=BATCH_SIZE):
+            setattr(row, field, row.result_set.flights)
+            batch.append(row)
+            if len(batch) == BATCH_SIZE:
+                model.objects.bulk_update(batch, [field])
+                batch = []
+        model.objects.bulk_update(batch, [field])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight_agent', '0004_flightresultset'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_results, restore_results),
+    ]
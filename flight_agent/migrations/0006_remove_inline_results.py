@@ -0,0 +1,21 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:06
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight_agent', '0005_dedupe_flight_results'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='chatmessage',
+            name='flights',
+        ),
+        migrations.RemoveField(
+            model_name='flightsearchquery',
+            name='results',
+        ),
+    ]
@@ -0,0 +1,28 @@
+import uuid
+
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+
+def populate_public_ids(apps, schema_editor):
+    ChatMessage = apps.get_model('flight_agent', 'ChatMessage')
+    batch = []
+    for message in ChatMessage.objects.only('id').order_by('id').iterator(chunk_size=BATCH_SIZE):
+        message.public_id = uuid.uuid4()
+        batch.append(message)
+        if len(batch) == BATCH_SIZE:
+            ChatMessage.objects.bulk_update(batch, ['public_id'])
+            batch = []
+    ChatMessage.objects.bulk_update(batch, ['public_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight_agent', '0007_chatmessage_public_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_public_ids, migrations.RunPython.noop),
+    ]
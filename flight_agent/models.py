@@ -1,36 +1,75 @@
 from django.db import models
-from django.contrib.auth import get_user_model
+from django.utils import timezone
+from authentication.models import AppUser
+import hashlib
 import json
+import uuid
 
-User = get_user_model()
+
+def result_set_digest(flights) -> str:
+    """SHA-256 of the canonical JSON of a list of flight offers"""
+    canonical = json.dumps(flights, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class FlightResultSet(models.Model):
+    """
+    A list of flight offers stored once, however many searches and chat
+    messages returned it: rows are found by the digest of their content
+    (see history.intern_result_set).
+    """
+    digest = models.CharField(max_length=64, unique=True)
+    flights = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{len(self.flights)} flights ({self.digest[:12]})"
 
 
 class FlightSearchQuery(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    user = models.ForeignKey(AppUser, on_delete=models.CASCADE)
     query = models.TextField()
     origin = models.CharField(max_length=10)
     destination = models.CharField(max_length=10)
     date = models.CharField(max_length=50)
-    results = models.JSONField(default=list)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    result_set = models.ForeignKey(FlightResultSet, on_delete=models.PROTECT, null=True, blank=True, related_name='searches')
+    # Set when the row is made rather than when it is written, which may be later (see write_behind)
+    timestamp = models.DateTimeField(default=timezone.now)
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # Keyset pagination of a user's history (see history.history_page)
+            models.Index(fields=['user', 'timestamp', 'id'], name='search_user_timestamp_idx'),
+        ]
     
+    @property
+    def results(self):
+        return self.result_set.flights if self.result_set_id else []
+
     def __str__(self):
-        return f"{self.user.username} - {self.origin} to {self.destination} on {self.date}"
+        return f"{self.user.email} - {self.origin} to {self.destination} on {self.date}"
 
 
 class ChatMessage(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Known before the row is written, so it can be returned as the message_id straight away
+    public_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(AppUser, on_delete=models.CASCADE)
     message = models.TextField()
     is_user = models.BooleanField(default=True)
-    flights = models.JSONField(default=list, null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    result_set = models.ForeignKey(FlightResultSet, on_delete=models.PROTECT, null=True, blank=True, related_name='messages')
+    timestamp = models.DateTimeField(default=timezone.now)
     
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['user', 'timestamp', 'id'], name='chat_user_timestamp_idx'),
+        ]
     
+    @property
+    def flights(self):
+        return self.result_set.flights if self.result_set_id else []
+
     def __str__(self):
         sender = "User" if self.is_user else "Agent"
         return f"{sender}: {self.message[:50]}..."
@@ -0,0 +1,167 @@
+import re
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CURRENCY_SYMBOLS = {"INR": "₹"}
+
+# ISO 8601 durations as Amadeus sends them, e.g. "PT2H10M" or "P1DT3H"
+_DURATION = re.compile(r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?)?")
+
+
+def parse_duration_minutes(value: Optional[str]) -> Optional[int]:
+    """Minutes in an ISO 8601 duration, or None when it cannot be parsed"""
+    match = _DURATION.fullmatch(value) if value else None
+    if not match or not any(match.groups()):
+        return None
+    days, hours, minutes = (int(part or 0) for part in match.groups())
+    return days * 1440 + hours * 60 + minutes
+
+
+def format_duration(minutes: Optional[int]) -> str:
+    if minutes is None:
+        return "N/A"
+    return f"{minutes // 60}h {minutes % 60}m"
+
+
+def format_price(amount: float, currency: str) -> str:
+    symbol = CURRENCY_SYMBOLS.get(currency)
+    return f"{symbol}{amount:.2f}" if symbol else f"{currency} {amount:.2f}"
+
+
+class Segment:
+    """One leg of an itinerary; times are the airports' local times as Amadeus reports them"""
+
+    __slots__ = ("carrier", "number", "origin", "destination", "departure", "arrival", "duration_minutes")
+
+    def __init__(self, carrier: str, number: str, origin: str, destination: str,
+                 departure: datetime, arrival: datetime, duration_minutes: Optional[int]):
+        self.carrier = carrier
+        self.number = number
+        self.origin = origin
+        self.destination = destination
+        self.departure = departure
+        self.arrival = arrival
+        self.duration_minutes = duration_minutes
+
+    def to_dict(self) -> Dict:
+        return {
+            "flight_number": f"{self.carrier} {self.number}",
+            "origin": self.origin,
+            "destination": self.destination,
+            "departure": self.departure.isoformat(),
+            "arrival": self.arrival.isoformat(),
+            "duration_minutes": self.duration_minutes,
+        }
+
+
+class FlightOffer:
+    """
+    A normalized flight offer: numeric price, parsed times and the outbound
+    itinerary's segments. Display strings are produced only by to_dict().
+    """
+
+    __slots__ = ("airline", "price", "currency", "origin", "destination", "date",
+                 "departure", "arrival", "duration_minutes", "segments")
+
+    def __init__(self, airline: str, price: float, currency: str, origin: str, destination: str,
+                 date: str, departure: datetime, arrival: datetime, duration_minutes: Optional[int],
+                 segments: Tuple[Segment, ...]):
+        self.airline = airline
+        self.price = price
+        self.currency = currency
+        self.origin = origin
+        self.destination = destination
+        self.date = date
+        self.departure = departure
+        self.arrival = arrival
+        self.duration_minutes = duration_minutes
+        self.segments = segments
+
+    @property
+    def flight_number(self) -> str:
+        return f"{self.airline} {self.segments[0].number}"
+
+    @property
+    def stops(self) -> int:
+        return len(self.segments) - 1
+
+    @property
+    def identity(self) -> Tuple:
+        """Fields that identify the same flight across overlapping searches"""
+        return (self.flight_number, self.origin, self.destination, self.date, self.departure, self.arrival)
+
+    def to_dict(self) -> Dict:
+        """The API/chat representation of this offer"""
+        return {
+            "airline": self.airline,
+            "price": format_price(self.price, self.currency),
+            "price_amount": self.price,
+            "currency": self.currency,
+            "departure_time": self.departure.strftime("%H:%M"),
+            "arrival_time": self.arrival.strftime("%H:%M"),
+            "duration": format_duration(self.duration_minutes),
+            "duration_minutes": self.duration_minutes,
+            "stops": self.stops,
+            "flight_number": self.flight_number,
+            "origin": self.origin,
+            "destination": self.destination,
+            "date": self.date,
+            "segments": [segment.to_dict() for segment in self.segments],
+        }
+
+
+def normalize_offers(data: Iterable[Dict], origin: str, destination: str,
+                     formatted_date: str) -> List[FlightOffer]:
+    """
+    Build FlightOffers from the `data` list of a flight-offers response in a
+    single pass, parsing each timestamp once. Offers that are missing the
+    fields we need are skipped.
+    """
+    origin = origin.upper()
+    destination = destination.upper()
+    offers = []
+    for raw in data:
+        try:
+            itinerary = raw["itineraries"][0]
+            segments = tuple(
+                Segment(
+                    segment["carrierCode"],
+                    segment.get("number", ""),
+                    segment["departure"]["iataCode"],
+                    segment["arrival"]["iataCode"],
+                    datetime.fromisoformat(segment["departure"]["at"]),
+                    datetime.fromisoformat(segment["arrival"]["at"]),
+                    parse_duration_minutes(segment.get("duration")),
+                )
+                for segment in itinerary["segments"]
+            )
+            if not segments:
+                continue
+
+            departure = segments[0].departure
+            arrival = segments[-1].arrival
+            # Segment times are local, so the itinerary's own duration is right across time zones
+            duration = parse_duration_minutes(itinerary.get("duration"))
+            if duration is None:
+                duration = int((arrival - departure).total_seconds() // 60)
+
+            price = raw["price"]
+            airlines = raw.get("validatingAirlineCodes")
+            offers.append(FlightOffer(
+                airlines[0] if airlines else "Unknown",
+                float(price["total"]),
+                price.get("currency", "INR"),
+                origin,
+                destination,
+                formatted_date,
+                departure,
+                arrival,
+                duration,
+                segments,
+            ))
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            logger.error(f"⚠️ Error processing flight: {e!r}")
+    return offers
@@ -0,0 +1,187 @@
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from django.core.cache import caches
+from django.db.models import Count
+from django.utils import timezone
+
+from .cache import make_search_key
+from .conf import get_setting
+from .flight_service import FlightAgentService
+from .models import FlightSearchQuery
+from .rate_limit import BACKGROUND, request_priority
+
+logger = logging.getLogger(__name__)
+
+# How long a claimed run stays claimed: longer than a run takes, shorter than the gap between runs
+PREWARM_LOCK_TIMEOUT = 3600
+
+
+def popular_routes(window_hours: int = 24, top_n: int = 20) -> List[Dict]:
+    """Most searched (origin, destination, date) combinations over the last `window_hours`"""
+    since = timezone.now() - timedelta(hours=window_hours)
+    return list(
+        FlightSearchQuery.objects
+        .filter(timestamp__gte=since)
+        .values("origin", "destination", "date")
+        .annotate(searches=Count("id"))
+        .order_by("-searches")[:top_n]
+    )
+
+
+def _resolve_date(service: FlightAgentService, date: str) -> Optional[str]:
+    """Resolve a stored (possibly relative) date to YYYY-MM-DD, or None if it cannot be warmed"""
+    try:
+        # Absolute dates that have passed are no longer worth warming
+        if datetime.strptime(date, "%Y-%m-%d").date() < datetime.now().date():
+            return None
+    except ValueError:
+        pass
+
+    formatted_date = service.parse_relative_date(date)
+    try:
+        datetime.strptime(formatted_date, "%Y-%m-%d")
+    except ValueError:
+        return None
+    return formatted_date
+
+
+def prewarm_popular_routes(top_n: Optional[int] = None, window_hours: Optional[int] = None,
+                           budget: Optional[int] = None) -> Dict[str, int]:
+    """
+    Fetch and cache offers for the most popular recent routes.
+
+    Relative dates ("tomorrow", "next friday") are resolved against today,
+    and each route is expanded to the same airport searches a live query
+    would make. Searches that are already fresh in the cache are skipped.
+    At most `budget` upstream searches are made, most popular routes first.
+    """
+    top_n = top_n or get_setting("FLIGHT_PREWARM_TOP_ROUTES", 20)
+    window_hours = window_hours or get_setting("FLIGHT_PREWARM_WINDOW_HOURS", 24)
+    budget = get_setting("FLIGHT_PREWARM_BUDGET", 50) if budget is None else budget
+    ttl = get_setting("FLIGHT_PREWARM_TTL", 3600)
+
+    service = FlightAgentService()
+    stats = {"routes": 0, "searches": 0, "fresh": 0, "warmed": 0, "failed": 0, "skipped": 0}
+    planned: List[Tuple] = []
+    seen = set()
+
+    for route in popular_routes(window_hours, top_n):
+        formatted_date = _resolve_date(service, route["date"])
+        if formatted_date is None:
+            stats["skipped"] += 1
+            continue
+
+        stats["routes"] += 1
+        for origin, destination, day in service.plan_searches(route["origin"], route["destination"], formatted_date):
+            key = make_search_key(origin, destination, day)
+            if key not in seen:
+                seen.add(key)
+                planned.append(key)
+
+    for key in planned:
+        if service.cache.is_fresh(key):
+            stats["fresh"] += 1
+            continue
+        if stats["searches"] >= budget:
+            stats["skipped"] += 1
+            continue
+
+        stats["searches"] += 1
+        # Searches run one at a time, and queue behind live traffic for Amadeus quota
+        with request_priority(BACKGROUND):
+            error = service.refresh_search(key, ttl=ttl)
+        if error is None:
+            stats["warmed"] += 1
+        else:
+            stats["failed"] += 1
+            logger.warning(f"⚠️ Prewarm failed for {key}: {error}")
+
+    logger.info(f"🔥 Prewarm finished: {stats}")
+    return stats
+
+
+class PrewarmScheduler:
+    """
+    Background thread that runs prewarm_popular_routes once a day at each
+    hour listed in FLIGHT_PREWARM_HOURS (server local time), so the cache is
+    warm before the morning peak.
+
+    Every web worker runs a scheduler, but each scheduled run is claimed
+    with an atomic add() on the shared `lock_cache`, so only one worker
+    (the first to wake) spends the budget, and the rest find the
+    entries it warmed in the shared flight cache.
+    """
+
+    def __init__(self, hours: List[int], lock_cache):
+        self.hours = sorted({int(hour) % 24 for hour in hours})
+        self.lock_cache = lock_cache
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None and self.hours:
+            self._thread = threading.Thread(target=self._run, name="flight-prewarm", daemon=True)
+            self._thread.start()
+            logger.info(f"🔥 Prewarm scheduled daily at hours {self.hours}")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def claim(self, run_at: datetime) -> bool:
+        """Whether this process won the run scheduled for `run_at`"""
+        return self.lock_cache.add(f"flight-prewarm:{run_at:%Y%m%d%H}", os.getpid(), timeout=PREWARM_LOCK_TIMEOUT)
+
+    def next_run(self, now: datetime) -> datetime:
+        for day in range(2):
+            for hour in self.hours:
+                run_at = (now + timedelta(days=day)).replace(hour=hour, minute=0, second=0, microsecond=0)
+                if run_at > now:
+                    return run_at
+        return now + timedelta(days=1)
+
+    def _run(self) -> None:
+        run_at = datetime.now()
+        while True:
+            # From the last run, in case the wait ended a moment early
+            run_at = self.next_run(max(datetime.now(), run_at))
+            if self._stop.wait(max((run_at - datetime.now()).total_seconds(), 0)):
+                return
+            if not self.claim(run_at):
+                logger.info(f"🔥 Prewarm for {run_at:%Y-%m-%d %H:00} is being run by another worker")
+                continue
+            try:
+                prewarm_popular_routes()
+            except Exception as e:
+                logger.error(f"❌ Prewarm failed: {e}")
+
+
+_scheduler: Optional[PrewarmScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def start_prewarm_scheduler() -> Optional[PrewarmScheduler]:
+    """
+    Start the process-wide prewarm scheduler if FLIGHT_PREWARM_ENABLED is
+    set. It needs FLIGHT_CACHE_SHARED_ALIAS, both to elect one worker per
+    run and so the other workers see what it warmed; without it, warm the
+    cache with the prewarm_flight_cache management command instead.
+    """
+    global _scheduler
+    if not get_setting("FLIGHT_PREWARM_ENABLED", False):
+        return None
+    shared_alias = get_setting("FLIGHT_CACHE_SHARED_ALIAS", None)
+    if not shared_alias:
+        logger.warning("⚠️ FLIGHT_PREWARM_ENABLED needs FLIGHT_CACHE_SHARED_ALIAS; prewarm scheduler not started")
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            hours = get_setting("FLIGHT_PREWARM_HOURS", [6])
+            if isinstance(hours, str):
+                hours = [hour for hour in hours.split(",") if hour.strip()]
+            _scheduler = PrewarmScheduler(hours, caches[shared_alias])
+            _scheduler.start()
+        return _scheduler
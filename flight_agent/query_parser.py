@@ -0,0 +1,214 @@
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
+
+from .conf import get_setting
+
+DEFAULT_ORIGIN = "DEL"
+DEFAULT_DESTINATION = "BOM"
+DEFAULT_DATE = "tomorrow"
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+# Fixed offsets (in days) for relative date words
+RELATIVE_DAYS = {
+    "today": 0,
+    "tonight": 0,
+    "tomorrow": 1,
+    "day after tomorrow": 2,
+    "next week": 7,
+}
+
+MONTH_NAMES = ("january", "february", "march", "april", "may", "june", "july", "august",
+               "september", "october", "november", "december", "sept", *MONTHS)
+
+# Words that can follow "to" or precede "X to Y" without being a place, and
+# that end a multi-word place name ("new york for christmas")
+STOP_WORDS = frozenset((
+    "a", "an", "the", "i", "we", "me", "us", "my", "want", "need", "like", "have", "going", "go", "fly",
+    "flying", "travel", "book", "find", "get", "see", "show", "search", "flight", "flights",
+    "ticket", "tickets", "cheap", "cheapest", "and", "or", "please", "how", "way",
+    "for", "at", "with", "by", "via", "around", "about", "flexible", "give", "plus", "one", "round",
+    "trip", "return", "returning", "leaving", "departing", "economy", "business", "class",
+    "adult", "adults", "option", "options", "fare", "fares", "deal", "deals", "price", "prices",
+    "day", "days", "week", "weeks", "after", "near", "nearby", "nearest", "closest", "here",
+    *RELATIVE_DAYS, *WEEKDAYS, *MONTH_NAMES, "next", "this", "coming", "on", "in", "from", "to",
+))
+
+_ORDINAL = r"(?:st|nd|rd|th)?"
+_MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*"
+_WEEKDAY = "|".join(WEEKDAYS)
+_WORD = r"(?!(?:{})\b)[a-z][a-z0-9]*".format("|".join(sorted(STOP_WORDS, key=len, reverse=True)))
+# Up to three words: "goa", "new york", "rio de janeiro"
+_PLACE = rf"{_WORD}(?:\s+{_WORD}){{0,2}}"
+
+# Everything the parser looks for, matched in a single left-to-right pass
+_TOKENS = re.compile(rf"""
+      \bfrom\s+(?P<from_place>{_PLACE})
+    | \b(?P<pair_origin>{_PLACE})\s+to\s+(?P<pair_destination>{_PLACE})
+    | \bto\s+(?P<to_place>{_PLACE})
+    | (?:±|\+/-|\+-|plus\s+or\s+minus)\s*(?P<flex_window>\d+)\s*days?\b
+    | \b(?P<flex_word>around|flexible|give\s+or\s+take)\b
+    | \b(?P<date>
+          day\s+after\s+tomorrow | today | tonight | tomorrow | next\s+week
+        | (?:(?:next|this|coming|on)\s+)?(?:{_WEEKDAY})
+        | in\s+\d+\s+(?:days?|weeks?)
+        | \d{{4}}-\d{{2}}-\d{{2}}
+        | \d{{1,2}}{_ORDINAL}\s+(?:of\s+)?{_MONTH}
+        | {_MONTH}\s+\d{{1,2}}{_ORDINAL}
+        | (?:on\s+)?the\s+\d{{1,2}}{_ORDINAL}
+      )\b
+""", re.VERBOSE)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass(frozen=True)
+class ParsedQuery:
+    """What a natural language flight query asks for"""
+    origin: str
+    destination: str
+    date: str
+    departure_date: str
+    flex_days: int
+    confidence: float
+    defaulted: Tuple[str, ...] = ()
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def parse_query(query: str, today: Optional[date] = None) -> ParsedQuery:
+    """Parse a query; results are memoized on the normalized text and the current day"""
+    return _parse(normalize_query(query), today or datetime.now().date())
+
+
+@lru_cache(maxsize=2048)
+def _parse(text: str, today: date) -> ParsedQuery:
+    origin = destination = date_phrase = None
+    origin_weight = 0.0
+    flex_days = 0
+
+    for match in _TOKENS.finditer(text):
+        group = match.lastgroup
+        if group == "from_place":
+            if origin is None:
+                origin, origin_weight = match.group("from_place"), 0.4
+        elif group == "pair_destination":
+            # "NYC to London": a weaker origin signal than "from NYC"
+            if origin is None:
+                origin, origin_weight = match.group("pair_origin"), 0.3
+            destination = destination or match.group("pair_destination")
+        elif group == "to_place":
+            destination = destination or match.group("to_place")
+        elif group == "flex_window":
+            flex_days = int(match.group("flex_window"))
+        elif group == "flex_word":
+            flex_days = flex_days or get_setting("FLIGHT_FLEX_DEFAULT_DAYS", 2)
+        elif group == "date" and date_phrase is None:
+            date_phrase = _canonical_date(match.group("date"))
+
+    defaulted = tuple(name for name, value in (("origin", origin), ("destination", destination),
+                                               ("date", date_phrase)) if value is None)
+    resolved = resolve_date(date_phrase or DEFAULT_DATE, today)
+    confidence = origin_weight + (0.4 if destination else 0.0) + (0.2 if date_phrase and resolved else 0.0)
+
+    origin = (origin or DEFAULT_ORIGIN).upper()
+    destination = (destination or DEFAULT_DESTINATION).upper()
+    if origin == destination:
+        confidence /= 2
+
+    date_phrase = date_phrase or DEFAULT_DATE
+    return ParsedQuery(
+        origin=origin,
+        destination=destination,
+        date=date_phrase,
+        departure_date=resolved.strftime("%Y-%m-%d") if resolved else date_phrase,
+        flex_days=flex_days,
+        confidence=round(confidence, 2),
+        defaulted=defaulted,
+    )
+
+
+def _canonical_date(phrase: str) -> str:
+    phrase = _WHITESPACE.sub(" ", phrase)
+    if phrase.startswith("on "):
+        phrase = phrase[3:]
+    weekday = phrase.rsplit(" ", 1)[-1]
+    if weekday in WEEKDAYS:
+        # "friday", "this friday" and "next friday" all mean the coming Friday
+        return f"next {weekday}"
+    return "today" if phrase == "tonight" else phrase
+
+
+def _next_weekday(today: date, weekday: int) -> date:
+    return today + timedelta(days=(weekday - today.weekday()) % 7 or 7)
+
+
+def _month_day(today: date, month: int, day: int) -> Optional[date]:
+    # The next occurrence of that day, this year or next
+    for year in (today.year, today.year + 1):
+        try:
+            candidate = date(year, month, day)
+        except ValueError:
+            continue
+        if candidate >= today:
+            return candidate
+    return None
+
+
+def _day_of_month(today: date, day: int) -> Optional[date]:
+    # The next month (starting with this one) that has that day
+    year, month = today.year, today.month
+    for _ in range(12):
+        try:
+            candidate = date(year, month, day)
+            if candidate >= today:
+                return candidate
+        except ValueError:
+            pass
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return None
+
+
+def _iso_date(today: date, value: str) -> Optional[date]:
+    parsed = datetime.strptime(value, "%Y-%m-%d").date()
+    # Dates in the past are taken to mean next year's
+    return parsed if parsed >= today else parsed.replace(year=parsed.year + 1)
+
+
+_DATE_RULES: List[Tuple[re.Pattern, Callable[[date, re.Match], Optional[date]]]] = [
+    (re.compile("|".join(RELATIVE_DAYS)), lambda today, m: today + timedelta(days=RELATIVE_DAYS[m.group(0)])),
+    (re.compile(rf"(?:(?:next|this|coming|on) )?({_WEEKDAY})"),
+     lambda today, m: _next_weekday(today, WEEKDAYS.index(m.group(1)))),
+    (re.compile(r"in (\d+) (day|week)s?"),
+     lambda today, m: today + timedelta(days=int(m.group(1)) * (7 if m.group(2) == "week" else 1))),
+    (re.compile(r"\d{4}-\d{2}-\d{2}"), lambda today, m: _iso_date(today, m.group(0))),
+    (re.compile(rf"(\d{{1,2}}){_ORDINAL} (?:of )?({_MONTH})"),
+     lambda today, m: _month_day(today, MONTHS[m.group(2)[:3]], int(m.group(1)))),
+    (re.compile(rf"({_MONTH}) (\d{{1,2}}){_ORDINAL}"),
+     lambda today, m: _month_day(today, MONTHS[m.group(1)[:3]], int(m.group(2)))),
+    (re.compile(rf"(?:on )?the (\d{{1,2}}){_ORDINAL}"), lambda today, m: _day_of_month(today, int(m.group(1)))),
+]
+
+
+def resolve_date(phrase: str, today: Optional[date] = None) -> Optional[date]:
+    """Resolve a date phrase ("tomorrow", "next friday", "12 dec", "the 5th", "2025-01-31") to a date"""
+    phrase = _WHITESPACE.sub(" ", phrase.lower()).strip()
+    today = today or datetime.now().date()
+    for pattern, resolve in _DATE_RULES:
+        match = pattern.fullmatch(phrase)
+        if match:
+            try:
+                return resolve(today, match)
+            except ValueError:
+                return None
+    return None
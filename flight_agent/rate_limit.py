@@ -0,0 +1,187 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from .conf import get_setting
+
+logger = logging.getLogger(__name__)
+
+# Lower values are served first
+INTERACTIVE = 0
+FANOUT = 1
+BACKGROUND = 2
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", FANOUT: "fanout", BACKGROUND: "background"}
+
+# Upper bounds (ms) of the wait-time histogram buckets; the last bucket is open-ended
+WAIT_BUCKETS_MS = (0, 10, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("amadeus_priority", default=INTERACTIVE)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when an outbound call waited longer than the limiter's max_wait"""
+
+
+@contextmanager
+def request_priority(priority: int) -> Iterator[None]:
+    """Run the enclosed Amadeus calls at `priority` (INTERACTIVE, FANOUT or BACKGROUND)"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+class TokenBucketLimiter:
+    """
+    Process-wide token bucket for outbound Amadeus calls.
+
+    Tokens refill at `rate` per second up to `burst`. Callers that find the
+    bucket empty queue up and are served by priority, then in arrival order,
+    so interactive searches overtake fan-out and background traffic. A caller
+    that would wait longer than `max_wait` seconds gets RateLimitExceeded
+    instead of hanging. A `rate` of 0 disables limiting.
+    """
+
+    def __init__(self, rate: float = 10, burst: int = 10, max_wait: float = 5):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_wait = max_wait
+
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._histograms: Dict[int, list] = {}
+        self._rejected: Dict[int, int] = {}
+        self._total_wait: Dict[int, float] = {}
+
+    def acquire(self, priority: Optional[int] = None) -> float:
+        """Take one token, waiting if necessary; returns the seconds spent waiting"""
+        if self.rate <= 0:
+            return 0.0
+        priority = current_priority() if priority is None else priority
+        start = time.monotonic()
+        deadline = start + self.max_wait
+
+        if self.try_acquire(priority):
+            return 0.0
+
+        with self._cond:
+            entry = (priority, next(self._sequence))
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    self._refill()
+                    now = time.monotonic()
+                    if self._waiters[0] == entry and self._tokens >= 1:
+                        heapq.heappop(self._waiters)
+                        self._tokens -= 1
+                        # Let the next waiter in line check the bucket
+                        self._cond.notify_all()
+                        waited = now - start
+                        self._record(priority, waited)
+                        return waited
+                    if now >= deadline:
+                        self._rejected[priority] = self._rejected.get(priority, 0) + 1
+                        raise RateLimitExceeded(
+                            f"Amadeus rate limit: no capacity within {self.max_wait:.1f}s, try again shortly"
+                        )
+                    timeout = deadline - now
+                    if self._waiters[0] == entry:
+                        timeout = min(timeout, (1 - self._tokens) / self.rate)
+                    self._cond.wait(timeout)
+            except BaseException:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    self._cond.notify_all()
+                raise
+
+    def try_acquire(self, priority: Optional[int] = None) -> bool:
+        """Take a token only if one is available right now and nobody is queued"""
+        if self.rate <= 0:
+            return True
+        with self._cond:
+            self._refill()
+            if self._waiters or self._tokens < 1:
+                return False
+            self._tokens -= 1
+            self._record(current_priority() if priority is None else priority, 0.0)
+            return True
+
+    async def aacquire(self, priority: Optional[int] = None) -> float:
+        """Async variant of acquire; only a call that has to queue is handed to a worker thread"""
+        priority = current_priority() if priority is None else priority
+        if self.try_acquire(priority):
+            return 0.0
+        return await asyncio.to_thread(self.acquire, priority)
+
+    def _refill(self) -> None:
+        # Caller holds the lock
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _record(self, priority: int, waited: float) -> None:
+        # Caller holds the lock
+        histogram = self._histograms.setdefault(priority, [0] * (len(WAIT_BUCKETS_MS) + 1))
+        waited_ms = waited * 1000
+        for index, bound in enumerate(WAIT_BUCKETS_MS):
+            if waited_ms <= bound:
+                histogram[index] += 1
+                break
+        else:
+            histogram[-1] += 1
+        self._total_wait[priority] = self._total_wait.get(priority, 0.0) + waited
+
+    def stats(self) -> Dict:
+        """Wait-time histogram (ms bucket upper bound -> calls) and rejections per priority"""
+        labels = [f"<={bound}" for bound in WAIT_BUCKETS_MS] + [f">{WAIT_BUCKETS_MS[-1]}"]
+        with self._cond:
+            priorities = {}
+            for priority in sorted(set(self._histograms) | set(self._rejected)):
+                histogram = self._histograms.get(priority, [0] * len(labels))
+                calls = sum(histogram)
+                priorities[PRIORITY_NAMES.get(priority, str(priority))] = {
+                    "calls": calls,
+                    "rejected": self._rejected.get(priority, 0),
+                    "avg_wait_ms": round(self._total_wait.get(priority, 0.0) * 1000 / calls, 2) if calls else 0.0,
+                    "wait_ms": dict(zip(labels, histogram)),
+                }
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "max_wait": self.max_wait,
+                "queued": len(self._waiters),
+                "priorities": priorities,
+            }
+
+
+_limiter: Optional[TokenBucketLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> TokenBucketLimiter:
+    """Return the limiter shared by every Amadeus client in this process"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = TokenBucketLimiter(
+                rate=get_setting("AMADEUS_RATE_LIMIT", 10.0),
+                burst=get_setting("AMADEUS_RATE_BURST", 10),
+                max_wait=get_setting("AMADEUS_RATE_MAX_WAIT", 5.0),
+            )
+        return _limiter
@@ -0,0 +1,245 @@
+import threading
+import time
+import logging
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from .conf import get_setting
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_ENDPOINT_POLICIES = {
+    "token": {"path": "/v1/security/oauth2/token"},
+    "flight_offers": {"path": "/v2/shopping/flight-offers"},
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker.
+
+    While closed, call outcomes from the last `window` seconds are kept; once
+    at least `min_calls` have been seen and `failure_rate` of them failed,
+    the circuit opens and calls are refused for `cooldown` seconds. After
+    that it is half-open: up to `half_open_calls` trial calls go through, and
+    the first outcome decides whether it closes again or re-opens. A trial
+    that ends without an outcome (cancelled) gives its slot back, and trials
+    still unanswered after `half_open_timeout` seconds count as failures.
+    """
+
+    def __init__(self, name: str, failure_rate: float = 0.5, min_calls: int = 10,
+                 window: float = 30, cooldown: float = 15, half_open_calls: int = 1,
+                 half_open_timeout: float = 30):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+        self.half_open_calls = half_open_calls
+        self.half_open_timeout = half_open_timeout
+
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._half_opened_at = 0.0
+        self._trials = 0
+        self._outcomes = deque()  # (monotonic time, ok)
+        self._lock = threading.Lock()
+        self._stats = {"opened": 0, "rejected": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now; counts as a trial call when half-open"""
+        now = time.monotonic()
+        with self._lock:
+            if self._state == OPEN:
+                if now - self._opened_at < self.cooldown:
+                    self._stats["rejected"] += 1
+                    return False
+                self._state = HALF_OPEN
+                self._half_opened_at = now
+                self._trials = 0
+            if self._state == HALF_OPEN:
+                if self._trials >= self.half_open_calls:
+                    if now - self._half_opened_at >= self.half_open_timeout:
+                        # The trials never reported back: treat them as failed and start a new cooldown
+                        logger.warning(f"⏱️ Circuit '{self.name}' trial timed out")
+                        self._open(now)
+                    self._stats["rejected"] += 1
+                    return False
+                self._trials += 1
+            return True
+
+    def release(self) -> None:
+        """Hand back a trial slot for a call that ended without an outcome, e.g. cancelled"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._trials > 0:
+                self._trials -= 1
+
+    def record(self, ok: bool) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._state == HALF_OPEN:
+                if ok:
+                    logger.info(f"✅ Circuit '{self.name}' closed")
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open(now)
+                return
+            if self._state == OPEN:
+                return
+
+            self._outcomes.append((now, ok))
+            while self._outcomes and self._outcomes[0][0] < now - self.window:
+                self._outcomes.popleft()
+            failures = sum(1 for _, succeeded in self._outcomes if not succeeded)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+                self._open(now)
+
+    def _open(self, now: float) -> None:
+        # Caller holds the lock
+        logger.warning(f"🚫 Circuit '{self.name}' opened for {self.cooldown:.0f}s")
+        self._state = OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+        self._stats["opened"] += 1
+
+    def stats(self) -> Dict:
+        state = self.state
+        with self._lock:
+            return {"state": state, "recent_calls": len(self._outcomes), **self._stats}
+
+
+class LatencyTracker:
+    """Keeps the last `size` successful call latencies and reports a percentile of them"""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float, min_samples: int = 20) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class EndpointPolicy:
+    """
+    Circuit breaker, latency tracking and hedging settings for one Amadeus
+    endpoint. Shared by the sync and async clients, so both see the same
+    circuit state.
+    """
+
+    def __init__(self, name: str, path: str, hedge: bool = False, hedge_percentile: float = 95,
+                 hedge_min_delay: float = 0.5, **breaker_options):
+        self.name = name
+        self.path = path
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.breaker = CircuitBreaker(name, **breaker_options)
+        self.latency = LatencyTracker()
+        self._stats = {"hedged": 0, "hedge_wins": 0}
+        self._lock = threading.Lock()
+
+    def check(self) -> None:
+        """Raise CircuitOpenError unless the breaker lets a call through"""
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Amadeus {self.name} endpoint is unavailable, try again shortly")
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None when this call should not be hedged"""
+        if not self.hedge or self.breaker.state != CLOSED:
+            return None
+        latency = self.latency.percentile(self.hedge_percentile)
+        return None if latency is None else max(self.hedge_min_delay, latency)
+
+    def observe(self, send: Callable):
+        """Run `send()` and feed its outcome to the breaker and latency tracker"""
+        start = time.monotonic()
+        try:
+            response = send()
+        except Exception:
+            self.breaker.record(False)
+            raise
+        except BaseException:
+            # Cancelled or interrupted: no outcome to record, but free the trial slot
+            self.breaker.release()
+            raise
+        self.record_response(response, time.monotonic() - start)
+        return response
+
+    async def aobserve(self, send: Callable):
+        """Async variant of observe; `send` returns an awaitable"""
+        start = time.monotonic()
+        try:
+            response = await send()
+        except Exception:
+            self.breaker.record(False)
+            raise
+        except BaseException:
+            # Cancelled or interrupted: no outcome to record, but free the trial slot
+            self.breaker.release()
+            raise
+        self.record_response(response, time.monotonic() - start)
+        return response
+
+    def record_response(self, response, elapsed: float) -> None:
+        ok = response.status_code < 500
+        self.breaker.record(ok)
+        if ok:
+            self.latency.add(elapsed)
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict:
+        p95 = self.latency.percentile(95)
+        with self._lock:
+            return {
+                **self.breaker.stats(),
+                **self._stats,
+                "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            }
+
+
+_policies: Optional[Dict[str, EndpointPolicy]] = None
+_policies_lock = threading.Lock()
+
+
+def get_endpoint_policies() -> Dict[str, EndpointPolicy]:
+    """Return the process-wide endpoint policies, keyed by request path"""
+    global _policies
+    with _policies_lock:
+        if _policies is None:
+            configured = get_setting("AMADEUS_ENDPOINT_POLICIES", None) or DEFAULT_ENDPOINT_POLICIES
+            _policies = {}
+            for name, options in configured.items():
+                policy = EndpointPolicy(name, **options)
+                _policies[policy.path] = policy
+        return _policies
+
+
+def endpoint_stats() -> Dict[str, Dict]:
+    return {policy.name: policy.stats() for policy in get_endpoint_policies().values()}
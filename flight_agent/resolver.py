@@ -0,0 +1,220 @@
+import csv
+import logging
+import threading
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from .airports import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+# Words that say what kind of place a name is rather than which one
+GENERIC_TOKENS = frozenset((
+    "airport", "international", "intl", "regional", "municipal", "domestic", "airfield",
+    "field", "aerodrome", "air", "base", "county", "city", "the", "of", "and",
+))
+
+# Name fragments of fields that should lose ties against a city's commercial airport
+MINOR_FIELD_WORDS = ("seaplane", "heliport", "air base", "air force", "raf ", "naval", "army", "military",
+                     "railway", "bus station")
+
+
+class Airport(NamedTuple):
+    iata: str
+    name: str
+    city: str
+    country: str
+    lat: float
+    lon: float
+
+
+def normalize_name(text: str) -> str:
+    """Lower-case, strip accents and punctuation: 'São Paulo-Guarulhos' -> 'sao paulo guarulhos'"""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch if ch.isalnum() else " " for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.lower().split())
+
+
+def one_edit_apart(a: str, b: str) -> bool:
+    """True if `b` is `a` with one letter added, dropped, changed or two neighbours swapped"""
+    if a == b or abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    start = 0
+    while start < len(a) and a[start] == b[start]:
+        start += 1
+    if len(a) < len(b):
+        return a[start:] == b[start + 1:]
+    if a[start + 1:] == b[start + 1:]:
+        return True
+    return a[start + 2:] == b[start + 2:] and a[start:start + 2] == b[start + 1:start + 2] + b[start:start + 1]
+
+
+def airport_rank(airport: Airport) -> int:
+    name = airport.name.lower() + " "
+    if any(word in name for word in MINOR_FIELD_WORDS):
+        return -1
+    return 1 if "international" in name or " intl" in name else 0
+
+
+def load_airports(path: Path = DATA_DIR / "airports.csv") -> Dict[str, Airport]:
+    airports = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            airports[row["iata"]] = Airport(row["iata"], row["name"], row["city"], row["country"],
+                                            float(row["lat"]), float(row["lon"]))
+    return airports
+
+
+class LocationIndex:
+    """
+    Offline index from place names to IATA codes.
+
+    Lookups try, in order: curated aliases ("bombay"), airport and city
+    codes ("BLR", "LON"), exact city or airport names ("new delhi",
+    "heathrow airport") and airport-name tokens ("heathrow"). Multi-word
+    input is also tried word span by word span, longest first, so extra
+    words around a place name are ignored. Only when nothing matches
+    exactly is a single typo of a known name accepted ("banglore").
+    """
+
+    def __init__(self, airports: Dict[str, Airport], metro_cities: Dict[str, str], aliases: Dict[str, str]):
+        self.airports = airports
+        self.codes: Set[str] = set(airports) | set(metro_cities.values())
+        self.aliases = {normalize_name(alias): code for alias, code in aliases.items()}
+        self.names: Dict[str, str] = {}
+        self.tokens: Dict[str, List[str]] = {}
+
+        by_name: Dict[str, List[Airport]] = {}
+        for airport in airports.values():
+            for name in (airport.city, airport.name, self._significant(airport.name)):
+                if name:
+                    by_name.setdefault(normalize_name(name), []).append(airport)
+            for token in set(normalize_name(airport.name).split()) - GENERIC_TOKENS:
+                self.tokens.setdefault(token, []).append(airport.iata)
+
+        for name, candidates in by_name.items():
+            self.names[name] = max(candidates, key=airport_rank).iata
+        # City names that are metropolitan areas resolve to the city code, e.g. "london" -> LON
+        for city, code in metro_cities.items():
+            self.names[normalize_name(city)] = code
+        self.names.update(self.aliases)
+
+        for token, codes in self.tokens.items():
+            codes.sort(key=lambda code: -airport_rank(airports[code]))
+
+        # Place names (not single airport-name words) bucketed by first letter and length for the typo fallback
+        self._fuzzy: Dict[Tuple[str, int], List[str]] = {}
+        for name in self.names:
+            self._fuzzy.setdefault((name[0], len(name)), []).append(name)
+
+    @staticmethod
+    def _significant(name: str) -> str:
+        return " ".join(token for token in normalize_name(name).split() if token not in GENERIC_TOKENS)
+
+    def resolve(self, text: str) -> Optional[str]:
+        """Return the IATA airport or city code for `text`, or None if nothing matches"""
+        words = normalize_name(text).split()
+        if not words:
+            return None
+        for span in self._spans(words):
+            code = self._exact(span)
+            if code:
+                return code
+        for span in self._spans(words):
+            code = self._fuzzy_match(span)
+            if code:
+                return code
+        return None
+
+    @staticmethod
+    def _spans(words: List[str]) -> Iterator[str]:
+        for size in range(len(words), 0, -1):
+            for start in range(len(words) - size + 1):
+                yield " ".join(words[start:start + size])
+
+    def _exact(self, name: str) -> Optional[str]:
+        code = self.aliases.get(name)
+        if code:
+            return code
+        if len(name) == 3 and name.upper() in self.codes:
+            return name.upper()
+        code = self.names.get(name)
+        if code:
+            return code
+        tokens = name.split()
+        if all(token in self.tokens for token in tokens):
+            common = [code for code in self.tokens[tokens[0]] if all(code in self.tokens[t] for t in tokens[1:])]
+            if common:
+                return common[0]
+        return None
+
+    def _fuzzy_match(self, name: str) -> Optional[str]:
+        """
+        Accept a known name one typo away ("banglore"). When several are,
+        the best ranked place wins, and a tie between different places is
+        left unresolved rather than guessed at, as is anything further off
+        """
+        if len(name) < 5:
+            return None
+        matches = [
+            candidate
+            for size in (len(name) - 1, len(name), len(name) + 1)
+            for candidate in self._fuzzy.get((name[0], size), ())
+            if one_edit_apart(name, candidate)
+        ]
+        # City codes first, then international airports, then the rest
+        ranked = sorted({(-self._code_rank(self.names[match]), self.names[match], match) for match in matches})
+        if not ranked or (len(ranked) > 1 and ranked[0][0] == ranked[1][0] and ranked[0][1] != ranked[1][1]):
+            return None
+        logger.info(f"🔤 Resolved '{name}' as '{ranked[0][2]}'")
+        return ranked[0][1]
+
+    def _code_rank(self, code: str) -> int:
+        airport = self.airports.get(code)
+        return airport_rank(airport) if airport else 2
+
+
+def load_aliases(path: Path = DATA_DIR / "aliases.csv") -> Dict[str, str]:
+    with open(path, newline="", encoding="utf-8") as f:
+        return {row["alias"]: row["code"] for row in csv.DictReader(f)}
+
+
+def load_metro_cities(path: Path = DATA_DIR / "metro_areas.csv") -> Dict[str, str]:
+    with open(path, newline="", encoding="utf-8") as f:
+        return {row["city_name"]: row["city_code"] for row in csv.DictReader(f)}
+
+
+def build_location_index() -> LocationIndex:
+    return LocationIndex(load_airports(), load_metro_cities(), load_aliases())
+
+
+_locations: Optional[LocationIndex] = None
+_locations_lock = threading.Lock()
+
+
+def get_location_index() -> LocationIndex:
+    """Return the process-wide location index, built on first use (FlightAgentConfig.ready builds it at startup)"""
+    global _locations
+    if _locations is None:
+        with _locations_lock:
+            if _locations is None:
+                _locations = build_location_index()
+                logger.info(f"🗺️ Indexed {len(_locations.airports)} airports and {len(_locations.names)} place names")
+    return _locations
+
+
+@lru_cache(maxsize=4096)
+def resolve_location(text: str) -> Optional[str]:
+    """
+    Resolve a code or place name to an IATA code using the offline index.
+    Three-letter codes missing from the bundled data are passed through
+    upper-cased, so newly opened airports can still be searched.
+    """
+    code = get_location_index().resolve(text)
+    if code is None and len(text.strip()) == 3 and text.strip().isalpha():
+        return text.strip().upper()
+    return code
@@ -0,0 +1,164 @@
+import contextlib
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import timedelta
+from typing import Dict, Iterator, List, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, ProtectedError, Q, QuerySet
+from django.utils import timezone
+
+from .conf import get_setting
+from .models import ChatMessage, FlightResultSet, FlightSearchQuery
+
+logger = logging.getLogger(__name__)
+
+# Archived rows carry their offers under the name the API uses
+_FLIGHTS_KEY = {ChatMessage: 'flights', FlightSearchQuery: 'results'}
+
+
+class HistoryArchive:
+    """
+    Writes rows about to be purged to `<directory>/<table>-<UTC time>.jsonl.gz`,
+    one JSON object per line with the row's offers inlined. Each chunk is
+    flushed before its rows are deleted.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.started = timezone.now().strftime('%Y%m%dT%H%M%SZ')
+        self.paths: List[str] = []
+        self._files = {}
+
+    def write(self, model, ids: List[int]) -> None:
+        rows = list(model.objects.filter(pk__in=ids).order_by('pk').values())
+        flights = dict(FlightResultSet.objects.filter(id__in={row['result_set_id'] for row in rows})
+                       .values_list('id', 'flights'))
+        archive = self._file(model)
+        for row in rows:
+            row[_FLIGHTS_KEY[model]] = flights.get(row.pop('result_set_id'), [])
+            archive.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+        archive.flush()
+
+    def close(self) -> None:
+        for archive in self._files.values():
+            archive.close()
+        self._files.clear()
+
+    def _file(self, model):
+        if model not in self._files:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f'{model._meta.db_table}-{self.started}.jsonl.gz')
+            self._files[model] = gzip.open(path, 'at', encoding='utf-8')
+            self.paths.append(path)
+        return self._files[model]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def purge_rows(queryset: QuerySet, chunk_size: Optional[int] = None, pause: Optional[float] = None,
+               archive: Optional[HistoryArchive] = None) -> int:
+    """
+    Delete the rows of `queryset` in primary key order, `chunk_size` rows
+    per transaction, sleeping `pause` seconds between chunks so other
+    writers get the database lock in between. Rows are written to
+    `archive` first when one is given. Returns the number of rows deleted.
+    """
+    chunk_size = chunk_size or get_setting("HISTORY_PURGE_CHUNK_SIZE", 500)
+    pause = get_setting("HISTORY_PURGE_PAUSE", 0.02) if pause is None else pause
+    model = queryset.model
+    deleted, last_pk = 0, None
+
+    while True:
+        chunk = queryset.order_by('pk')
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        ids = list(chunk.values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        last_pk = ids[-1]
+
+        if archive is not None:
+            archive.write(model, ids)
+        try:
+            with transaction.atomic():
+                # Re-applies the filter, in case a row stopped matching since it was picked
+                deleted += queryset.filter(pk__in=ids).delete()[0]
+        except ProtectedError as e:
+            # A result set was referenced again meanwhile; leave this chunk
+            logger.warning(f"⚠️ Skipped purging {len(ids)} {model.__name__} rows still in use: {e}")
+
+        if len(ids) < chunk_size:
+            return deleted
+        if pause:
+            time.sleep(pause)
+
+
+def _over_cap(model, cap: int, newer_than=None) -> Iterator[QuerySet]:
+    """For each user with more than `cap` rows of `model`, the rows beyond their `cap` newest"""
+    users = list(
+        model.objects.order_by().values('user').annotate(rows=Count('id'))
+        .filter(rows__gt=cap).values_list('user', flat=True)
+    )
+    for user_id in users:
+        rows = model.objects.filter(user_id=user_id)
+        timestamp, pk = rows.order_by('-timestamp', '-id').values_list('timestamp', 'id')[cap - 1]
+        beyond = rows.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk))
+        # Rows old enough to expire anyway are left to the age rule
+        yield beyond.filter(timestamp__gte=newer_than) if newer_than else beyond
+
+
+def purge_history(max_age_days: Optional[int] = None, max_chat_messages: Optional[int] = None,
+                  max_searches: Optional[int] = None, archive_dir: Optional[str] = None,
+                  chunk_size: Optional[int] = None, pause: Optional[float] = None,
+                  dry_run: bool = False) -> Dict:
+    """
+    Apply the history retention rules: delete chat messages and searches
+    older than `max_age_days`, and each user's chat messages and searches
+    beyond their newest `max_chat_messages` / `max_searches`. Rules left as
+    None come from settings; 0 turns a rule off. Purged rows are archived
+    to `archive_dir` when set, and result sets no longer referenced by any
+    row are deleted afterwards. With `dry_run` rows are only counted.
+    """
+    max_age_days = get_setting("HISTORY_RETENTION_DAYS", 365) if max_age_days is None else max_age_days
+    if max_chat_messages is None:
+        max_chat_messages = get_setting("HISTORY_MAX_CHAT_MESSAGES_PER_USER", 5000)
+    max_searches = get_setting("HISTORY_MAX_SEARCHES_PER_USER", 1000) if max_searches is None else max_searches
+    archive_dir = archive_dir or get_setting("HISTORY_ARCHIVE_DIR", None)
+
+    cutoff = timezone.now() - timedelta(days=max_age_days) if max_age_days else None
+    stats = {"chat_messages": 0, "searches": 0, "result_sets": 0}
+    targets = []
+    for key, model, cap in (("chat_messages", ChatMessage, max_chat_messages), ("searches", FlightSearchQuery, max_searches)):
+        if cutoff:
+            targets.append((key, model.objects.filter(timestamp__lt=cutoff)))
+        if cap:
+            targets.extend((key, queryset) for queryset in _over_cap(model, cap, newer_than=cutoff))
+
+    archive = HistoryArchive(archive_dir) if archive_dir and not dry_run else None
+    with archive or contextlib.nullcontext():
+        for key, queryset in targets:
+            if dry_run:
+                stats[key] += queryset.count()
+            else:
+                stats[key] += purge_rows(queryset, chunk_size, pause, archive)
+
+    if not dry_run:
+        # A day's grace, so a set just stored for a row still being written is not taken
+        orphans = FlightResultSet.objects.filter(
+            searches__isnull=True, messages__isnull=True, created_at__lt=timezone.now() - timedelta(days=1)
+        )
+        stats["result_sets"] = purge_rows(orphans, chunk_size, pause)
+    if archive is not None:
+        stats["archives"] = archive.paths
+
+    logger.info(f"🧹 History purge finished: {stats}")
+    return stats
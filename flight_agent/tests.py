@@ -0,0 +1,822 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+from datetime import date, datetime, timedelta, timezone
+from unittest import mock
+
+from django.db import OperationalError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from authentication.models import AppUser
+
+from .amadeus_auth import AmadeusTokenManager
+from .amadeus_client import AmadeusClient, backoff_delay, retry_after_seconds
+from .autocomplete import AirportAutocomplete
+from .cache import FRESH, MISS, STALE, FlightOfferCache, make_search_key
+from .coalesce import AsyncSingleFlight, SingleFlight
+from .fixtures import FixtureStore, relative_fixture_key, shift_dates
+from .flight_service import FlightAgentService
+from .history import history_page
+from .models import ChatMessage
+from .offers import normalize_offers, parse_duration_minutes
+from .query_parser import parse_query, resolve_date
+from .rate_limit import BACKGROUND, FANOUT, INTERACTIVE, RateLimitExceeded, TokenBucketLimiter
+from .resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, EndpointPolicy
+from .resolver import get_location_index, one_edit_apart, resolve_location
+from .retention import purge_rows
+from .write_behind import HistoryWriter
+
+
+# A Sunday
+TODAY = date(2026, 10, 18)
+
+
+class Clock:
+    """Stands in for time.monotonic so tests can move time forward"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def offer_data(departure="2026-10-23T06:00:00", arrival="2026-10-23T08:10:00", duration="PT2H10M",
+               price="4500.00", number="101"):
+    """One offer as the Amadeus flight-offers API returns it"""
+    return {
+        "itineraries": [{
+            "duration": duration,
+            "segments": [{
+                "carrierCode": "AI", "number": number, "duration": duration,
+                "departure": {"iataCode": "DEL", "at": departure},
+                "arrival": {"iataCode": "GOI", "at": arrival},
+            }],
+        }],
+        "price": {"total": price, "currency": "INR"},
+        "validatingAirlineCodes": ["AI"],
+    }
+
+
+def response(status_code, body=None):
+    return mock.Mock(status_code=status_code, json=mock.Mock(return_value=body or {}), text="", headers={})
+
+
+def frozen_today(day):
+    """A date class whose today() is `day`, to patch over flight_agent.fixtures.date"""
+
+    class FrozenDate(date):
+        @classmethod
+        def today(cls):
+            return day
+
+    return mock.patch("flight_agent.fixtures.date", FrozenDate)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch("flight_agent.resilience.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker("test", min_calls=4, cooldown=10, half_open_timeout=20)
+
+    def trip(self):
+        for _ in range(4):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record(False)
+
+    def test_opens_then_closes_after_a_good_trial(self):
+        self.trip()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow())
+
+        self.clock.now += 10
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertTrue(self.breaker.allow())
+        # Only one trial at a time
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record(True)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+    def test_failed_trial_reopens(self):
+        self.trip()
+        self.clock.now += 10
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record(False)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.stats()["opened"], 2)
+
+    def test_unanswered_trial_times_out(self):
+        self.trip()
+        self.clock.now += 10
+        self.assertTrue(self.breaker.allow())
+
+        self.clock.now += 20
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.state, OPEN)
+        self.clock.now += 10
+        self.assertTrue(self.breaker.allow())
+
+    def test_cancelled_trial_frees_its_slot(self):
+        policy = EndpointPolicy("test", "/test", min_calls=4, cooldown=10)
+        policy.breaker = self.breaker
+        self.trip()
+        self.clock.now += 10
+
+        async def cancel_trial():
+            started = asyncio.Event()
+
+            async def send():
+                started.set()
+                await asyncio.sleep(60)
+
+            task = asyncio.ensure_future(policy.aobserve(send))
+            await started.wait()
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel_trial())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record(True)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+
+class SingleFlightTests(SimpleTestCase):
+    def run_together(self, fn, callers=4):
+        flight = SingleFlight()
+        release = threading.Event()
+        entered = threading.Event()
+        outcomes = []
+
+        def call():
+            entered.set()
+            release.wait(5)
+            return fn()
+
+        def caller():
+            try:
+                outcomes.append(flight.do("key", call))
+            except Exception as e:
+                outcomes.append(e)
+
+        threads = [threading.Thread(target=caller) for _ in range(callers)]
+        threads[0].start()
+        entered.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        while flight.stats()["coalesced"] < callers - 1:
+            threading.Event().wait(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        return flight, outcomes
+
+    def test_callers_share_one_result(self):
+        flight, outcomes = self.run_together(lambda: ["offer"])
+        self.assertEqual(outcomes, [["offer"]] * 4)
+        self.assertEqual(flight.stats(), {"executions": 1, "coalesced": 3})
+
+    def test_callers_share_one_exception(self):
+        error = ValueError("upstream down")
+
+        def fail():
+            raise error
+
+        flight, outcomes = self.run_together(fail)
+        self.assertEqual(outcomes, [error] * 4)
+        self.assertEqual(flight.stats()["executions"], 1)
+
+
+class AsyncSingleFlightTests(SimpleTestCase):
+    def test_callers_share_one_result(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def search():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return ["offer"]
+
+        async def run():
+            return await asyncio.gather(*(flight.do("key", search) for _ in range(4)))
+
+        self.assertEqual(asyncio.run(run()), [["offer"]] * 4)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.stats(), {"executions": 1, "coalesced": 3})
+
+    def test_callers_share_one_exception(self):
+        flight = AsyncSingleFlight()
+
+        async def search():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream down")
+
+        async def run():
+            return await asyncio.gather(*(flight.do("key", search) for _ in range(3)), return_exceptions=True)
+
+        outcomes = asyncio.run(run())
+        self.assertTrue(all(isinstance(outcome, ValueError) for outcome in outcomes))
+        self.assertIs(outcomes[0], outcomes[1])
+
+    def test_cancelled_leader_does_not_cancel_followers(self):
+        flight = AsyncSingleFlight()
+
+        async def search():
+            await asyncio.sleep(0.05)
+            return ["offer"]
+
+        async def run():
+            leader = asyncio.ensure_future(flight.do("key", search))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(flight.do("key", search))
+            await asyncio.sleep(0)
+            leader.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await leader
+            return await follower
+
+        self.assertEqual(asyncio.run(run()), ["offer"])
+        self.assertEqual(flight.stats(), {"executions": 1, "coalesced": 1})
+
+
+class HistoryWriterTests(TestCase):
+    def setUp(self):
+        self.user = AppUser.objects.create(email="writer@example.com", name="Writer", password_hash="!")
+        self.writer = HistoryWriter(batch_size=10, max_retries=2)
+        patcher = mock.patch("flight_agent.write_behind.close_old_connections")
+        self.close_old_connections = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fail_first_write(self):
+        write = self.writer._write
+        calls = []
+
+        def drop_connection_once(batch):
+            calls.append(batch)
+            if len(calls) == 1:
+                raise OperationalError("server closed the connection unexpectedly")
+            return write(batch)
+
+        return mock.patch.object(self.writer, "_write", drop_connection_once)
+
+    def test_reconnects_after_a_dropped_connection(self):
+        for index in range(3):
+            self.writer.submit(ChatMessage(user=self.user, message=f"message {index}"))
+        with self.fail_first_write():
+            self.assertEqual(self.writer.flush(), 0)
+            self.close_old_connections.assert_called_once()
+            self.assertEqual(self.writer.flush(), 3)
+
+        self.assertEqual(ChatMessage.objects.filter(user=self.user).count(), 3)
+        stats = self.writer.stats()
+        self.assertEqual((stats["retried_batches"], stats["failed_rows"], stats["pending"]), (1, 0, 0))
+
+    def test_drops_a_batch_that_keeps_failing(self):
+        self.writer.submit(ChatMessage(user=self.user, message="poisoned"))
+        with mock.patch.object(self.writer, "_write", side_effect=OperationalError("database is locked")):
+            for _ in range(3):
+                self.writer.flush()
+
+        stats = self.writer.stats()
+        self.assertEqual((stats["retried_batches"], stats["failed_rows"], stats["pending"]), (2, 1, 0))
+        self.writer.submit(ChatMessage(user=self.user, message="next"))
+        self.assertEqual(self.writer.flush(), 1)
+
+    def test_clearing_history_waits_out_a_failed_write(self):
+        ChatMessage.objects.create(user=self.user, message="saved")
+        self.writer.submit(ChatMessage(user=self.user, message="queued"))
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        with self.fail_first_write(), mock.patch("flight_agent.views.get_history_writer", return_value=self.writer):
+            response = client.delete("/api/chat-history/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["deleted"], 2)
+        self.assertEqual(self.writer.stats()["pending"], 0)
+        self.assertFalse(ChatMessage.objects.filter(user=self.user).exists())
+
+
+class StreamQueryTests(SimpleTestCase):
+    def options(self, search):
+        return {(call.kwargs["adults"], call.kwargs["currency"], call.kwargs["max_results"]) for call in search.call_args_list}
+
+    def test_search_options_reach_every_search(self):
+        service = FlightAgentService()
+        for query in ("flights from delhi to goa tomorrow", "flights from london to delhi tomorrow"):
+            with mock.patch.object(service, "search_flights", return_value=[{"error": "No flights"}]) as search:
+                events = list(service.stream_query(query, adults=2, currency="EUR", max_results=3))
+            self.assertEqual(events[-1][0], "result")
+            self.assertEqual(self.options(search), {(2, "EUR", 3)}, query)
+
+    def test_async_search_options_reach_every_search(self):
+        service = FlightAgentService()
+
+        async def stream(query):
+            return [event async for event in service.astream_query(query, adults=2, currency="EUR", max_results=3)]
+
+        for query in ("flights from delhi to goa tomorrow", "flights from london to delhi tomorrow"):
+            with mock.patch.object(service, "asearch_flights", return_value=[{"error": "No flights"}]) as search:
+                asyncio.run(stream(query))
+            self.assertEqual(self.options(search), {(2, "EUR", 3)}, query)
+
+
+class TokenManagerTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch("flight_agent.amadeus_auth.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = mock.Mock()
+        self.manager = AmadeusTokenManager(self.client, "id", "secret", expiry_margin=60, refresh_ahead=300)
+
+    def grant(self, token, expires_in):
+        self.client.post.return_value = response(200, {"access_token": token, "expires_in": expires_in})
+
+    def test_long_lived_token_uses_the_configured_margins(self):
+        self.grant("first", 1800)
+        self.assertEqual(self.manager.get_token(), "first")
+        with mock.patch.object(self.manager, "_refresh_in_background") as refresh:
+            self.clock.now += 1499
+            self.assertEqual(self.manager.cached_token(), "first")
+            refresh.assert_not_called()
+            self.clock.now += 1
+            self.assertEqual(self.manager.cached_token(), "first")
+            refresh.assert_called_once()
+        self.clock.now += 240
+        self.assertIsNone(self.manager.cached_token())
+
+    def test_short_lived_token_is_used_before_it_is_renewed(self):
+        # Granted for less than refresh_ahead: renewed in its second half, dropped in its last quarter
+        self.grant("short", 120)
+        self.assertEqual(self.manager.get_token(), "short")
+        with mock.patch.object(self.manager, "_refresh_in_background") as refresh:
+            self.clock.now += 59
+            self.assertEqual(self.manager.cached_token(), "short")
+            refresh.assert_not_called()
+            self.clock.now += 1
+            self.assertEqual(self.manager.cached_token(), "short")
+            refresh.assert_called_once()
+        self.clock.now += 30
+        self.assertIsNone(self.manager.cached_token())
+
+        self.grant("next", 1800)
+        self.assertEqual(self.manager.get_token(), "next")
+        self.assertEqual((self.manager._margin, self.manager._lead), (60, 300))
+
+    def test_search_retries_once_with_a_new_token_after_401(self):
+        service = FlightAgentService()
+        service.token_manager = mock.Mock()
+        service.token_manager.get_token.side_effect = ["revoked", "renewed"]
+        service.client = mock.Mock()
+        service.client.get.side_effect = [response(401), response(200, {"data": [offer_data()]})]
+
+        results = service._fetch_and_store(make_search_key("DEL", "GOI", "2026-10-23", 1, "INR", 1))
+
+        service.token_manager.invalidate.assert_called_once_with("revoked")
+        self.assertEqual([call.kwargs["headers"]["Authorization"] for call in service.client.get.call_args_list],
+                         ["Bearer revoked", "Bearer renewed"])
+        self.assertEqual([offer.price for offer in results], [4500.0])
+
+
+class RetryTests(SimpleTestCase):
+    def setUp(self):
+        self.client = AmadeusClient("https://amadeus.test", max_retries=2, backoff=0.5, max_backoff=8)
+        self.client.session.request = mock.Mock()
+        patcher = mock.patch("flight_agent.amadeus_client.time.sleep")
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def reply(self, *responses):
+        self.client.session.request.side_effect = list(responses)
+        return self.client.get("/v2/shopping/flight-offers")
+
+    def test_backoff_is_jittered_and_capped(self):
+        with mock.patch("flight_agent.amadeus_client.random.uniform", side_effect=lambda low, high: high):
+            self.assertEqual([backoff_delay(attempt, 0.5, 8) for attempt in range(6)], [0.5, 1, 2, 4, 8, 8])
+
+    def test_retry_after_in_seconds_or_as_a_date(self):
+        self.assertEqual(retry_after_seconds({"Retry-After": "3"}), 3.0)
+        self.assertIsNone(retry_after_seconds({}))
+        self.assertIsNone(retry_after_seconds({"Retry-After": "soon"}))
+        # 2026-10-18 12:00:00 UTC
+        with mock.patch("flight_agent.amadeus_client.time.time", return_value=1792324800):
+            self.assertEqual(retry_after_seconds({"Retry-After": "Sun, 18 Oct 2026 12:00:10 GMT"}), 10)
+
+    def test_transient_failures_are_retried(self):
+        result = self.reply(response(503), response(502), response(200))
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(self.sleep.call_count, 2)
+        self.assertTrue(all(0 <= call.args[0] <= 8 for call in self.sleep.call_args_list))
+
+    def test_retries_are_bounded(self):
+        result = self.reply(response(503), response(503), response(503))
+        self.assertEqual(result.status_code, 503)
+        self.assertEqual(self.client.session.request.call_count, 3)
+
+    def test_retry_after_is_honoured(self):
+        limited = response(429)
+        limited.headers = {"Retry-After": "2"}
+        self.assertEqual(self.reply(limited, response(200)).status_code, 200)
+        self.sleep.assert_called_once_with(2.0)
+
+    def test_retry_after_beyond_max_backoff_is_left_to_the_caller(self):
+        limited = response(429)
+        limited.headers = {"Retry-After": "120"}
+        self.assertIs(self.reply(limited, response(200)), limited)
+        self.sleep.assert_not_called()
+        self.assertEqual(self.client.session.request.call_count, 1)
+
+
+class FlightOfferCacheTests(SimpleTestCase):
+    key = make_search_key("DEL", "GOI", "2030-01-15")
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch("flight_agent.cache.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = FlightOfferCache(ttl=10, stale_ttl=20, stale_if_error_ttl=100)
+
+    def test_fresh_then_stale_then_miss(self):
+        self.cache.set(self.key, ["offer"])
+        self.assertEqual(self.cache.get(self.key), (["offer"], FRESH))
+        self.clock.now += 10
+        self.assertEqual(self.cache.get(self.key), (["offer"], STALE))
+        self.clock.now += 20
+        self.assertEqual(self.cache.get(self.key), (None, MISS))
+        # Still kept for stale-if-error
+        self.assertEqual(self.cache.get_stale_if_error(self.key), ["offer"])
+        self.clock.now += 80
+        self.assertIsNone(self.cache.get_stale_if_error(self.key))
+
+    def test_one_refresh_per_key(self):
+        self.assertTrue(self.cache.begin_refresh(self.key))
+        self.assertFalse(self.cache.begin_refresh(self.key))
+        self.cache.end_refresh(self.key)
+        self.assertTrue(self.cache.begin_refresh(self.key))
+
+    def test_stale_results_are_served_while_revalidating(self):
+        service = FlightAgentService()
+        service.cache = self.cache
+        self.cache.set(self.key, ["cached offer"])
+        self.clock.now += 15
+        with mock.patch.object(service, "_revalidate_in_background") as revalidate, \
+                mock.patch.object(service, "_fetch_flights") as fetch:
+            self.assertEqual(service.search_flights("DEL", "GOI", "2030-01-15"), ["cached offer"])
+        revalidate.assert_called_once_with(self.key)
+        fetch.assert_not_called()
+
+    def test_stale_results_are_served_when_amadeus_fails(self):
+        service = FlightAgentService()
+        service.cache = self.cache
+        self.cache.set(self.key, ["cached offer"])
+        self.clock.now += 60
+        with mock.patch.object(service, "_fetch_flights", return_value=[{"error": "Flight search failed: 500"}]):
+            self.assertEqual(service.search_flights("DEL", "GOI", "2030-01-15"), ["cached offer"])
+        self.clock.now += 50
+        with mock.patch.object(service, "_fetch_flights", return_value=[{"error": "Flight search failed: 500"}]):
+            self.assertEqual(service.search_flights("DEL", "GOI", "2030-01-15"), [{"error": "Flight search failed: 500"}])
+
+
+class RateLimiterTests(SimpleTestCase):
+    def test_queued_calls_are_served_by_priority(self):
+        limiter = TokenBucketLimiter(rate=4, burst=1, max_wait=5)
+        limiter.acquire(INTERACTIVE)
+        served = []
+
+        def call(priority):
+            limiter.acquire(priority)
+            served.append(priority)
+
+        threads = []
+        for priority in (BACKGROUND, FANOUT, INTERACTIVE):
+            threads.append(threading.Thread(target=call, args=(priority,)))
+            threads[-1].start()
+            while limiter.stats()["queued"] < len(threads):
+                threading.Event().wait(0.005)
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(served, [INTERACTIVE, FANOUT, BACKGROUND])
+
+    def test_call_that_would_wait_too_long_is_rejected(self):
+        limiter = TokenBucketLimiter(rate=1, burst=1, max_wait=0.05)
+        self.assertEqual(limiter.acquire(FANOUT), 0.0)
+        with self.assertRaises(RateLimitExceeded):
+            limiter.acquire(FANOUT)
+        stats = limiter.stats()
+        self.assertEqual(stats["priorities"]["fanout"]["rejected"], 1)
+        self.assertEqual(stats["queued"], 0)
+
+
+class NormalizeOffersTests(SimpleTestCase):
+    def normalize(self, **fields):
+        return normalize_offers([offer_data(**fields)], "del", "goi", "2026-10-23")[0]
+
+    def test_parse_duration(self):
+        self.assertEqual(parse_duration_minutes("PT2H10M"), 130)
+        self.assertEqual(parse_duration_minutes("PT45M"), 45)
+        self.assertEqual(parse_duration_minutes("P1DT3H"), 1620)
+        self.assertIsNone(parse_duration_minutes("P"))
+        self.assertIsNone(parse_duration_minutes("2 hours"))
+
+    def test_multi_day_duration(self):
+        offer = self.normalize(departure="2026-10-23T22:00:00", arrival="2026-10-25T01:00:00", duration="P1DT3H")
+        self.assertEqual(offer.duration_minutes, 1620)
+        self.assertEqual(offer.to_dict()["duration"], "27h 0m")
+
+    def test_overnight_flight_without_a_duration(self):
+        offer = self.normalize(departure="2026-10-23T23:30:00", arrival="2026-10-24T02:15:00", duration=None)
+        self.assertEqual(offer.duration_minutes, 165)
+        self.assertEqual((offer.to_dict()["departure_time"], offer.to_dict()["arrival_time"]), ("23:30", "02:15"))
+
+    def test_itinerary_duration_wins_over_local_times(self):
+        # Local times across time zones: 6h10m apart on the clock, 2h40m in the air
+        offer = self.normalize(departure="2026-10-23T01:00:00", arrival="2026-10-23T07:10:00", duration="PT2H40M")
+        self.assertEqual(offer.duration_minutes, 160)
+        self.assertEqual((offer.origin, offer.price), ("DEL", 4500.0))
+
+
+class DateRuleTests(SimpleTestCase):
+    def assertResolves(self, phrase, expected):
+        self.assertEqual(resolve_date(phrase, TODAY), expected, phrase)
+
+    def test_relative_days(self):
+        self.assertResolves("today", date(2026, 10, 18))
+        self.assertResolves("tonight", date(2026, 10, 18))
+        self.assertResolves("tomorrow", date(2026, 10, 19))
+        self.assertResolves("day after tomorrow", date(2026, 10, 20))
+        self.assertResolves("next week", date(2026, 10, 25))
+        self.assertResolves("in 3 days", date(2026, 10, 21))
+        self.assertResolves("in 2 weeks", date(2026, 11, 1))
+
+    def test_weekdays_mean_the_coming_one(self):
+        for phrase in ("friday", "this friday", "next friday", "coming friday", "on friday"):
+            self.assertResolves(phrase, date(2026, 10, 23))
+        # Today is a Sunday, so "sunday" is a week away
+        self.assertResolves("sunday", date(2026, 10, 25))
+
+    def test_month_days_roll_over_to_next_year(self):
+        self.assertResolves("12 dec", date(2026, 12, 12))
+        self.assertResolves("dec 12th", date(2026, 12, 12))
+        self.assertResolves("3rd of january", date(2027, 1, 3))
+        self.assertResolves("18 oct", date(2026, 10, 18))
+        self.assertResolves("17 oct", date(2027, 10, 17))
+
+    def test_day_of_month(self):
+        self.assertResolves("the 25th", date(2026, 10, 25))
+        self.assertResolves("the 5th", date(2026, 11, 5))
+        self.assertResolves("on the 31st", date(2026, 10, 31))
+
+    def test_iso_dates_in_the_past_mean_next_year(self):
+        self.assertResolves("2026-12-01", date(2026, 12, 1))
+        self.assertResolves("2026-01-15", date(2027, 1, 15))
+
+    def test_impossible_or_unknown_dates(self):
+        self.assertResolves("feb 30", None)
+        self.assertResolves("someday", None)
+
+    def test_parse_query_uses_the_first_date(self):
+        parsed = parse_query("flights from delhi to goa next friday or saturday", today=TODAY)
+        self.assertEqual((parsed.origin, parsed.destination), ("DELHI", "GOA"))
+        self.assertEqual(parsed.date, "next friday")
+        self.assertEqual(parsed.departure_date, "2026-10-23")
+
+    def test_parse_query_defaults_to_tomorrow(self):
+        parsed = parse_query("flights from delhi to goa", today=TODAY)
+        self.assertEqual(parsed.departure_date, "2026-10-19")
+        self.assertIn("date", parsed.defaulted)
+
+
+class ResolverTests(SimpleTestCase):
+    def test_one_edit_apart(self):
+        self.assertTrue(one_edit_apart("banglore", "bangalore"))
+        self.assertTrue(one_edit_apart("mumbia", "mumbai"))
+        self.assertTrue(one_edit_apart("londn", "london"))
+        self.assertFalse(one_edit_apart("london", "london"))
+        self.assertFalse(one_edit_apart("narnia", "nairobi"))
+
+    def test_single_typos_resolve(self):
+        self.assertEqual(get_location_index().resolve("banglore"), "BLR")
+        self.assertEqual(get_location_index().resolve("hyderbad"), "HYD")
+
+    def test_unknown_place_names_stay_unresolved(self):
+        for place in ("Narnia", "Mordor", "Gotham", "Xyzzy"):
+            self.assertIsNone(resolve_location(place), place)
+
+    def test_major_cities_resolve_to_their_main_airport(self):
+        for place, code in (("dublin", "DUB"), ("berlin", "BER"), ("amman", "AMM"), ("tehran", "IKA")):
+            self.assertEqual(resolve_location(place), code, place)
+
+    def test_closed_airports_are_gone(self):
+        self.assertNotIn("TXL", get_location_index().airports)
+
+    def test_unknown_place_fails_before_any_search(self):
+        service = FlightAgentService()
+        with mock.patch.object(service, "search_flights") as search:
+            result = service.run_query("flights from Narnia to Delhi tomorrow")
+        search.assert_not_called()
+        self.assertEqual(result.error, "Unknown airport or city: NARNIA")
+        self.assertEqual(result.flights, [])
+
+
+class AutocompleteTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.index = AirportAutocomplete({"BOM": 40, "GOI": 10})
+
+    def codes(self, query, index=None):
+        return [entry["code"] for entry in (index or self.index).lookup(query, 3)]
+
+    def test_busier_airport_beats_an_exact_code(self):
+        self.assertEqual(self.codes("mum")[:2], ["BOM", "MUM"])
+
+    def test_capitals_ask_for_the_code(self):
+        self.assertEqual(self.codes("MUM")[0], "MUM")
+
+    def test_exact_code_leads_among_similar_weights(self):
+        index = AirportAutocomplete({"BOM": 40, "MUM": 30})
+        self.assertEqual(self.codes("mum", index)[0], "MUM")
+
+    def test_complete_alias_leads(self):
+        self.assertEqual(self.codes("goa")[:2], ["GOI", "GOA"])
+
+    def test_exact_code_prefix(self):
+        self.assertEqual(self.codes("lhr"), ["LHR"])
+        self.assertEqual(self.codes("DEL")[0], "DEL")
+
+
+class HistoryPageTests(TestCase):
+    def setUp(self):
+        self.user = AppUser.objects.create(email="pager@example.com", name="Pager", password_hash="!")
+        other = AppUser.objects.create(email="other@example.com", name="Other", password_hash="!")
+        start = datetime(2026, 10, 1, tzinfo=timezone.utc)
+        # Messages three to a timestamp, so pages have to break ties by id
+        ChatMessage.objects.bulk_create(
+            ChatMessage(user=self.user, message=f"message {index}", timestamp=start + timedelta(minutes=index // 3))
+            for index in range(23)
+        )
+        self.other_message = ChatMessage.objects.create(user=other, message="elsewhere", timestamp=start)
+        self.history = ChatMessage.objects.filter(user=self.user)
+
+    def test_pages_cover_every_row_once(self):
+        expected = list(self.history.order_by("-timestamp", "-id").values_list("id", flat=True))
+        seen, before, pages = [], None, 0
+        while True:
+            rows, before = history_page(self.history, before, 5)
+            seen.extend(row.id for row in rows)
+            pages += 1
+            if before is None:
+                break
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages, 5)
+
+    def test_exact_last_page_has_no_cursor(self):
+        rows, before = history_page(self.history, None, 23)
+        self.assertEqual((len(rows), before), (23, None))
+
+    def test_cursor_must_come_from_the_same_history(self):
+        with self.assertRaises(ValueError):
+            history_page(self.history, self.other_message.id, 5)
+
+    def test_chat_history_endpoint_pages_back(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        first = client.get("/api/chat-history/", {"limit": 20}).json()
+        second = client.get("/api/chat-history/", {"limit": 20, "before": first["next_before"]}).json()
+        self.assertEqual(len(first["messages"]) + len(second["messages"]), 23)
+        self.assertIsNone(second["next_before"])
+        # Each page is oldest first, and the second holds only older messages
+        self.assertLessEqual(second["messages"][-1]["timestamp"], first["messages"][0]["timestamp"])
+        self.assertFalse({m["id"] for m in first["messages"]} & {m["id"] for m in second["messages"]})
+        self.assertEqual(client.get("/api/chat-history/", {"before": "x"}).status_code, 400)
+
+
+class DedupeResultsMigrationTests(TransactionTestCase):
+    migrate_from = [("flight_agent", "0004_flightresultset")]
+    migrate_to = [("flight_agent", "0005_dedupe_flight_results")]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def setUp(self):
+        self.user = AppUser.objects.create(email="migrated@example.com", name="Migrated", password_hash="!")
+        apps = self.migrate(self.migrate_from)
+        self.addCleanup(lambda: self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes()))
+        FlightSearchQuery = apps.get_model("flight_agent", "FlightSearchQuery")
+        ChatMessage = apps.get_model("flight_agent", "ChatMessage")
+
+        self.flights = [{"airline": "AI", "price": "₹4500.00"}]
+        other = [{"airline": "6E", "price": "₹3900.00"}]
+        for index in range(3):
+            FlightSearchQuery.objects.create(user_id=self.user.id, query=f"search {index}", origin="DEL",
+                                             destination="GOI", date="2026-10-23", results=self.flights)
+            ChatMessage.objects.create(user_id=self.user.id, message=f"reply {index}", flights=self.flights)
+        FlightSearchQuery.objects.create(user_id=self.user.id, query="other", origin="DEL",
+                                         destination="BOM", date="2026-10-23", results=other)
+        ChatMessage.objects.create(user_id=self.user.id, message="hello", flights=[])
+
+    def test_identical_results_are_stored_once(self):
+        apps = self.migrate(self.migrate_to)
+        FlightResultSet = apps.get_model("flight_agent", "FlightResultSet")
+        FlightSearchQuery = apps.get_model("flight_agent", "FlightSearchQuery")
+        ChatMessage = apps.get_model("flight_agent", "ChatMessage")
+
+        self.assertEqual(FlightResultSet.objects.count(), 2)
+        shared = FlightResultSet.objects.get(flights=self.flights)
+        self.assertEqual(FlightSearchQuery.objects.filter(result_set=shared).count(), 3)
+        self.assertEqual(ChatMessage.objects.filter(result_set=shared).count(), 3)
+        self.assertFalse(FlightSearchQuery.objects.filter(result_set__isnull=True).exists())
+        self.assertIsNone(ChatMessage.objects.get(message="hello").result_set_id)
+
+    def test_reverse_restores_inline_results(self):
+        # Past the migration that drops the inline copies, so only the result sets hold the flights
+        self.migrate([("flight_agent", "0006_remove_inline_results")])
+        apps = self.migrate(self.migrate_from)
+        ChatMessage = apps.get_model("flight_agent", "ChatMessage")
+        self.assertEqual(ChatMessage.objects.get(message="reply 0").flights, self.flights)
+
+
+class PurgeRowsTests(TestCase):
+    def setUp(self):
+        self.user = AppUser.objects.create(email="purge@example.com", name="Purge", password_hash="!")
+        self.other = AppUser.objects.create(email="keep@example.com", name="Keep", password_hash="!")
+        ChatMessage.objects.bulk_create(ChatMessage(user=self.user, message=f"message {index}") for index in range(25))
+        ChatMessage.objects.bulk_create(ChatMessage(user=self.other, message=f"kept {index}") for index in range(5))
+
+    def deletes(self, queries):
+        return [query for query in queries if query["sql"].startswith('DELETE FROM "flight_agent_chatmessage"')]
+
+    def test_deletes_in_chunks(self):
+        with CaptureQueriesContext(connection) as queries:
+            deleted = purge_rows(ChatMessage.objects.filter(user=self.user), chunk_size=10, pause=0)
+        self.assertEqual(deleted, 25)
+        self.assertEqual(len(self.deletes(queries.captured_queries)), 3)
+        self.assertFalse(ChatMessage.objects.filter(user=self.user).exists())
+        self.assertEqual(ChatMessage.objects.filter(user=self.other).count(), 5)
+
+    def test_exact_multiple_of_the_chunk_size(self):
+        with CaptureQueriesContext(connection) as queries:
+            deleted = purge_rows(ChatMessage.objects.filter(user=self.user), chunk_size=5, pause=0)
+        self.assertEqual(deleted, 25)
+        self.assertEqual(len(self.deletes(queries.captured_queries)), 5)
+        self.assertFalse(ChatMessage.objects.filter(user=self.user).exists())
+
+    def test_pauses_between_chunks_only(self):
+        with mock.patch("flight_agent.retention.time.sleep") as sleep:
+            purge_rows(ChatMessage.objects.filter(user=self.user), chunk_size=10, pause=0.5)
+        self.assertEqual(sleep.call_count, 2)
+
+
+class FixtureStoreTests(SimpleTestCase):
+    path = "/v2/shopping/flight-offers"
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.fixtures = os.path.join(directory.name, "fixtures.jsonl.gz")
+
+    def params(self, day):
+        return {"originLocationCode": "DEL", "destinationLocationCode": "GOI", "departureDate": day.isoformat(),
+                "adults": 1}
+
+    def test_relative_key_and_date_shift(self):
+        self.assertEqual(relative_fixture_key("GET", self.path, self.params(date(2026, 10, 23)), TODAY),
+                         relative_fixture_key("GET", self.path, self.params(date(2026, 10, 24)), date(2026, 10, 19)))
+        self.assertIsNone(relative_fixture_key("GET", self.path, {"originLocationCode": "DEL"}, TODAY))
+        self.assertEqual(shift_dates('{"at": "2026-10-23T06:00:00", "on": "2026-10-31"}', 1),
+                         '{"at": "2026-10-24T06:00:00", "on": "2026-11-01"}')
+
+    def test_relative_search_replays_on_a_later_day(self):
+        body = json.dumps({"data": [offer_data("2026-10-23T23:30:00", "2026-10-24T02:15:00")]})
+        with frozen_today(TODAY):
+            FixtureStore(self.fixtures).record("GET", self.path, self.params(date(2026, 10, 23)),
+                                               mock.Mock(status_code=200, text=body, headers={}))
+
+        with frozen_today(date(2026, 10, 19)):
+            store = FixtureStore(self.fixtures)
+            # "in 5 days", asked a day later
+            shifted = store.replay("GET", self.path, self.params(date(2026, 10, 24)))
+            exact = store.replay("GET", self.path, self.params(date(2026, 10, 23)))
+            missing = store.replay("GET", self.path, self.params(date(2026, 10, 27)))
+
+        self.assertEqual(shifted.status_code, 200)
+        segment = shifted.json()["data"][0]["itineraries"][0]["segments"][0]
+        self.assertEqual((segment["departure"]["at"], segment["arrival"]["at"]),
+                         ("2026-10-24T23:30:00", "2026-10-25T02:15:00"))
+        self.assertEqual(exact.text, body)
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(store.stats(), {"hits": 2, "misses": 1, "recorded": 0, "size": 1})
@@ -1,8 +1,16 @@
 from django.urls import path
-from .views import FlightSearchView, ChatHistoryView, SearchHistoryView
+from .views import (
+    FlightSearchView, FlightSearchStreamView, ChatHistoryView, SearchHistoryView, FlightServiceStatsView,
+    AirportAutocompleteView, NearbyAirportsView, flight_search_async,
+)
 
 urlpatterns = [
     path('flight-search/', FlightSearchView.as_view(), name='flight-search'),
+    path('flight-search/async/', flight_search_async, name='flight-search-async'),
+    path('flight-search/stream/', FlightSearchStreamView.as_view(), name='flight-search-stream'),
     path('chat-history/', ChatHistoryView.as_view(), name='chat-history'),
     path('search-history/', SearchHistoryView.as_view(), name='search-history'),
+    path('flight-search/stats/', FlightServiceStatsView.as_view(), name='flight-search-stats'),
+    path('airports/autocomplete/', AirportAutocompleteView.as_view(), name='airport-autocomplete'),
+    path('airports/nearby/', NearbyAirportsView.as_view(), name='airports-nearby'),
 ]
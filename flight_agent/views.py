@@ -1,15 +1,65 @@
 from rest_framework.views import APIView
+from rest_framework.request import Request
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
-from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework import exceptions, status
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from authentication.backends import get_principal_cache
+from authentication.hashing import get_hashing_pool
 from .models import FlightSearchQuery, ChatMessage
 from .flight_service import FlightAgentService
+from .history import (
+    MAX_PAGE_SIZE, save_user_message, save_query_result, asave_user_message, asave_query_result, history_page,
+)
+from .cache import get_flight_cache
+from .coalesce import coalescing_stats
+from .rate_limit import get_rate_limiter
+from .resilience import endpoint_stats
+from .autocomplete import get_airport_autocomplete
+from .geo import nearest_airports
+from .retention import purge_rows
+from .write_behind import get_history_writer
+from .conf import get_setting
+from .fixtures import PASSTHROUGH, get_fixture_store, get_transport
+from .renderers import EventStreamRenderer, sse_event
+import hashlib
 import json
 
 User = get_user_model()
 
 
+def _parse_flex_days(value):
+    """Validate the optional flex_days field; raises ValueError/TypeError when invalid"""
+    return None if value is None else int(value)
+
+
+def _parse_page(params, default_limit):
+    """Validate the optional before/limit pagination parameters; raises ValueError/TypeError when invalid"""
+    before = params.get('before')
+    before = int(before) if before not in (None, '') else None
+    limit = int(params.get('limit', default_limit))
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return before, min(limit, MAX_PAGE_SIZE)
+
+
+def _parse_position(data):
+    """Validate the optional lat/lon fields; raises ValueError/TypeError when invalid"""
+    lat, lon = data.get('lat'), data.get('lon')
+    if lat is None and lon is None:
+        return None
+    lat, lon = float(lat), float(lon)
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError(f'Invalid coordinates: {lat}, {lon}')
+    return lat, lon
+
+
 class FlightSearchView(APIView):
     permission_classes = [IsAuthenticated]
     
@@ -22,50 +72,38 @@ class FlightSearchView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
+            try:
+                flex_days = _parse_flex_days(request.data.get('flex_days'))
+            except (TypeError, ValueError):
+                return Response(
+                    {'error': 'flex_days must be a whole number of days'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            try:
+                near = _parse_position(request.data)
+            except (TypeError, ValueError):
+                return Response(
+                    {'error': 'lat and lon must be valid coordinates'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
             # Save user message to chat history
-            user_message = ChatMessage.objects.create(
-                user=request.user,
-                message=query,
-                is_user=True
-            )
+            save_user_message(request.user, query)
             
-            # Process query with flight agent
+            # Process query with flight agent - one upstream search per query
             flight_service = FlightAgentService()
-            agent_response = flight_service.process_query(query)
-            
-            # Extract flight data if available
-            flights_data = []
-            origin = flight_service.extract_origin(query)
-            destination = flight_service.extract_destination(query)
-            date = flight_service.extract_date(query)
-            
-            # Get flight results
-            flights = flight_service.search_flights(origin, destination, date)
-            if flights and not flights[0].get('error'):
-                flights_data = flights
-                
-                # Save search query to history
-                FlightSearchQuery.objects.create(
-                    user=request.user,
-                    query=query,
-                    origin=origin,
-                    destination=destination,
-                    date=date,
-                    results=flights_data
-                )
+            result = flight_service.run_query(query, flex_days=flex_days, near=near)
             
-            # Save agent response to chat history
-            agent_message = ChatMessage.objects.create(
-                user=request.user,
-                message=agent_response,
-                is_user=False,
-                flights=flights_data
-            )
+            # Save search query and agent response to history
+            agent_message = save_query_result(request.user, result)
             
             return Response({
-                'response': agent_response,
-                'flights': flights_data,
-                'message_id': agent_message.id
+                'response': result.response,
+                'flights': result.flights,
+                'daily_best': result.daily_best,
+                'intent': result.intent,
+                'message_id': str(agent_message.public_id)
             })
             
         except Exception as e:
@@ -75,24 +113,203 @@ class FlightSearchView(APIView):
             )
 
 
+class FlightSearchStreamView(APIView):
+    """
+    Streaming variant of FlightSearchView. Responds with Server-Sent Events:
+    `intent`, then `offer` per flight (or `batch` per completed search for
+    flexible-date and multi-airport queries), and finally `done` with the
+    reply text and message_id. Under ASGI the stream is an async generator,
+    so it holds no thread while the searches are in flight.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [EventStreamRenderer, JSONRenderer]
+    
+    def post(self, request):
+        query = request.data.get('query', '')
+        if not query:
+            return Response(
+                {'error': 'Query is required'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            flex_days = _parse_flex_days(request.data.get('flex_days'))
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'flex_days must be a whole number of days'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            near = _parse_position(request.data)
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'lat and lon must be valid coordinates'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Under ASGI the events go out from the event loop as each search completes;
+        # WSGI servers can only consume a plain iterator, one worker thread per stream
+        events = self._aevents if isinstance(request._request, ASGIRequest) else self._events
+        response = StreamingHttpResponse(
+            events(request.user, query, flex_days, near),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+    
+    def _events(self, user, query, flex_days, near):
+        try:
+            save_user_message(user, query)
+            
+            flight_service = FlightAgentService()
+            for event, data in flight_service.stream_query(query, flex_days=flex_days, near=near):
+                if event != 'result':
+                    yield sse_event(event, data)
+                    continue
+                
+                agent_message = save_query_result(user, data)
+                yield sse_event('done', {
+                    'response': data.response,
+                    'flights': data.flights,
+                    'daily_best': data.daily_best,
+                    'error': data.error,
+                    'message_id': str(agent_message.public_id)
+                })
+        
+        except Exception as e:
+            yield sse_event('error', {'error': f'Internal server error: {str(e)}'})
+    
+    async def _aevents(self, user, query, flex_days, near):
+        try:
+            await asave_user_message(user, query)
+            
+            flight_service = FlightAgentService()
+            async for event, data in flight_service.astream_query(query, flex_days=flex_days, near=near):
+                if event != 'result':
+                    yield sse_event(event, data)
+                    continue
+                
+                agent_message = await asave_query_result(user, data)
+                yield sse_event('done', {
+                    'response': data.response,
+                    'flights': data.flights,
+                    'daily_best': data.daily_best,
+                    'error': data.error,
+                    'message_id': str(agent_message.public_id)
+                })
+        
+        except Exception as e:
+            yield sse_event('error', {'error': f'Internal server error: {str(e)}'})
+
+
+async def _aauthenticate(request):
+    """Run FlightSearchView's DRF authenticators for a plain async Django view"""
+    drf_request = Request(request, authenticators=[auth() for auth in FlightSearchView.authentication_classes])
+    try:
+        user = await sync_to_async(lambda: drf_request.user)()
+    except exceptions.AuthenticationFailed:
+        return None
+    return user if user and user.is_authenticated else None
+
+
+@csrf_exempt
+@require_POST
+async def flight_search_async(request):
+    """
+    Native async variant of FlightSearchView for ASGI deployments. The worker
+    is free to serve other requests while the Amadeus call is in flight.
+    FlightSearchView remains the endpoint for WSGI deployments.
+    """
+    try:
+        user = await _aauthenticate(request)
+        if user is None:
+            return JsonResponse(
+                {'detail': 'Authentication credentials were not provided.'},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        
+        try:
+            data = json.loads(request.body or b'{}')
+            query = data.get('query', '')
+        except (ValueError, AttributeError):
+            data, query = {}, ''
+        if not query:
+            return JsonResponse(
+                {'error': 'Query is required'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            flex_days = _parse_flex_days(data.get('flex_days'))
+        except (TypeError, ValueError):
+            return JsonResponse(
+                {'error': 'flex_days must be a whole number of days'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            near = _parse_position(data)
+        except (TypeError, ValueError):
+            return JsonResponse(
+                {'error': 'lat and lon must be valid coordinates'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        await asave_user_message(user, query)
+        
+        flight_service = FlightAgentService()
+        result = await flight_service.arun_query(query, flex_days=flex_days, near=near)
+        
+        agent_message = await asave_query_result(user, result)
+        
+        return JsonResponse({
+            'response': result.response,
+            'flights': result.flights,
+            'daily_best': result.daily_best,
+            'intent': result.intent,
+            'message_id': str(agent_message.public_id)
+        })
+        
+    except Exception as e:
+        return JsonResponse(
+            {'error': f'Internal server error: {str(e)}'}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
 class ChatHistoryView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
+        """
+        The newest `limit` (default 50) chat messages, oldest first for display.
+        Pass the returned `next_before` as `before` to page further back.
+        """
         try:
-            messages = ChatMessage.objects.filter(user=request.user)[:50]
+            try:
+                before, limit = _parse_page(request.query_params, default_limit=50)
+                messages, next_before = history_page(ChatMessage.objects.filter(user=request.user), before, limit)
+            except (TypeError, ValueError):
+                return Response(
+                    {'error': 'before must be a message id from this history and limit a positive number'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             messages_data = []
             
-            for message in messages:
+            for message in reversed(messages):
                 messages_data.append({
                     'id': message.id,
+                    'message_id': str(message.public_id),
                     'message': message.message,
                     'is_user': message.is_user,
                     'flights': message.flights,
                     'timestamp': message.timestamp.isoformat()
                 })
             
-            return Response({'messages': messages_data})
+            return Response({'messages': messages_data, 'next_before': next_before})
             
         except Exception as e:
             return Response(
@@ -102,8 +319,13 @@ class ChatHistoryView(APIView):
     
     def delete(self, request):
         try:
-            ChatMessage.objects.filter(user=request.user).delete()
-            return Response({'message': 'Chat history cleared'})
+            writer = get_history_writer()
+            if writer is not None:
+                # Otherwise messages still queued would be written after the delete
+                writer.flush(drain=True)
+            # In chunks, so a long history does not hold the database lock for the whole delete
+            deleted = purge_rows(ChatMessage.objects.filter(user=request.user))
+            return Response({'message': 'Chat history cleared', 'deleted': deleted})
             
         except Exception as e:
             return Response(
@@ -116,8 +338,19 @@ class SearchHistoryView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
+        """
+        The newest `limit` (default 20) searches, newest first. Pass the
+        returned `next_before` as `before` to page further back.
+        """
         try:
-            searches = FlightSearchQuery.objects.filter(user=request.user)[:20]
+            try:
+                before, limit = _parse_page(request.query_params, default_limit=20)
+                searches, next_before = history_page(FlightSearchQuery.objects.filter(user=request.user), before, limit)
+            except (TypeError, ValueError):
+                return Response(
+                    {'error': 'before must be a search id from this history and limit a positive number'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             searches_data = []
             
             for search in searches:
@@ -131,10 +364,79 @@ class SearchHistoryView(APIView):
                     'timestamp': search.timestamp.isoformat()
                 })
             
-            return Response({'searches': searches_data})
+            return Response({'searches': searches_data, 'next_before': next_before})
             
         except Exception as e:
             return Response(
                 {'error': f'Internal server error: {str(e)}'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class FlightServiceStatsView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        """Counters for tuning the flight search and auth caches and the Amadeus quota"""
+        writer = get_history_writer()
+        return Response({
+            'cache': get_flight_cache().stats(),
+            'coalescing': coalescing_stats(),
+            'rate_limit': get_rate_limiter().stats(),
+            'endpoints': endpoint_stats(),
+            'auth': get_principal_cache().stats(),
+            'password_hashing': get_hashing_pool().stats(),
+            'history_writes': writer.stats() if writer is not None else None,
+            'fixtures': get_fixture_store().stats() if get_transport() != PASSTHROUGH else None
+        })
+
+
+class AirportAutocompleteView(APIView):
+    # Public and the same for every user, so browsers and shared caches may keep it
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    
+    def get(self, request):
+        """Typeahead for origin/destination fields: ?q=<typed text>&limit=<1-20>"""
+        query = request.query_params.get('q', '')
+        try:
+            limit = int(request.query_params.get('limit', 8))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        index = get_airport_autocomplete()
+        etag = '"{}-{}"'.format(index.version, hashlib.sha1(f'{query}|{limit}'.encode()).hexdigest()[:12])
+        if request.headers.get('If-None-Match') == etag:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response({'query': query, 'results': index.lookup(query, limit)})
+        response['ETag'] = etag
+        response['Cache-Control'] = f'public, max-age={get_setting("AIRPORT_AUTOCOMPLETE_MAX_AGE", 300)}'
+        return response
+
+
+class NearbyAirportsView(APIView):
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    
+    def get(self, request):
+        """The commercial airports nearest to ?lat=&lon= (&k=1-20, &max_km=)"""
+        try:
+            near = _parse_position(request.query_params)
+            k = max(1, min(int(request.query_params.get('k', 5)), 20))
+            max_km = request.query_params.get('max_km')
+            max_km = float(max_km) if max_km is not None else None
+        except (TypeError, ValueError):
+            near = None
+        if near is None:
+            return Response(
+                {'error': 'lat and lon must be valid coordinates; k and max_km must be numbers'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        airports = [
+            {'code': airport.iata, 'name': airport.name, 'city': airport.city,
+             'country': airport.country, 'distance_km': distance}
+            for airport, distance in nearest_airports(*near, k=k, max_km=max_km)
+        ]
+        return Response({'airports': airports})
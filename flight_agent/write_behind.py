@@ -0,0 +1,181 @@
+import atexit
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from django.db import OperationalError, close_old_connections, models, transaction
+
+from .conf import get_setting
+from .models import ChatMessage, FlightResultSet, FlightSearchQuery, result_set_digest
+
+logger = logging.getLogger(__name__)
+
+
+def intern_result_sets(digests: Dict[str, List]) -> Dict[str, int]:
+    """FlightResultSet ids for {digest: flights}, storing the sets that are new in one insert"""
+    ids = dict(FlightResultSet.objects.filter(digest__in=digests).values_list('digest', 'id'))
+    missing = [FlightResultSet(digest=digest, flights=flights) for digest, flights in digests.items() if digest not in ids]
+    if missing:
+        # Another process may store the same set meanwhile; its row is as good as ours
+        FlightResultSet.objects.bulk_create(missing, ignore_conflicts=True)
+        ids.update(FlightResultSet.objects.filter(digest__in=[row.digest for row in missing]).values_list('digest', 'id'))
+    return ids
+
+
+class HistoryWriter:
+    """
+    Write-behind queue for chat and search history. Request threads hand
+    it unsaved ChatMessage and FlightSearchQuery rows, with the flights
+    each should reference, and return at once. A background thread writes
+    them with bulk_create, `batch_size` rows per transaction, as soon as a
+    batch is waiting and otherwise every `interval` seconds; close() writes
+    what is left at shutdown.
+
+    Rows are written in the order they were submitted. At most
+    `max_pending` may wait: beyond that submit() returns False and the
+    caller should save the row itself. A batch that fails with an
+    OperationalError (the database is locked, or the connection dropped)
+    is retried on the next flush, on a fresh connection if the old one is
+    unusable, up to `max_retries` times before it is dropped. flush(drain=True)
+    retries it straight away instead, so nothing is left queued when it returns.
+    """
+
+    def __init__(self, batch_size: int = 100, interval: float = 0.5, max_pending: int = 10000,
+                 max_retries: int = 5):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self._pending: List[Tuple[models.Model, Optional[List]]] = []
+        self._attempts = 0
+        self._cond = threading.Condition()
+        # One flush at a time, so flush() returns only once earlier rows are written too
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"queued": 0, "written": 0, "batches": 0, "retried_batches": 0,
+                       "failed_rows": 0, "rejected": 0}
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def submit(self, row: models.Model, flights: Optional[List] = None) -> bool:
+        """Queue an unsaved row; `flights` become its result_set when it is written"""
+        with self._cond:
+            if self._closed or len(self._pending) >= self.max_pending:
+                self._stats["rejected"] += 1
+                return False
+            self._pending.append((row, flights or None))
+            self._stats["queued"] += 1
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def flush(self, drain: bool = False) -> int:
+        """
+        Write every row queued so far, a batch per transaction; returns the
+        number written. Unless `drain` is set, a batch that needs a retry
+        ends the flush and waits for the next one.
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._cond:
+                    batch = self._pending[:self.batch_size]
+                    del self._pending[:self.batch_size]
+                if not batch:
+                    return written
+                try:
+                    self._write(batch)
+                except OperationalError as e:
+                    # A dropped connection stays broken until it is closed; the next query reconnects
+                    close_old_connections()
+                    self._attempts += 1
+                    if self._attempts > self.max_retries:
+                        logger.error(f"❌ History write of {len(batch)} rows failed {self._attempts} times, "
+                                     f"rows dropped: {e}")
+                        self._attempts = 0
+                        with self._cond:
+                            self._stats["failed_rows"] += len(batch)
+                        continue
+                    logger.warning(f"⚠️ History write of {len(batch)} rows failed, will retry: {e}")
+                    for row, _ in batch:
+                        # bulk_create may have given them ids the rollback took back
+                        row.pk = None
+                    with self._cond:
+                        self._pending[:0] = batch
+                        self._stats["retried_batches"] += 1
+                    if not drain:
+                        return written
+                    continue
+                except Exception as e:
+                    logger.error(f"❌ History write of {len(batch)} rows failed, rows dropped: {e}")
+                    self._attempts = 0
+                    with self._cond:
+                        self._stats["failed_rows"] += len(batch)
+                    continue
+                self._attempts = 0
+                written += len(batch)
+                with self._cond:
+                    self._stats["written"] += len(batch)
+                    self._stats["batches"] += 1
+
+    def close(self) -> None:
+        """Stop the background thread and write what is still queued"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush(drain=True)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {**self._stats, "pending": len(self._pending)}
+
+    def _write(self, batch: List[Tuple[models.Model, Optional[List]]]) -> None:
+        digests = [result_set_digest(flights) if flights else None for _, flights in batch]
+        with transaction.atomic():
+            ids = intern_result_sets({digest: flights for digest, (_, flights) in zip(digests, batch) if digest})
+            for (row, _), digest in zip(batch, digests):
+                if digest:
+                    row.result_set_id = ids[digest]
+            for model in (ChatMessage, FlightSearchQuery):
+                rows = [row for row, _ in batch if isinstance(row, model)]
+                if rows:
+                    model.objects.bulk_create(rows)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._closed and len(self._pending) < self.batch_size:
+                    self._cond.wait(self.interval)
+                if self._closed:
+                    return
+            self.flush()
+
+
+_writer: Optional[HistoryWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_history_writer() -> Optional[HistoryWriter]:
+    """Return the process-wide history writer, or None unless HISTORY_WRITE_BEHIND is set"""
+    global _writer
+    if not get_setting("HISTORY_WRITE_BEHIND", False):
+        return None
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                writer = HistoryWriter(
+                    batch_size=get_setting("HISTORY_WRITE_BATCH_SIZE", 100),
+                    interval=get_setting("HISTORY_WRITE_INTERVAL", 0.5),
+                    max_pending=get_setting("HISTORY_WRITE_MAX_PENDING", 10000),
+                    max_retries=get_setting("HISTORY_WRITE_MAX_RETRIES", 5),
+                )
+                writer.start()
+                _writer = writer
+    return _writer